@@ -0,0 +1,124 @@
+"""
+Embedding batching benchmark under bursty traffic against a local mock server.
+
+Callers embed one text each, arriving at a low rate with periodic bursts.
+Reports, for fixed batch sizes and for AdaptiveBatcher, the p95 latency of a
+text, the number of upstream requests and the throughput. Requires httpx.
+
+Usage
+-----
+$ python benchmarks/batching.py --texts 3000 --latency 0.05 --target-p95 0.2
+"""
+import time
+import random
+import asyncio
+import argparse
+
+from typing import Any, Dict, List
+
+from wenxinworkshop import AdaptiveBatcher, AsyncEmbeddingAPI, AsyncHTTPXTransport
+from wenxinworkshop import MockServer
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def arrivals(texts: int, rate: float, burst_rate: float, seed: int) -> List[float]:
+    """
+    Arrival times: one second at `rate` texts/sec, then half a second at
+    `burst_rate`, repeated.
+    """
+    generator = random.Random(seed)
+    times: List[float] = []
+    now = 0.0
+    while len(times) < texts:
+        current = burst_rate if now % 1.5 >= 1.0 else rate
+        now += generator.expovariate(current)
+        times.append(now)
+    return times
+
+
+async def run(
+    name: str, batcher: AdaptiveBatcher, schedule: List[float], server: MockServer
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    before = server.counts.get("embedding", 0)
+
+    async def call(at: float, start: float) -> None:
+        await asyncio.sleep(max(0.0, start + at - time.perf_counter()))
+        sent = time.perf_counter()
+        await batcher.embed("text {}".format(at))
+        latencies.append(time.perf_counter() - sent)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(at, start) for at in schedule))
+    elapsed = time.perf_counter() - start
+    await batcher.aclose()
+
+    stats = batcher.stats()
+    return {
+        "name": name,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+        "requests": server.counts.get("embedding", 0) - before,
+        "texts_per_second": len(schedule) / elapsed,
+        "batch_size": stats["batch_size"],
+        "linger_ms": stats["linger_ms"],
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=3000)
+    parser.add_argument("--rate", type=float, default=100.0)
+    parser.add_argument("--burst-rate", type=float, default=1500.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--target-p95", type=float, default=0.2)
+    parser.add_argument("--embedding-dim", type=int, default=64)
+    args = parser.parse_args()
+
+    schedule = arrivals(args.texts, args.rate, args.burst_rate, seed=0)
+
+    with MockServer(latency=args.latency, embedding_dim=args.embedding_dim) as server:
+        transport = AsyncHTTPXTransport(
+            base_url=server.base_url, http2=False, max_connections=args.concurrency
+        )
+        ernieembedding = AsyncEmbeddingAPI(api_key="", secret_key="", transport=transport)
+
+        def fixed(batch_size: int, linger: float) -> AdaptiveBatcher:
+            batcher = AdaptiveBatcher(
+                ernieembedding,
+                max_batch_size=batch_size,
+                max_concurrency=args.concurrency,
+                adapt_every=args.texts + 1,
+            )
+            batcher.linger = linger
+            return batcher
+
+        scenarios = {
+            "fixed batch 1": fixed(1, 0.0),
+            "fixed batch 16, linger 0 ms": fixed(16, 0.0),
+            "fixed batch 16, linger 50 ms": fixed(16, 0.05),
+            "adaptive": AdaptiveBatcher(
+                ernieembedding,
+                target_p95=args.target_p95,
+                max_concurrency=args.concurrency,
+            ),
+        }
+
+        for name, batcher in scenarios.items():
+            result = await run(name, batcher, schedule, server)
+            print(
+                "{name:<30} p50 {latency_p50_ms:>8.1f} ms  p95 {latency_p95_ms:>8.1f} ms  "
+                "{requests:>5} requests  {texts_per_second:>7.1f} texts/s  "
+                "batch {batch_size:>2}  linger {linger_ms:>5.1f} ms".format(**result)
+            )
+
+        await transport.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Import-time benchmark.
+
+Starts fresh interpreters and reports, for each scenario, the median time to
+import the package and run the scenario, the number of modules loaded, and
+whether `requests` was imported. Exits with status 1 if the lazy client
+scenario exceeds the budget, so it can guard startup time in CI.
+
+Usage
+-----
+$ python benchmarks/import_time.py --runs 20 --budget-ms 100
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+from typing import Any, Dict, List
+
+
+SCENARIOS = {
+    "import": "import wenxinworkshop",
+    "lazy client": (
+        "import wenxinworkshop\n"
+        "wenxinworkshop.AIStudioLLMAPI(user_id='user', access_token='token')"
+    ),
+    "first request path": (
+        "import wenxinworkshop\n"
+        "wenxinworkshop.get_default_transport().session"
+    ),
+    "everything": (
+        "import wenxinworkshop\n"
+        "for name in wenxinworkshop.__all__:\n"
+        "    getattr(wenxinworkshop, name)"
+    ),
+}
+
+PROBE = """
+import sys
+import time
+import json
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "modules": len(sys.modules),
+    "requests": "requests" in sys.modules,
+}}))
+"""
+
+
+def run(code: str) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def measure(name: str, code: str, runs: int) -> Dict[str, Any]:
+    samples: List[Dict[str, Any]] = [run(code) for _ in range(runs)]
+    return {
+        "name": name,
+        "median_ms": statistics.median(sample["ms"] for sample in samples),
+        "min_ms": min(sample["ms"] for sample in samples),
+        "modules": samples[-1]["modules"],
+        "requests": samples[-1]["requests"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    # Warm the bytecode cache, so the first run does not pay for compiling.
+    run("import wenxinworkshop\nfor name in wenxinworkshop.__all__: getattr(wenxinworkshop, name)")
+
+    rows = [measure(name, code, args.runs) for name, code in SCENARIOS.items()]
+
+    print(
+        "{:<20} {:>10} {:>8} {:>8} {:>9}".format(
+            "scenario", "median ms", "min ms", "modules", "requests"
+        )
+    )
+    for result in rows:
+        print(
+            "{name:<20} {median_ms:>10.1f} {min_ms:>8.1f} {modules:>8} "
+            "{requests!s:>9}".format(**result)
+        )
+
+    lazy_client = rows[1]["median_ms"]
+    if lazy_client > args.budget_ms:
+        print("lazy client: {:.1f} ms over budget of {:.1f} ms".format(lazy_client, args.budget_ms))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
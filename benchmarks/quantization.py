@@ -0,0 +1,118 @@
+"""
+Memory / recall benchmark of embedding compression.
+
+Builds a synthetic corpus with the low-rank structure of real embeddings and
+reports, for every compressed form, bytes per vector, compression ratio,
+recall@k of the top-k search against exact float32 cosine search, and
+search time.
+
+Usage
+-----
+$ python benchmarks/quantization.py --corpus 20000 --queries 200 --dim 384
+"""
+import time
+import argparse
+
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+from wenxinworkshop import PCA, Int8Embeddings, BinaryEmbeddings, recall_at_k, truncate
+
+
+def synthetic(count: int, dim: int, rank: int, seed: int) -> np.ndarray:
+    """
+    Embeddings spread around a `rank`-dimensional subspace, plus noise.
+    """
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dim)) * np.linspace(1.0, 0.1, dim)
+    latent = rng.standard_normal((count, rank))
+    return (latent @ basis + 0.1 * rng.standard_normal((count, dim))).astype(np.float32)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def measure(
+    name: str,
+    search: Callable[[], Tuple[Any, Any]],
+    nbytes: int,
+    count: int,
+    dim: int,
+    exact: np.ndarray,
+    k: int,
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    indices, _ = search()
+    elapsed = time.perf_counter() - start
+    return {
+        "name": name,
+        "bytes_per_vector": nbytes / count,
+        "ratio": count * dim * 4 / nbytes,
+        "recall": recall_at_k(exact, indices, k),
+        "search_ms": elapsed * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--rank", type=int, default=64)
+    parser.add_argument("--reduced-dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = synthetic(args.corpus + args.queries, args.dim, args.rank, args.seed)
+    corpus, queries = data[: args.corpus], data[args.corpus :]
+    exact = exact_top_k(corpus, queries, args.k)
+
+    int8 = Int8Embeddings(corpus)
+    binary = BinaryEmbeddings(corpus)
+
+    pca = PCA(dim=args.reduced_dim).fit(corpus[:5000])
+    pca_int8 = Int8Embeddings(pca.transform(corpus))
+    pca_queries = pca.transform(queries)
+
+    truncated_int8 = Int8Embeddings(truncate(corpus, args.reduced_dim))
+    truncated_queries = truncate(queries, args.reduced_dim)
+
+    def row(name: str, search: Callable[[], Tuple[Any, Any]], nbytes: int) -> Dict[str, Any]:
+        return measure(name, search, nbytes, args.corpus, args.dim, exact, args.k)
+
+    rows = [
+        row("int8", lambda: int8.top_k(queries, args.k), int8.nbytes),
+        row("binary", lambda: binary.top_k(queries, args.k), binary.nbytes),
+        row(
+            "pca{}+int8".format(args.reduced_dim),
+            lambda: pca_int8.top_k(pca_queries, args.k),
+            pca_int8.nbytes,
+        ),
+        row(
+            "truncate{}+int8".format(args.reduced_dim),
+            lambda: truncated_int8.top_k(truncated_queries, args.k),
+            truncated_int8.nbytes,
+        ),
+    ]
+
+    print("PCA explained variance: {:.3f}".format(pca.explained_variance_ratio))
+    print(
+        "{:<22} {:>10} {:>8} {:>10} {:>10}".format(
+            "form", "bytes/vec", "ratio", "recall@k", "search ms"
+        )
+    )
+    for result in rows:
+        print(
+            "{name:<22} {bytes_per_vector:>10.1f} {ratio:>7.1f}x "
+            "{recall:>10.3f} {search_ms:>10.1f}".format(**result)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+Benchmark suite of Wenxin Workshop APIs.
+
+Measures the SDK-side overhead (payload encoding, response parsing, embedding
+extraction, stream line decoding), time and allocations per chunk of reading
+a streaming body, requests/sec and client CPU per request,
+memory per embedding batch, time-to-first-chunk / chunks per second of
+streaming chat, and time-to-first-chunk on a new connection with and without
+pre-warming (the mock server delays new connections by `--connect-latency`,
+standing in for DNS and TLS setup). The mock server runs in a separate process, so CPU and memory
+numbers only account for the client.
+
+Results are written as JSON so runs can be compared between releases.
+
+Usage
+-----
+$ python benchmarks/suite.py --output results.json
+$ python benchmarks/suite.py --output new.json --compare results.json
+"""
+import sys
+import json
+import time
+import timeit
+import platform
+import argparse
+import tracemalloc
+import contextlib
+import multiprocessing
+
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Any, Callable, Dict, Iterator, List
+
+import wenxinworkshop
+
+from wenxinworkshop import LLMAPI, EmbeddingAPI
+from wenxinworkshop import Message, MockServer, RequestsTransport, encode_json
+from wenxinworkshop import ChatCompletion, EmbeddingList, ChatStream
+from wenxinworkshop.streams import _decode_event
+
+
+def _serve(queue: "multiprocessing.Queue[int]", options: Dict[str, Any]) -> None:
+    server = MockServer(**options).start()
+    queue.put(server.port)
+    while True:
+        time.sleep(3600)
+
+
+@contextlib.contextmanager
+def mock_server(**options: Any) -> Iterator[str]:
+    """
+    Run a mock server in a subprocess and yield its base URL.
+    """
+    queue: "multiprocessing.Queue[int]" = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(queue, options), daemon=True)
+    process.start()
+    try:
+        yield "http://127.0.0.1:{}".format(queue.get(timeout=10))
+    finally:
+        process.terminate()
+        process.join()
+
+
+def bench_overhead(embedding_dim: int, batch_size: int, chunks: int) -> Dict[str, Any]:
+    """
+    Micro-benchmarks of the SDK-side work done around each request, in microseconds.
+    """
+    messages = [
+        Message(role="user" if i % 2 == 0 else "assistant", content="你好！" * 50)
+        for i in range(9)
+    ]
+    chat_data = {
+        "messages": messages,
+        "temperature": None,
+        "top_p": None,
+        "penalty_score": None,
+        "stream": None,
+        "user_id": None,
+    }
+    embedding_data = {"input": ["你好吗？" * 20] * batch_size, "user_id": None}
+
+    chat_body = json.dumps({"id": "as-mock", "result": "你好，有什么可以帮助你的。" * 20})
+    embedding_body = json.dumps(
+        {
+            "data": [
+                {"object": "embedding", "embedding": [0.123456] * embedding_dim, "index": i}
+                for i in range(batch_size)
+            ]
+        }
+    )
+    embedding_json = json.loads(embedding_body)
+    chat_raw = chat_body.encode("UTF-8")
+    embedding_raw = embedding_body.encode("UTF-8")
+    stream_lines = [
+        "data: " + json.dumps({"sentence_id": i, "result": "你好，有什么可以帮助你的。"})
+        for i in range(chunks)
+    ]
+
+    def decode_stream() -> None:
+        for line in stream_lines:
+            json.loads(line[5:])["result"]
+
+    def decode_stream_inplace() -> None:
+        for line in stream_lines:
+            _decode_event(line)
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "encode_chat_payload": lambda: json.dumps(chat_data),
+        "encode_embedding_payload": lambda: json.dumps(embedding_data),
+        "encode_chat_payload_compact": lambda: encode_json(chat_data),
+        "encode_embedding_payload_compact": lambda: encode_json(embedding_data),
+        "parse_chat_response": lambda: json.loads(chat_body)["result"],
+        "parse_embedding_response": lambda: json.loads(embedding_body),
+        "extract_embeddings": lambda: [e["embedding"] for e in embedding_json["data"]],
+        "parse_chat_response_lazy": lambda: ChatCompletion(chat_raw).result,
+        "parse_embedding_response_lazy": lambda: EmbeddingList(embedding_raw).embeddings,
+        "decode_stream_lines": decode_stream,
+        "decode_stream_lines_inplace": decode_stream_inplace,
+    }
+
+    results = {}
+    for name, case in cases.items():
+        timer = timeit.Timer(case)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=5, number=number)) / number
+        results[name + "_us"] = best * 1e6
+    return results
+
+
+def bench_stream_allocations(chunks: int, repeat: int) -> Dict[str, Any]:
+    """
+    Time and peak allocated bytes per chunk of reading and accumulating a
+    streaming chat body: line by line with `iter_lines`, a sliced copy per
+    line and string concatenation, against ChatStream and StreamAccumulator.
+    """
+    import requests
+
+    body = b"".join(
+        b"data: "
+        + json.dumps(
+            {"sentence_id": i, "result": "你好，有什么可以帮助你的。" * 4}, ensure_ascii=False
+        ).encode("UTF-8")
+        + b"\n\n"
+        for i in range(chunks)
+    )
+
+    def response() -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response._content_consumed = True
+        response.encoding = "UTF-8"
+        return response
+
+    def lines() -> Iterator[str]:
+        text = ""
+        for line in response().iter_lines(chunk_size=512, decode_unicode=True):
+            if line:
+                result = json.loads(line[5:])["result"]
+                text += result
+                yield result
+
+    def inplace() -> Iterator[str]:
+        return iter(ChatStream(response(), chunk_size=512).accumulate())
+
+    results: Dict[str, Any] = {}
+    for name, deltas in (("lines", lines), ("inplace", inplace)):
+        timer = timeit.Timer(lambda: sum(1 for _ in deltas()))
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+        # Peak of the memory allocated while producing each chunk, over the
+        # memory in use before it.
+        peaks = []
+        iterator = deltas()
+        tracemalloc.start()
+        while True:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            if next(iterator, None) is None:
+                break
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+        tracemalloc.stop()
+
+        peaks.sort()
+        results["stream_{}_us_per_chunk".format(name)] = best / chunks * 1e6
+        results["stream_{}_peak_bytes_per_chunk".format(name)] = peaks[len(peaks) // 2]
+    return results
+
+
+def bench_throughput(
+    name: str, call: Callable[[], Any], requests: int, concurrency: int
+) -> Dict[str, Any]:
+    """
+    Requests/sec, latency percentiles and client CPU per request.
+    """
+    latencies: List[float] = []
+
+    def task() -> None:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(task) for _ in range(requests)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    latencies.sort()
+    return {
+        name + "_requests_per_second": requests / elapsed,
+        name + "_cpu_ms_per_request": cpu / requests * 1000,
+        name + "_latency_p50_ms": latencies[len(latencies) // 2] * 1000,
+        name + "_latency_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+def bench_embedding_memory(
+    ernieembedding: EmbeddingAPI, batch_size: int, repeat: int
+) -> Dict[str, Any]:
+    """
+    Peak and retained Python memory of one embedding batch.
+    """
+    texts = ["你好吗？{}".format(i) for i in range(batch_size)]
+    ernieembedding(texts=texts)
+
+    peaks, retained = [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        embeddings = ernieembedding(texts=texts)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+        retained.append(current)
+        del embeddings
+
+    return {
+        "embedding_batch_size": batch_size,
+        "embedding_peak_kib_per_batch": min(peaks) / 1024,
+        "embedding_retained_kib_per_batch": min(retained) / 1024,
+    }
+
+
+def bench_bytes(base_url: str, texts: List[str]) -> Dict[str, Any]:
+    """
+    Bytes on the wire of one embedding request, with and without gzip request bodies.
+    """
+    results: Dict[str, Any] = {}
+
+    for name, compress_min_size in (("plain", None), ("gzip", 0)):
+        transport = RequestsTransport(base_url=base_url, compress_min_size=compress_min_size)
+        ernieembedding = EmbeddingAPI(api_key="", secret_key="", transport=transport)
+        before = transport.stats.as_dict()
+        ernieembedding(texts=texts)
+        after = transport.stats.as_dict()
+
+        for key in ("bytes_sent", "bytes_received", "bytes_received_decoded"):
+            results["embedding_{}_{}".format(key, name)] = after[key] - before[key]
+
+    return results
+
+
+def bench_stream(erniebot: LLMAPI, repeat: int) -> Dict[str, Any]:
+    """
+    Time to first chunk and chunks per second of streaming chat.
+    """
+    messages = [Message(role="user", content="你好！")]
+    first_chunks, rates = [], []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        first = None
+        count = 0
+        for _ in erniebot(messages=messages, stream=True):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+        elapsed = time.perf_counter() - start
+        first_chunks.append(first or 0.0)
+        rates.append(count / elapsed)
+
+    first_chunks.sort()
+    rates.sort()
+    return {
+        "stream_time_to_first_chunk_ms": first_chunks[len(first_chunks) // 2] * 1000,
+        "stream_chunks_per_second": rates[len(rates) // 2],
+    }
+
+
+def bench_prewarm(erniebot: LLMAPI, base_url: str, repeat: int) -> Dict[str, Any]:
+    """
+    Time to first chunk of streaming chat on a new connection, cold and pre-warmed.
+    """
+    messages = [Message(role="user", content="你好！")]
+    results: Dict[str, Any] = {}
+
+    for name, prewarm in (("cold", False), ("prewarmed", True)):
+        first_chunks = []
+        for _ in range(repeat):
+            erniebot.transport = RequestsTransport(base_url=base_url)
+            if prewarm:
+                erniebot.prewarm()
+
+            start = time.perf_counter()
+            with erniebot(messages=messages, stream=True) as response_stream:
+                next(response_stream)
+            first_chunks.append(time.perf_counter() - start)
+            erniebot.transport.close()
+
+        first_chunks.sort()
+        results["stream_ttft_{}_ms".format(name)] = first_chunks[len(first_chunks) // 2] * 1000
+
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """
+    Print the relative change of every metric against a baseline run.
+    """
+    for name, value in results["metrics"].items():
+        old = baseline.get("metrics", {}).get(name)
+        if isinstance(old, (int, float)) and old:
+            print("{:<45} {:>12.3f} {:>+8.1f}%".format(name, value, (value / old - 1) * 100))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--chunks", type=int, default=32)
+    parser.add_argument("--chunk-interval", type=float, default=0.005)
+    parser.add_argument("--connect-latency", type=float, default=0.02)
+    parser.add_argument("--embedding-dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--output", default=None, help="JSON file to write results to.")
+    parser.add_argument("--compare", default=None, help="JSON results of a previous run.")
+    args = parser.parse_args()
+
+    metrics: Dict[str, Any] = {}
+    metrics.update(bench_overhead(args.embedding_dim, args.batch_size, args.chunks))
+    metrics.update(bench_stream_allocations(args.chunks * 16, repeat=5))
+
+    with mock_server(
+        latency=args.latency,
+        chunks=args.chunks,
+        embedding_dim=args.embedding_dim,
+    ) as base_url:
+        transport = RequestsTransport(base_url=base_url)
+        erniebot = LLMAPI(api_key="", secret_key="", transport=transport)
+        ernieembedding = EmbeddingAPI(api_key="", secret_key="", transport=transport)
+
+        messages = [Message(role="user", content="你好！")]
+        texts = ["你好吗？{}".format(i) for i in range(args.batch_size)]
+
+        metrics.update(
+            bench_throughput(
+                "chat", lambda: erniebot(messages=messages), args.requests, args.concurrency
+            )
+        )
+        metrics.update(
+            bench_throughput(
+                "embedding",
+                lambda: ernieembedding(texts=texts),
+                args.requests,
+                args.concurrency,
+            )
+        )
+        metrics.update(bench_embedding_memory(ernieembedding, args.batch_size, repeat=5))
+        metrics.update(bench_bytes(base_url, texts))
+
+    with mock_server(
+        latency=args.latency,
+        chunks=args.chunks,
+        chunk_interval=args.chunk_interval,
+        connect_latency=args.connect_latency,
+    ) as base_url:
+        transport = RequestsTransport(base_url=base_url)
+        erniebot = LLMAPI(api_key="", secret_key="", transport=transport)
+        metrics.update(bench_stream(erniebot, repeat=20))
+        metrics.update(bench_prewarm(erniebot, base_url, repeat=10))
+
+    results = {
+        "version": wenxinworkshop.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "parameters": vars(args),
+        "metrics": metrics,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, "r", encoding="UTF-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Throughput / latency benchmark of Wenxin Workshop APIs against a local mock server.
+
+Usage
+-----
+$ python benchmarks/throughput.py --requests 1000 --concurrency 16 --latency 0.01
+"""
+import time
+import argparse
+import statistics
+
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Any, Callable, Dict, List
+
+from wenxinworkshop import LLMAPI, EmbeddingAPI, PromptTemplateAPI
+from wenxinworkshop import Message, MockServer, RequestsTransport
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(
+    name: str, call: Callable[[], Any], requests: int, concurrency: int
+) -> Dict[str, Any]:
+    """
+    Run `call` `requests` times with `concurrency` threads and report throughput and latency.
+    """
+    latencies: List[float] = []
+    errors = 0
+
+    def task() -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            call()
+        except ValueError:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(requests):
+            executor.submit(task)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "name": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": requests / elapsed,
+        "latency_mean_ms": statistics.mean(latencies) * 1000,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--chunk-interval", type=float, default=0.0)
+    parser.add_argument("--embedding-dim", type=int, default=384)
+    args = parser.parse_args()
+
+    with MockServer(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        chunks=args.chunks,
+        chunk_interval=args.chunk_interval,
+        embedding_dim=args.embedding_dim,
+        seed=0,
+    ) as server:
+        transport = RequestsTransport(base_url=server.base_url)
+
+        erniebot = LLMAPI(api_key="", secret_key="", transport=transport)
+        ernieembedding = EmbeddingAPI(api_key="", secret_key="", transport=transport)
+        prompttemplate = PromptTemplateAPI(api_key="", secret_key="", transport=transport)
+
+        messages = [Message(role="user", content="你好！")]
+        texts = ["你好！", "你好吗？", "你是谁？"] * 4
+
+        results = [
+            run("chat", lambda: erniebot(messages=messages), args.requests, args.concurrency),
+            run(
+                "chat_stream",
+                lambda: "".join(erniebot(messages=messages, stream=True)),
+                args.requests,
+                args.concurrency,
+            ),
+            run("embedding", lambda: ernieembedding(texts=texts), args.requests, args.concurrency),
+            run(
+                "template",
+                lambda: prompttemplate(template_id=1968, content="侏罗纪世界"),
+                args.requests,
+                args.concurrency,
+            ),
+        ]
+
+    for result in results:
+        print(
+            "{name:<12} {requests_per_second:>10.1f} req/s  "
+            "p50 {latency_p50_ms:>7.2f} ms  p95 {latency_p95_ms:>7.2f} ms  "
+            "errors {errors}".format(**result)
+        )
+
+
+if __name__ == "__main__":
+    main()
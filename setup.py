@@ -15,5 +15,16 @@ setup(
     license='Apache License 2.0',
     install_requires=[
         'requests',
-    ] 
+    ],
+    extras_require={
+        'http2': [
+            'httpx[http2]',
+        ],
+        'numpy': [
+            'numpy',
+        ],
+        'jsonschema': [
+            'jsonschema',
+        ],
+    }
 )
\ No newline at end of file
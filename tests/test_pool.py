@@ -0,0 +1,62 @@
+import gc
+
+import pytest
+
+from wenxinworkshop import ChatStream, CredentialPool
+
+
+class _Response:
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def iter_content(self, chunk_size=512):
+        for line in self.lines:
+            yield line.encode("utf-8")
+
+    def close(self):
+        self.closed = True
+
+
+class _API:
+    def __init__(self, key):
+        self.key = key
+
+    def __call__(self, messages, stream=None, stop=None):
+        if not isinstance(messages, list):
+            raise TypeError("messages must be a list.")
+        lines = ['data: {"result": "%s"}\n\n' % text for text in ("你好", "，世界")]
+        return ChatStream(_Response(lines), stop=stop)
+
+
+def _in_flight(pool):
+    return [member["in_flight"] for member in pool.stats()]
+
+
+def test_unexpected_errors_release_the_credential():
+    pool = CredentialPool(api=_API, credentials=[{"key": 1}])
+    with pytest.raises(TypeError):
+        pool(messages=5)
+    assert _in_flight(pool) == [0]
+
+
+def test_pooled_stream_is_a_chat_stream():
+    pool = CredentialPool(api=_API, credentials=[{"key": 1}])
+    stream = pool(messages=[], stream=True, stop=["世"])
+    assert isinstance(stream, ChatStream)
+    assert _in_flight(pool) == [1]
+    assert stream.accumulate().consume() == "你好，"
+    assert stream.stopped == "世"
+    assert _in_flight(pool) == [0]
+
+
+def test_unread_pooled_stream_releases_on_close_and_gc():
+    pool = CredentialPool(api=_API, credentials=[{"key": 1}])
+    stream = pool(messages=[], stream=True)
+    stream.close()
+    assert stream.response.closed
+    assert _in_flight(pool) == [0]
+
+    pool(messages=[], stream=True)
+    gc.collect()
+    assert _in_flight(pool) == [0]
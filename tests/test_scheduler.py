@@ -0,0 +1,27 @@
+import time
+import threading
+
+from wenxinworkshop import Scheduler
+
+
+def test_cancelled_request_expiring_keeps_dispatcher_running():
+    # A queued future cancelled by its caller, then expired by the
+    # dispatcher, must not stop the dispatcher.
+    release = threading.Event()
+    with Scheduler(workers=1) as scheduler:
+        scheduler.submit(release.wait)
+        future = scheduler.submit(time.sleep, 0, timeout=0.1)
+        assert future.cancel()
+        time.sleep(0.3)
+
+        release.set()
+        assert scheduler.submit(lambda: "ok").result(timeout=5) == "ok"
+        assert scheduler.stats()["dropped"] == 0
+
+
+def test_finish_times_of_idle_tenants_are_evicted():
+    with Scheduler(workers=4) as scheduler:
+        futures = [scheduler.submit(lambda: None, tenant=i) for i in range(1000)]
+        for future in futures:
+            future.result(timeout=5)
+        assert len(scheduler._finish) <= 2 * len(scheduler._queue) + 64
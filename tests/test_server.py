@@ -0,0 +1,43 @@
+import pytest
+
+from wenxinworkshop.server import _HTTPError, _functions, _messages, _number, _stop
+
+
+@pytest.mark.parametrize(
+    "messages",
+    [
+        [{"role": "user", "content": 5}],
+        [{"role": "user", "content": [5]}],
+        [{"role": "user", "content": [{"type": "text", "text": 5}]}],
+    ],
+)
+def test_invalid_content_is_a_client_error(messages):
+    with pytest.raises(_HTTPError) as info:
+        _messages(messages)
+    assert info.value.status == 400
+
+
+def test_content_parts_are_joined():
+    messages = [{"role": "user", "content": [{"type": "text", "text": "你好"}, {"text": "！"}]}]
+    assert _messages(messages) == [{"role": "user", "content": "你好！"}]
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        {"tools": [{"type": "function"}]},
+        {"tools": "search"},
+        {"functions": [5]},
+        {"stop": 5},
+        {"stop": ["。", 5]},
+        {"temperature": "0.5"},
+        {"top_p": True},
+    ],
+)
+def test_invalid_options_are_client_errors(request_):
+    with pytest.raises(_HTTPError) as info:
+        _functions(request_)
+        _stop(request_.get("stop"))
+        _number(request_, "temperature")
+        _number(request_, "top_p")
+    assert info.value.status == 400
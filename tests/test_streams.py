@@ -0,0 +1,26 @@
+import pytest
+
+from wenxinworkshop import ChatStream, DeadlineExceeded, deadline
+
+
+class _TimedOutResponse:
+    def __init__(self, error):
+        self.error = error
+        self.closed = False
+
+    def iter_content(self, chunk_size=512):
+        yield b'data: {"result": "\xe4\xbd\xa0\xe5\xa5\xbd"}\n\n'
+        raise self.error
+
+    def close(self):
+        self.closed = True
+
+
+def test_httpx_read_timeout_is_deadline_exceeded():
+    httpx = pytest.importorskip("httpx")
+    with deadline(60):
+        stream = ChatStream(_TimedOutResponse(httpx.ReadTimeout("timed out")))
+    assert next(stream) == "你好"
+    with pytest.raises(DeadlineExceeded):
+        next(stream)
+    assert stream.response.closed
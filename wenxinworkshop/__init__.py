@@ -1,17 +1,69 @@
-from .types import Texts, Messages, Embedding, Embeddings
+import importlib
 
-from .types import Message
-from .types import ChatUsage, ChatResponse
-from .types import AccessTokenResponse
-from .types import EmbeddingUsage, EmbeddingResponse, EmbeddingObject
-from .types import PromptTemplateResult, PromptTemplateResponse
-from .types import AIStudioChatUsage, AIStudioChatResult, AIStudioChatResponse
-from .types import AIStudioEmbeddingObject, AIStudioEmbeddingUsage
-from .types import AIStudioEmbeddingResult, AIStudioEmbeddingResponse
+from typing import TYPE_CHECKING, Any, List
 
-from .apis import get_access_token
-from .apis import LLMAPI, EmbeddingAPI, PromptTemplateAPI
-from .apis import AIStudioLLMAPI, AIStudioEmbeddingAPI
+if TYPE_CHECKING:
+    from .types import Texts, Messages, Embedding, Embeddings
+
+    from .types import Message
+    from .types import ChatUsage, ChatResponse
+    from .types import AccessTokenResponse
+    from .types import EmbeddingUsage, EmbeddingResponse, EmbeddingObject
+    from .types import PromptTemplateResult, PromptTemplateResponse
+    from .types import AIStudioChatUsage, AIStudioChatResult, AIStudioChatResponse
+    from .types import AIStudioEmbeddingObject, AIStudioEmbeddingUsage
+    from .types import AIStudioEmbeddingResult, AIStudioEmbeddingResponse
+
+    from .apis import get_access_token
+    from .apis import LLMAPI, EmbeddingAPI, PromptTemplateAPI
+    from .apis import AIStudioLLMAPI, AIStudioEmbeddingAPI
+
+    from .responses import LazyResponse, ChatCompletion, EmbeddingList
+    from .responses import AIStudioChatCompletion, AIStudioEmbeddingList
+
+    from .encoding import encode_json, gzip_body, request_fingerprint
+
+    from .transports import TransportStats, Transport, RequestsTransport, CassetteTransport
+    from .transports import HTTPXTransport, HTTPXResponse
+    from .transports import get_default_transport, rewrite_url
+
+    from .tokens import TokenStore, MemoryTokenStore, FileTokenStore, token_store_key
+
+    from .aio import AsyncTransport, AsyncHTTPXTransport
+    from .aio import AsyncLLMAPI, AsyncEmbeddingAPI, aget_access_token
+
+    from .streams import ChatStream, StreamAccumulator, BufferedChatStream
+    from .streams import MulticastStream, Subscription, StreamMulticaster
+
+    from .structured import JSONStreamParser, iter_json, aiter_json
+
+    from .session import ChatSession
+
+    from .keepalive import KeepAlive, AsyncKeepAlive
+
+    from .coalesce import SingleFlight, AsyncSingleFlight, CoalescingAPI, AsyncCoalescingAPI
+
+    from .scheduler import Scheduler, ScheduledAPI
+
+    from .batching import AdaptiveBatcher
+
+    from .journal import Journal, JournaledAPI
+
+    from .models import ModelInfo, register_model, get_model, find_model, list_models
+
+    from .deadlines import DeadlineExceeded, deadline, get_deadline, remaining
+
+    from .similarity import normalize, top_k, near_duplicates, mmr
+    from .quantization import truncate, PCA, Int8Embeddings, BinaryEmbeddings, recall_at_k
+
+    from .rag import estimate_tokens, pack_context, RAGAnswer, RAGPipeline
+
+    from .mock import MockServer
+
+    from .server import ProxyServer
+
+    from .ratelimit import RateLimiter
+    from .pool import PooledCredential, CredentialPool, get_error_code
 
 
 __all__ = [
@@ -42,7 +94,259 @@ __all__ = [
     "PromptTemplateAPI",
     "AIStudioLLMAPI",
     "AIStudioEmbeddingAPI",
+    "LazyResponse",
+    "ChatCompletion",
+    "EmbeddingList",
+    "AIStudioChatCompletion",
+    "AIStudioEmbeddingList",
+    "encode_json",
+    "gzip_body",
+    "request_fingerprint",
+    "TransportStats",
+    "Transport",
+    "RequestsTransport",
+    "CassetteTransport",
+    "HTTPXTransport",
+    "HTTPXResponse",
+    "get_default_transport",
+    "rewrite_url",
+    "TokenStore",
+    "MemoryTokenStore",
+    "FileTokenStore",
+    "token_store_key",
+    "AsyncTransport",
+    "AsyncHTTPXTransport",
+    "AsyncLLMAPI",
+    "AsyncEmbeddingAPI",
+    "aget_access_token",
+    "ChatStream",
+    "StreamAccumulator",
+    "BufferedChatStream",
+    "MulticastStream",
+    "Subscription",
+    "StreamMulticaster",
+    "JSONStreamParser",
+    "iter_json",
+    "aiter_json",
+    "ChatSession",
+    "KeepAlive",
+    "AsyncKeepAlive",
+    "SingleFlight",
+    "AsyncSingleFlight",
+    "CoalescingAPI",
+    "AsyncCoalescingAPI",
+    "Scheduler",
+    "ScheduledAPI",
+    "AdaptiveBatcher",
+    "Journal",
+    "JournaledAPI",
+    "ModelInfo",
+    "register_model",
+    "get_model",
+    "find_model",
+    "list_models",
+    "DeadlineExceeded",
+    "deadline",
+    "get_deadline",
+    "remaining",
+    "normalize",
+    "top_k",
+    "near_duplicates",
+    "mmr",
+    "truncate",
+    "PCA",
+    "Int8Embeddings",
+    "BinaryEmbeddings",
+    "recall_at_k",
+    "estimate_tokens",
+    "pack_context",
+    "RAGAnswer",
+    "RAGPipeline",
+    "MockServer",
+    "ProxyServer",
+    "RateLimiter",
+    "PooledCredential",
+    "CredentialPool",
+    "get_error_code",
 ]
 
 
 __version__ = "0.3.0"
+
+
+"""
+Wenxin Workshop SDK.
+
+Submodules are imported on first access of one of their names, so importing
+the package does not import requests, asyncio, or the optional subsystems
+until they are used.
+"""
+
+
+_submodules = {
+    "types": [
+        "Texts",
+        "Messages",
+        "Embedding",
+        "Embeddings",
+        "Message",
+        "ChatUsage",
+        "ChatResponse",
+        "AccessTokenResponse",
+        "EmbeddingUsage",
+        "EmbeddingResponse",
+        "EmbeddingObject",
+        "PromptTemplateResult",
+        "PromptTemplateResponse",
+        "AIStudioChatUsage",
+        "AIStudioChatResult",
+        "AIStudioChatResponse",
+        "AIStudioEmbeddingObject",
+        "AIStudioEmbeddingUsage",
+        "AIStudioEmbeddingResult",
+        "AIStudioEmbeddingResponse",
+    ],
+    "apis": [
+        "get_access_token",
+        "LLMAPI",
+        "EmbeddingAPI",
+        "PromptTemplateAPI",
+        "AIStudioLLMAPI",
+        "AIStudioEmbeddingAPI",
+    ],
+    "responses": [
+        "LazyResponse",
+        "ChatCompletion",
+        "EmbeddingList",
+        "AIStudioChatCompletion",
+        "AIStudioEmbeddingList",
+    ],
+    "encoding": [
+        "encode_json",
+        "gzip_body",
+        "request_fingerprint",
+    ],
+    "transports": [
+        "TransportStats",
+        "Transport",
+        "RequestsTransport",
+        "CassetteTransport",
+        "HTTPXTransport",
+        "HTTPXResponse",
+        "get_default_transport",
+        "rewrite_url",
+    ],
+    "tokens": [
+        "TokenStore",
+        "MemoryTokenStore",
+        "FileTokenStore",
+        "token_store_key",
+    ],
+    "aio": [
+        "AsyncTransport",
+        "AsyncHTTPXTransport",
+        "AsyncLLMAPI",
+        "AsyncEmbeddingAPI",
+        "aget_access_token",
+    ],
+    "streams": [
+        "ChatStream",
+        "StreamAccumulator",
+        "BufferedChatStream",
+        "MulticastStream",
+        "Subscription",
+        "StreamMulticaster",
+    ],
+    "structured": [
+        "JSONStreamParser",
+        "iter_json",
+        "aiter_json",
+    ],
+    "session": [
+        "ChatSession",
+    ],
+    "keepalive": [
+        "KeepAlive",
+        "AsyncKeepAlive",
+    ],
+    "coalesce": [
+        "SingleFlight",
+        "AsyncSingleFlight",
+        "CoalescingAPI",
+        "AsyncCoalescingAPI",
+    ],
+    "scheduler": [
+        "Scheduler",
+        "ScheduledAPI",
+    ],
+    "batching": [
+        "AdaptiveBatcher",
+    ],
+    "journal": [
+        "Journal",
+        "JournaledAPI",
+    ],
+    "models": [
+        "ModelInfo",
+        "register_model",
+        "get_model",
+        "find_model",
+        "list_models",
+    ],
+    "deadlines": [
+        "DeadlineExceeded",
+        "deadline",
+        "get_deadline",
+        "remaining",
+    ],
+    "similarity": [
+        "normalize",
+        "top_k",
+        "near_duplicates",
+        "mmr",
+    ],
+    "quantization": [
+        "truncate",
+        "PCA",
+        "Int8Embeddings",
+        "BinaryEmbeddings",
+        "recall_at_k",
+    ],
+    "rag": [
+        "estimate_tokens",
+        "pack_context",
+        "RAGAnswer",
+        "RAGPipeline",
+    ],
+    "mock": [
+        "MockServer",
+    ],
+    "server": [
+        "ProxyServer",
+    ],
+    "ratelimit": [
+        "RateLimiter",
+    ],
+    "pool": [
+        "PooledCredential",
+        "CredentialPool",
+        "get_error_code",
+    ],
+}
+
+_attributes = {name: module for module, names in _submodules.items() for name in names}
+
+
+def __getattr__(name: str) -> Any:
+    module = _attributes.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    # Cache the name, so the next access does not go through __getattr__.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_attributes))
@@ -0,0 +1,114 @@
+import json
+import asyncio
+import argparse
+
+from typing import Any, Dict, List, Optional
+
+
+"""
+Command line of Wenxin Workshop.
+
+    python -m wenxinworkshop serve --credentials credentials.json --port 8080
+"""
+
+
+def _credentials(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    credentials: List[Dict[str, Any]] = []
+    if args.credentials is not None:
+        with open(args.credentials, "r", encoding="UTF-8") as f:
+            credentials.extend(json.load(f))
+    if args.api_key is not None or args.secret_key is not None:
+        credentials.append({"api_key": args.api_key, "secret_key": args.secret_key})
+    if args.user_id is not None or args.access_token is not None:
+        credentials.append({"user_id": args.user_id, "access_token": args.access_token})
+    return credentials
+
+
+def serve(args: argparse.Namespace) -> None:
+    """
+    Run an OpenAI-compatible proxy server in the foreground.
+    """
+    import requests
+
+    from .server import ProxyServer
+    from .journal import Journal
+    from .transports import RequestsTransport
+
+    credentials = _credentials(args)
+    if not credentials:
+        raise SystemExit(
+            "No credentials: pass --credentials, --api-key and --secret-key, "
+            "or --user-id and --access-token."
+        )
+
+    # One connection per worker, instead of the 10 per host of requests.
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    journal: Optional[Journal] = None
+    if args.journal is not None:
+        journal = Journal(args.journal)
+
+    server = ProxyServer(
+        credentials=credentials,
+        host=args.host,
+        port=args.port,
+        chat_model=args.chat_model,
+        embedding_model=args.embedding_model,
+        transport=RequestsTransport(base_url=args.base_url, session=session),
+        journal=journal,
+        workers=args.workers,
+    )
+
+    async def main() -> None:
+        await server.start()
+        print("Proxy server listening on {}".format(server.base_url), flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m wenxinworkshop", description="Wenxin Workshop SDK."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_serve = commands.add_parser(
+        "serve", help="Run an OpenAI-compatible proxy server."
+    )
+    parser_serve.add_argument("--host", default="127.0.0.1")
+    parser_serve.add_argument("--port", type=int, default=8080)
+    parser_serve.add_argument(
+        "--credentials",
+        help="JSON file with a list of credentials, as in CredentialPool.",
+    )
+    parser_serve.add_argument("--api-key")
+    parser_serve.add_argument("--secret-key")
+    parser_serve.add_argument("--user-id")
+    parser_serve.add_argument("--access-token")
+    parser_serve.add_argument("--chat-model", default="ERNIE-Bot")
+    parser_serve.add_argument("--embedding-model", default="Embedding-V1")
+    parser_serve.add_argument("--workers", type=int, default=32)
+    parser_serve.add_argument(
+        "--journal", help="Journal file recording the embedding responses."
+    )
+    parser_serve.add_argument(
+        "--base-url", help="Send the requests to this server instead, e.g. a mock server."
+    )
+    parser_serve.set_defaults(function=serve)
+
+    args = parser.parse_args(argv)
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,858 @@
+import os
+import asyncio
+import weakref
+import threading
+import contextlib
+
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from .encoding import encode_json
+from .models import ModelInfo, find_model
+from .deadlines import DeadlineExceeded, remaining
+from .transports import Transport, TransportStats, _prewarming, rewrite_url
+from .tokens import TokenStore, token_store_key
+from .responses import ChatCompletion, EmbeddingList
+from .streams import _LineReader, _decode_event
+
+from .types import Messages, Embeddings, Texts
+
+from .types import AccessTokenResponse
+
+
+__all__ = [
+    "AsyncTransport",
+    "AsyncHTTPXTransport",
+    "aget_access_token",
+    "AsyncLLMAPI",
+    "AsyncEmbeddingAPI",
+]
+
+
+"""
+Async APIs of Wenxin Workshop.
+"""
+
+
+class AsyncTransport:
+    """
+    Base class of async HTTP transports.
+
+    Methods
+    -------
+    request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        stream: Optional[bool] = None
+    ) -> httpx.Response:
+        Send a request.
+
+    prewarm(self, url: str) -> None:
+        Open a pooled connection to the host of a URL.
+
+    aclose(self) -> None:
+        Release the resources of the transport.
+    """
+
+    compress_min_size: Optional[int] = None
+
+    stats: TransportStats = Transport.stats  # type: ignore
+
+    prepare_body = Transport.prepare_body
+
+    async def request(
+        self: "AsyncTransport",
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        stream: Optional[bool] = None,
+    ) -> Any:
+        """
+        Send a request.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+
+        url : str
+            URL of the request.
+
+        headers : Optional[Dict[str, str]], optional
+            Headers of the request, by default None.
+
+        params : Optional[Dict[str, Any]], optional
+            Query parameters of the request, by default None.
+
+        data : Optional[bytes], optional
+            Body of the request, by default None.
+
+        stream : Optional[bool], optional
+            Whether to stream the response body, by default None.
+
+        Returns
+        -------
+        httpx.Response
+            Response of the request, to be read with `aread` / `aiter_bytes`.
+        """
+        raise NotImplementedError
+
+    async def prewarm(self: "AsyncTransport", url: str) -> None:
+        """
+        Open a pooled connection to the host of a URL ahead of the first request.
+
+        Sends a HEAD request and ignores its outcome, so the TCP (and TLS)
+        handshake is not paid by the next real request to the same host. The
+        request is only counted in `stats.prewarms`.
+
+        Parameters
+        ----------
+        url : str
+            URL of the host to connect to.
+        """
+        token = _prewarming.set(True)
+        try:
+            response = await self.request(method="HEAD", url=url)
+            await response.aclose()
+        except Exception:
+            pass
+        finally:
+            _prewarming.reset(token)
+        self.stats.add(prewarms=1)
+
+    async def aclose(self: "AsyncTransport") -> None:
+        """
+        Release the resources of the transport.
+        """
+
+    async def __aenter__(self: "AsyncTransport") -> "AsyncTransport":
+        return self
+
+    async def __aexit__(self: "AsyncTransport", *args: Any) -> None:
+        await self.aclose()
+
+
+class AsyncHTTPXTransport(AsyncTransport):
+    """
+    Async transport based on `httpx`, multiplexing requests over HTTP/2.
+
+    Requires `pip install httpx[http2]`.
+
+    Attributes
+    ----------
+    base_url : Optional[str]
+        If set, the scheme and host of every request URL are replaced with
+        the ones of `base_url`.
+
+    http2 : bool
+        Whether to negotiate HTTP/2.
+
+    max_connections : int
+        Maximum number of connections of the pool.
+
+    client : httpx.AsyncClient
+        Client holding the connection pool.
+    """
+
+    def __init__(
+        self: "AsyncHTTPXTransport",
+        base_url: Optional[str] = None,
+        http2: bool = True,
+        max_connections: int = 10,
+        compress_min_size: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize async httpx transport.
+
+        Parameters
+        ----------
+        base_url : Optional[str], optional
+            Base URL to send all requests to, by default None.
+
+        http2 : bool, optional
+            Whether to negotiate HTTP/2, by default True.
+
+        max_connections : int, optional
+            Maximum number of connections of the pool, by default 10.
+
+        compress_min_size : Optional[int], optional
+            Gzip request bodies of at least this many bytes, by default None (never).
+
+        Examples
+        --------
+        >>> from wenxinworkshop import AsyncLLMAPI, AsyncHTTPXTransport
+        >>> transport = AsyncHTTPXTransport(http2=True)
+        >>> erniebot = AsyncLLMAPI(
+        ...     api_key=api_key,
+        ...     secret_key=secret_key,
+        ...     transport=transport
+        ... )
+        """
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError(
+                "AsyncHTTPXTransport requires httpx, please install it by `pip install httpx[http2]`."
+            )
+
+        self.base_url = base_url
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.compress_min_size = compress_min_size
+        self._httpx = httpx
+        self._client: Optional[Any] = None
+        self._pid = os.getpid()
+
+    @property
+    def client(self: "AsyncHTTPXTransport") -> Any:
+        if self._client is None or self._pid != os.getpid():
+            self._client = self._httpx.AsyncClient(
+                http2=self.http2,
+                limits=self._httpx.Limits(max_connections=self.max_connections),
+                timeout=None,
+            )
+            self._pid = os.getpid()
+        return self._client
+
+    def __reduce__(self: "AsyncHTTPXTransport") -> Any:
+        return (
+            self.__class__,
+            (self.base_url, self.http2, self.max_connections, self.compress_min_size),
+        )
+
+    async def request(
+        self: "AsyncHTTPXTransport",
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        stream: Optional[bool] = None,
+    ) -> Any:
+        timeout = remaining()
+        headers, data = self.prepare_body(headers, data)
+
+        request = self.client.build_request(
+            method=method,
+            url=rewrite_url(url, self.base_url),
+            headers=headers,
+            params=params,
+            content=data,
+            **({} if timeout is None else {"timeout": timeout}),
+        )
+        try:
+            response = await self.client.send(request, stream=bool(stream))
+        except self._httpx.TimeoutException as e:
+            raise DeadlineExceeded(str(e)) from e
+
+        if not stream:
+            self.stats.add(
+                bytes_received=response.num_bytes_downloaded,
+                bytes_received_decoded=len(response.content),
+            )
+
+        return response
+
+    async def aclose(self: "AsyncHTTPXTransport") -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# In-process waiters of each token store key, per event loop: only the
+# coroutine holding one of these waits on the store lock itself.
+_token_store_waiters: "weakref.WeakKeyDictionary[Any, Dict[Tuple[int, str], asyncio.Lock]]"
+_token_store_waiters = weakref.WeakKeyDictionary()
+
+
+def _resolve(future: "asyncio.Future[None]", error: Optional[BaseException] = None) -> None:
+    if not future.done():
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+
+@contextlib.asynccontextmanager
+async def _token_store_lock(token_store: TokenStore, key: str) -> AsyncIterator[None]:
+    # Token store locks block (e.g. flock) and belong to the thread which
+    # acquired them, so a dedicated thread acquires the lock, holds it while
+    # the coroutine runs and releases it. The default executor is left free
+    # for the OAuth request itself (e.g. getaddrinfo).
+    loop = asyncio.get_running_loop()
+    waiters = _token_store_waiters.setdefault(loop, {})
+    waiter = waiters.setdefault((id(token_store), key), asyncio.Lock())
+
+    async with waiter:
+        acquired = loop.create_future()
+        released = loop.create_future()
+        release = threading.Event()
+
+        def hold() -> None:
+            try:
+                with token_store.lock(key):
+                    loop.call_soon_threadsafe(_resolve, acquired)
+                    release.wait()
+            except BaseException as e:
+                loop.call_soon_threadsafe(_resolve, acquired, e)
+            finally:
+                loop.call_soon_threadsafe(_resolve, released)
+
+        threading.Thread(
+            target=hold, name="wenxinworkshop-token-store-lock", daemon=True
+        ).start()
+        try:
+            await acquired
+            yield
+        finally:
+            release.set()
+            await asyncio.shield(released)
+
+
+async def aget_access_token(
+    api_key: str,
+    secret_key: str,
+    transport: AsyncTransport,
+    token_store: Optional[TokenStore] = None,
+) -> str:
+    """
+    Get access token from Baidu AI Cloud asynchronously.
+
+    Parameters
+    ----------
+    api_key : str
+        API key from Baidu AI Cloud.
+    secret_key : str
+        Secret key from Baidu AI Cloud.
+    transport : AsyncTransport
+        Transport to send the request with.
+    token_store : Optional[TokenStore], optional
+        Store to share the access token through, by default None (always request a new token).
+
+    Returns
+    -------
+    str
+        Access token from Baidu AI Cloud.
+
+    Raises
+    ------
+    ValueError
+        If request failed. Please check your API key and secret key.
+    """
+    if token_store is None:
+        response_json = await _arequest_access_token(api_key, secret_key, transport)
+        return response_json["access_token"]
+
+    key = token_store_key(api_key, secret_key)
+    access_token = token_store.get(key)
+    if access_token is not None:
+        return access_token
+
+    # The lock is held across the OAuth call, as in `get_access_token`, so
+    # concurrent cold starts sharing a store make a single call; the store
+    # is checked again once locked, as another caller may have filled it.
+    async with _token_store_lock(token_store, key):
+        access_token = token_store.get(key)
+        if access_token is None:
+            response_json = await _arequest_access_token(api_key, secret_key, transport)
+            access_token = response_json["access_token"]
+            token_store.set(key, access_token, response_json.get("expires_in", 2592000))
+        return access_token
+
+
+async def _arequest_access_token(
+    api_key: str, secret_key: str, transport: AsyncTransport
+) -> AccessTokenResponse:
+    response = await transport.request(
+        method="POST",
+        url="https://aip.baidubce.com/oauth/2.0/token",
+        headers={"Content-Type": "application/json", "Accept": "application/json"},
+        params={
+            "grant_type": "client_credentials",
+            "client_id": api_key,
+            "client_secret": secret_key,
+        },
+    )
+
+    try:
+        response_json: AccessTokenResponse = response.json()
+    except:
+        raise ValueError(response.text)
+
+    if not isinstance(response_json, dict) or "access_token" not in response_json:
+        raise ValueError(response.text)
+
+    return response_json
+
+
+class AsyncLLMAPI:
+    """
+    Async LLM API.
+
+    The access token is requested on the first call.
+
+    Attributes
+    ----------
+    url : str
+        URL of LLM API.
+
+    access_token : Optional[str]
+        Access token from Baidu AI Cloud, None before the first call.
+
+    transport : AsyncTransport
+        Transport to send requests with.
+
+    token_store : Optional[TokenStore]
+        Store the access token is shared through.
+
+    model_info : Optional[ModelInfo]
+        Registered model of the endpoint, None if it is not registered.
+
+    Methods
+    -------
+    __init__(
+        self,
+        api_key: str,
+        secret_key: str,
+        url: str = LLMAPI.ERNIEBot,
+        transport: Optional[AsyncTransport] = None,
+        token_store: Optional[TokenStore] = None
+    ) -> None:
+        Initialize async LLM API.
+
+    get_access_token(self) -> str:
+        Get the access token, requesting it if needed.
+
+    prewarm(self) -> None:
+        Open a connection to the API ahead of the first request.
+
+    __call__(
+        self,
+        messages: Messages,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        penalty_score: Optional[float] = None,
+        stream: Optional[bool] = None,
+        user_id: Optional[str] = None
+    ) -> Union[str, AsyncGenerator[str, None]]:
+        Get response from LLM API.
+    """
+
+    ERNIEBot = (
+        "https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/completions"
+    )
+    ERNIEBot_turbo = (
+        "https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/eb-instant"
+    )
+
+    def __init__(
+        self: "AsyncLLMAPI",
+        api_key: str,
+        secret_key: str,
+        url: str = ERNIEBot,
+        transport: Optional[AsyncTransport] = None,
+        token_store: Optional[TokenStore] = None,
+    ) -> None:
+        """
+        Initialize async LLM API.
+
+        Parameters
+        ----------
+        api_key : str
+            API key from Baidu AI Cloud.
+
+        secret_key : str
+            Secret key from Baidu AI Cloud.
+
+        url : str, optional
+            URL of LLM API, by default AsyncLLMAPI.ERNIEBot.
+
+        transport : Optional[AsyncTransport], optional
+            Transport to send requests with, by default a new AsyncHTTPXTransport.
+
+        token_store : Optional[TokenStore], optional
+            Store to share the access token through, by default None.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import AsyncLLMAPI
+        >>> erniebot = AsyncLLMAPI(
+        ...     api_key=api_key,
+        ...     secret_key=secret_key,
+        ...     url=AsyncLLMAPI.ERNIEBot
+        ... )
+        """
+        self.url = url
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.transport = transport if transport is not None else AsyncHTTPXTransport()
+        self.token_store = token_store
+        self.access_token: Optional[str] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def model_info(self: "AsyncLLMAPI") -> Optional[ModelInfo]:
+        return find_model(self.url)
+
+    async def prewarm(self: "AsyncLLMAPI") -> None:
+        """
+        Open a connection to the API ahead of the first request.
+
+        The first request after idle then finds a warm socket instead of
+        paying DNS, TCP and TLS setup, e.g. before a streaming chat request.
+        See KeepAlive to keep connections warm.
+
+        Examples
+        --------
+        >>> await erniebot.prewarm()
+        """
+        await self.transport.prewarm(self.url)
+
+    def __getstate__(self: "AsyncLLMAPI") -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_token_lock"] = None
+        return state
+
+    async def get_access_token(self: "AsyncLLMAPI") -> str:
+        """
+        Get the access token, requesting it if needed.
+
+        Returns
+        -------
+        str
+            Access token from Baidu AI Cloud.
+        """
+        if self.access_token is None:
+            if self._token_lock is None:
+                self._token_lock = asyncio.Lock()
+            async with self._token_lock:
+                if self.access_token is None:
+                    self.access_token = await aget_access_token(
+                        api_key=self.api_key,
+                        secret_key=self.secret_key,
+                        transport=self.transport,
+                        token_store=self.token_store,
+                    )
+        return self.access_token
+
+    async def __call__(
+        self: "AsyncLLMAPI",
+        messages: Messages,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        penalty_score: Optional[float] = None,
+        stream: Optional[bool] = None,
+        user_id: Optional[str] = None,
+        full_response: bool = False,
+        functions: Optional[List[Dict[str, Any]]] = None,
+    ) -> Union[str, ChatCompletion, AsyncGenerator[str, None]]:
+        """
+        Get response from LLM API.
+
+        Parameters
+        ----------
+        messages : Messages
+            Messages from user and assistant.
+
+        temperature : Optional[float], optional
+            Temperature of LLM API, by default None.
+
+        top_p : Optional[float], optional
+            Top p of LLM API, by default None.
+
+        penalty_score : Optional[float], optional
+            Penalty score of LLM API, by default None.
+
+        stream : Optional[bool], optional
+            Stream of LLM API, by default None.
+
+        user_id : Optional[str], optional
+            User ID of LLM API, by default None.
+
+        full_response : bool, optional
+            Whether to return a ChatCompletion with the metadata of the
+            response instead of the result only, by default False.
+
+        functions : Optional[List[Dict[str, Any]]], optional
+            Functions the model can call (name, description, parameters as a
+            JSON schema, ...), by default None. A function call is returned
+            in the `function_call` field of the full response.
+
+        Returns
+        -------
+        Union[str, ChatCompletion, AsyncGenerator[str, None]]
+            Response from LLM API.
+
+        Raises
+        ------
+        ValueError
+            If request failed. Please check your API key and secret key. Or check the parameters.
+
+        Examples
+        --------
+        >>> response = await erniebot(messages=messages)
+
+        >>> response_stream = await erniebot(messages=messages, stream=True)
+        >>> async for item in response_stream:
+        ...     print(item, end='')
+        """
+        headers = {"Content-Type": "application/json"}
+
+        params = {"access_token": await self.get_access_token()}
+
+        data = {
+            "messages": messages,
+            "temperature": temperature,
+            "top_p": top_p,
+            "penalty_score": penalty_score,
+            "stream": stream,
+            "user_id": user_id,
+            "functions": functions,
+        }
+
+        response = await self.transport.request(
+            method="POST",
+            url=self.url,
+            headers=headers,
+            params=params,
+            data=encode_json(data),
+            stream=stream,
+        )
+
+        if stream:
+            return self.stream_response(response=response)
+        else:
+            completion = ChatCompletion(response.content)
+            return completion if full_response else completion.result
+
+    @staticmethod
+    async def stream_response(response: Any) -> AsyncGenerator[str, None]:
+        """
+        Stream response from LLM API.
+
+        Parameters
+        ----------
+        response : httpx.Response
+            Streaming response from LLM API.
+
+        Yields
+        -------
+        AsyncGenerator[str, None]
+            Response from LLM API.
+
+        Raises
+        ------
+        ValueError
+            If request failed. Please check your API key and secret key. Or check the parameters.
+        """
+        chunks = response.aiter_bytes().__aiter__()
+        reader = _LineReader()
+        try:
+            while True:
+                # Each read only gets the time left of the current deadline.
+                try:
+                    data = await asyncio.wait_for(chunks.__anext__(), remaining())
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError as e:
+                    raise DeadlineExceeded("Deadline exceeded.") from e
+                for response_line in reader.feed(data):
+                    yield _decode_event(response_line)
+            for response_line in reader.close():
+                yield _decode_event(response_line)
+        finally:
+            await response.aclose()
+
+
+class AsyncEmbeddingAPI:
+    """
+    Async Embedding API.
+
+    The access token is requested on the first call.
+
+    Attributes
+    ----------
+    url : str
+        URL of Embedding API.
+
+    access_token : Optional[str]
+        Access token from Baidu AI Cloud, None before the first call.
+
+    transport : AsyncTransport
+        Transport to send requests with.
+
+    token_store : Optional[TokenStore]
+        Store the access token is shared through.
+
+    model_info : Optional[ModelInfo]
+        Registered model of the endpoint, None if it is not registered.
+
+    Methods
+    -------
+    __init__(
+        self,
+        api_key: str,
+        secret_key: str,
+        url: str = AsyncEmbeddingAPI.EmbeddingV1,
+        transport: Optional[AsyncTransport] = None,
+        token_store: Optional[TokenStore] = None
+    ) -> None:
+        Initialize async Embedding API.
+
+    get_access_token(self) -> str:
+        Get the access token, requesting it if needed.
+
+    prewarm(self) -> None:
+        Open a connection to the API ahead of the first request.
+
+    __call__(
+        self,
+        texts: Texts,
+        user_id: Optional[str] = None
+    ) -> Embeddings:
+        Get embeddings from Embedding API.
+    """
+
+    EmbeddingV1 = "https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/embeddings/embedding-v1"
+
+    def __init__(
+        self: "AsyncEmbeddingAPI",
+        api_key: str,
+        secret_key: str,
+        url: str = EmbeddingV1,
+        transport: Optional[AsyncTransport] = None,
+        token_store: Optional[TokenStore] = None,
+    ) -> None:
+        """
+        Initialize async Embedding API.
+
+        Parameters
+        ----------
+        api_key : str
+            API key from Baidu AI Cloud.
+
+        secret_key : str
+            Secret key from Baidu AI Cloud.
+
+        url : str, optional
+            URL of Embedding API, by default AsyncEmbeddingAPI.EmbeddingV1.
+
+        transport : Optional[AsyncTransport], optional
+            Transport to send requests with, by default a new AsyncHTTPXTransport.
+
+        token_store : Optional[TokenStore], optional
+            Store to share the access token through, by default None.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import AsyncEmbeddingAPI
+        >>> ernieembedding = AsyncEmbeddingAPI(
+        ...     api_key=api_key,
+        ...     secret_key=secret_key
+        ... )
+        """
+        self.url = url
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.transport = transport if transport is not None else AsyncHTTPXTransport()
+        self.token_store = token_store
+        self.access_token: Optional[str] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def model_info(self: "AsyncEmbeddingAPI") -> Optional[ModelInfo]:
+        return find_model(self.url)
+
+    async def prewarm(self: "AsyncEmbeddingAPI") -> None:
+        """
+        Open a connection to the API ahead of the first request.
+
+        Examples
+        --------
+        >>> await ernieembedding.prewarm()
+        """
+        await self.transport.prewarm(self.url)
+
+    def __getstate__(self: "AsyncEmbeddingAPI") -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_token_lock"] = None
+        return state
+
+    async def get_access_token(self: "AsyncEmbeddingAPI") -> str:
+        """
+        Get the access token, requesting it if needed.
+
+        Returns
+        -------
+        str
+            Access token from Baidu AI Cloud.
+        """
+        if self.access_token is None:
+            if self._token_lock is None:
+                self._token_lock = asyncio.Lock()
+            async with self._token_lock:
+                if self.access_token is None:
+                    self.access_token = await aget_access_token(
+                        api_key=self.api_key,
+                        secret_key=self.secret_key,
+                        transport=self.transport,
+                        token_store=self.token_store,
+                    )
+        return self.access_token
+
+    async def __call__(
+        self: "AsyncEmbeddingAPI",
+        texts: Texts,
+        user_id: Optional[str] = None,
+        full_response: bool = False,
+    ) -> Union[Embeddings, EmbeddingList]:
+        """
+        Get embeddings from Embedding API.
+
+        Parameters
+        ----------
+        texts : Texts
+            Texts of inputs.
+
+        user_id : Optional[str], optional
+            User ID of Embedding API, by default None.
+
+        full_response : bool, optional
+            Whether to return an EmbeddingList with the metadata of the
+            response instead of the embeddings only, by default False.
+
+        Returns
+        -------
+        Union[Embeddings, EmbeddingList]
+            Embeddings from Embedding API.
+
+        Raises
+        ------
+        ValueError
+            If request failed. Please check your API key and secret key. Or check the parameters.
+
+        Examples
+        --------
+        >>> response = await ernieembedding(texts=['你好！', '你好吗？'])
+        """
+        headers = {"Content-Type": "application/json"}
+
+        params = {"access_token": await self.get_access_token()}
+
+        data = {"input": texts, "user_id": user_id}
+
+        response = await self.transport.request(
+            method="POST",
+            url=self.url,
+            headers=headers,
+            params=params,
+            data=encode_json(data),
+        )
+
+        embedding_list = EmbeddingList(response.content)
+        return embedding_list if full_response else embedding_list.embeddings
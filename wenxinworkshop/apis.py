@@ -1,18 +1,26 @@
-import json
-import requests
+import re
 
-from typing import Dict
-from typing import Optional, Generator, Union
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Any, Dict, Iterable, List, Tuple
+from typing import TYPE_CHECKING, Optional, Generator, Union
+
+from .encoding import encode_json
+from .models import ModelInfo, find_model
+from .streams import ChatStream, _decode_event, _iter_lines
+from .responses import ChatCompletion, EmbeddingList
+from .responses import AIStudioChatCompletion, AIStudioEmbeddingList
+from .transports import Transport, get_default_transport
+from .tokens import TokenStore, token_store_key
 
 from .types import Messages, Embeddings, Texts
 
 from .types import Message
-from .types import ChatResponse
-from .types import EmbeddingResponse
 from .types import AccessTokenResponse
-from .types import PromptTemplateResponse
-from .types import AIStudioChatResponse
-from .types import AIStudioEmbeddingResponse
+from .types import PromptTemplateResult, PromptTemplateResponse
+
+if TYPE_CHECKING:
+    import requests
 
 
 __all__ = [
@@ -30,7 +38,12 @@ APIs of Wenxin Workshop.
 """
 
 
-def get_access_token(api_key: str, secret_key: str) -> str:
+def get_access_token(
+    api_key: str,
+    secret_key: str,
+    transport: Optional[Transport] = None,
+    token_store: Optional[TokenStore] = None,
+) -> str:
     """
     Get access token from Baidu AI Cloud.
 
@@ -40,6 +53,10 @@ def get_access_token(api_key: str, secret_key: str) -> str:
         API key from Baidu AI Cloud.
     secret_key : str
         Secret key from Baidu AI Cloud.
+    transport : Optional[Transport], optional
+        Transport to send the request with, by default the default transport.
+    token_store : Optional[TokenStore], optional
+        Store to share the access token through, by default None (always request a new token).
 
     Returns
     -------
@@ -73,14 +90,42 @@ def get_access_token(api_key: str, secret_key: str) -> str:
         "client_secret": secret_key,
     }
 
-    response = requests.request(method="POST", url=url, headers=headers, params=params)
+    if transport is None:
+        transport = get_default_transport()
+
+    if token_store is None:
+        return _request_access_token(url, headers, params, transport)["access_token"]
+
+    key = token_store_key(api_key, secret_key)
+
+    with token_store.lock(key):
+        access_token = token_store.get(key)
+
+        if access_token is None:
+            response_json = _request_access_token(url, headers, params, transport)
+            access_token = response_json["access_token"]
+            token_store.set(
+                key, access_token, response_json.get("expires_in", 2592000)
+            )
+
+        return access_token
+
+
+def _request_access_token(
+    url: str, headers: Dict[str, str], params: Dict[str, str], transport: Transport
+) -> AccessTokenResponse:
+    response = transport.request(method="POST", url=url, headers=headers, params=params)
 
     try:
         response_json: AccessTokenResponse = response.json()
-        return response_json["access_token"]
     except:
         raise ValueError(response.text)
 
+    if not isinstance(response_json, dict) or "access_token" not in response_json:
+        raise ValueError(response.text)
+
+    return response_json
+
 
 class LLMAPI:
     """
@@ -94,22 +139,39 @@ class LLMAPI:
     access_token : str
         Access token from Baidu AI Cloud.
 
+    transport : Transport
+        Transport to send requests with.
+
+    token_store : Optional[TokenStore]
+        Store the access token is shared through.
+
     ERNIEBot : str
         URL of ERNIEBot LLM API.
 
     ERNIEBot_turbo : str
         URL of ERNIEBot turbo LLM API.
 
+    model_info : Optional[ModelInfo]
+        Registered model of the endpoint, None if it is not registered.
+
     Methods
     -------
     __init__(
         self,
         api_key: str,
         secret_key: str,
-        url: str = LLMAPI.ERNIEBot
+        url: str = LLMAPI.ERNIEBot,
+        transport: Optional[Transport] = None,
+        token_store: Optional[TokenStore] = None
     ) -> None:
         Initialize LLM API.
 
+    refresh_access_token(self) -> str:
+        Replace the access token.
+
+    prewarm(self) -> None:
+        Open a connection to the API ahead of the first request.
+
     __call__(
         self,
         messages: Messages,
@@ -118,10 +180,20 @@ class LLMAPI:
         penalty_score: Optional[float] = None,
         stream: Optional[bool] = None,
         user_id: Optional[str] = None,
-        chunk_size: int = 512
-    ) -> Union[str, Generator[str, None, None]]:
+        chunk_size: int = 512,
+        stop: Optional[List[str]] = None
+    ) -> Union[str, ChatStream]:
         Get response from LLM API.
 
+    send(
+        self,
+        data: bytes,
+        stream: Optional[bool] = None,
+        chunk_size: int = 512,
+        stop: Optional[List[str]] = None
+    ) -> Union[str, ChatStream]:
+        Send an encoded request body to LLM API.
+
     stream_response(
         response: requests.Response,
         chunk_size: int = 512
@@ -137,7 +209,12 @@ class LLMAPI:
     )
 
     def __init__(
-        self: "LLMAPI", api_key: str, secret_key: str, url: str = ERNIEBot
+        self: "LLMAPI",
+        api_key: str,
+        secret_key: str,
+        url: str = ERNIEBot,
+        transport: Optional[Transport] = None,
+        token_store: Optional[TokenStore] = None,
     ) -> None:
         """
         Initialize LLM API.
@@ -153,6 +230,12 @@ class LLMAPI:
         url : Optional[str], optional
             URL of LLM API, by default LLMAPI.ERNIEBot. You can also use LLMAPI.ERNIEBot_turbo or other LLM API urls.
 
+        transport : Optional[Transport], optional
+            Transport to send requests with, by default the default transport.
+
+        token_store : Optional[TokenStore], optional
+            Store to share the access token through, e.g. between processes, by default None.
+
         Examples
         --------
         >>> from wenxinworkshop import LLMAPI
@@ -165,7 +248,59 @@ class LLMAPI:
         ... )
         """
         self.url = url
-        self.access_token = get_access_token(api_key=api_key, secret_key=secret_key)
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.transport = transport if transport is not None else get_default_transport()
+        self.token_store = token_store
+        self.access_token = get_access_token(
+            api_key=api_key,
+            secret_key=secret_key,
+            transport=self.transport,
+            token_store=self.token_store,
+        )
+
+    @property
+    def model_info(self: "LLMAPI") -> Optional[ModelInfo]:
+        return find_model(self.url)
+
+    def prewarm(self: "LLMAPI") -> None:
+        """
+        Open a connection to the API ahead of the first request.
+
+        The first request after idle then finds a warm socket instead of
+        paying DNS, TCP and TLS setup, e.g. before a streaming chat request.
+        See KeepAlive to keep connections warm.
+
+        Examples
+        --------
+        >>> erniebot.prewarm()
+        """
+        self.transport.prewarm(self.url)
+
+    def refresh_access_token(self: "LLMAPI") -> str:
+        """
+        Replace the access token, e.g. after it expired.
+
+        The token is also invalidated in the token store, unless another
+        client already replaced it there.
+
+        Returns
+        -------
+        str
+            New access token.
+        """
+        if self.token_store is not None:
+            key = token_store_key(self.api_key, self.secret_key)
+            with self.token_store.lock(key):
+                self.token_store.invalidate(key, self.access_token)
+
+        self.access_token = get_access_token(
+            api_key=self.api_key,
+            secret_key=self.secret_key,
+            transport=self.transport,
+            token_store=self.token_store,
+        )
+        return self.access_token
 
     def __call__(
         self: "LLMAPI",
@@ -176,7 +311,10 @@ class LLMAPI:
         stream: Optional[bool] = None,
         user_id: Optional[str] = None,
         chunk_size: int = 512,
-    ) -> Union[str, Generator[str, None, None]]:
+        stop: Optional[List[str]] = None,
+        full_response: bool = False,
+        functions: Optional[List[Dict[str, Any]]] = None,
+    ) -> Union[str, ChatCompletion, ChatStream]:
         """
         Get response from LLM API.
 
@@ -203,10 +341,23 @@ class LLMAPI:
         chunk_size : int, optional
             Chunk size of LLM API, by default 512.
 
+        stop : Optional[List[str]], optional
+            Stop sequences, detected on the client side, by default None.
+            The response ends before the first stop sequence.
+
+        full_response : bool, optional
+            Whether to return a ChatCompletion with the metadata of the
+            response (id, usage, ...) instead of the result only, by default False.
+
+        functions : Optional[List[Dict[str, Any]]], optional
+            Functions the model can call (name, description, parameters as a
+            JSON schema, ...), by default None. A function call is returned
+            in the `function_call` field of the full response.
+
         Returns
         -------
-        Union[str, Generator[str, None, None]]
-            Response from LLM API.
+        Union[str, ChatCompletion, ChatStream]
+            Response from LLM API. A cancellable ChatStream of chunks if stream is True.
 
         Raises
         ------
@@ -248,10 +399,6 @@ class LLMAPI:
         ...     print(item, end='')
         你好，有什么可以帮助你的。
         """
-        headers = {"Content-Type": "application/json"}
-
-        params = {"access_token": self.access_token}
-
         data = {
             "messages": messages,
             "temperature": temperature,
@@ -259,29 +406,78 @@ class LLMAPI:
             "penalty_score": penalty_score,
             "stream": stream,
             "user_id": user_id,
+            "functions": functions,
         }
 
-        response = requests.request(
+        return self.send(
+            data=encode_json(data),
+            stream=stream,
+            chunk_size=chunk_size,
+            stop=stop,
+            full_response=full_response,
+        )
+
+    def send(
+        self: "LLMAPI",
+        data: bytes,
+        stream: Optional[bool] = None,
+        chunk_size: int = 512,
+        stop: Optional[List[str]] = None,
+        full_response: bool = False,
+    ) -> Union[str, ChatCompletion, ChatStream]:
+        """
+        Send an encoded request body to LLM API.
+
+        Parameters
+        ----------
+        data : bytes
+            JSON request body, as built by `__call__`.
+
+        stream : Optional[bool], optional
+            Whether the body requests a streaming response, by default None.
+
+        chunk_size : int, optional
+            Chunk size of LLM API, by default 512.
+
+        stop : Optional[List[str]], optional
+            Stop sequences, detected on the client side, by default None.
+
+        full_response : bool, optional
+            Whether to return a ChatCompletion instead of the result only, by default False.
+
+        Returns
+        -------
+        Union[str, ChatCompletion, ChatStream]
+            Response from LLM API.
+
+        Raises
+        ------
+        ValueError
+            If request failed. Please check your API key and secret key. Or check the parameters.
+        """
+        headers = {"Content-Type": "application/json"}
+
+        params = {"access_token": self.access_token}
+
+        response = self.transport.request(
             method="POST",
             url=self.url,
             headers=headers,
             params=params,
-            data=json.dumps(data),
+            data=data,
             stream=stream,
         )
 
         if stream:
-            return self.stream_response(response=response, chunk_size=chunk_size)
+            return ChatStream(response=response, chunk_size=chunk_size, stop=stop)
         else:
-            try:
-                response_json: ChatResponse = response.json()
-                return response_json["result"]
-            except:
-                raise ValueError(response.text)
+            # Only the result is decoded, the rest of the body on demand.
+            completion = ChatCompletion(response.content, stop=stop)
+            return completion if full_response else completion.result
 
     @staticmethod
     def stream_response(
-        response: requests.Response, chunk_size: int = 512
+        response: "requests.Response", chunk_size: int = 512
     ) -> Generator[str, None, None]:
         """
         Stream response from LLM API.
@@ -315,15 +511,8 @@ class LLMAPI:
         ...     print(item, end='')
         你好，有什么可以帮助你的。
         """
-        for response_line in response.iter_lines(
-            chunk_size=chunk_size, decode_unicode=True
-        ):
-            if response_line:
-                try:
-                    response_json: ChatResponse = json.loads(response_line[5:])
-                    yield response_json["result"]
-                except:
-                    raise ValueError(response_line)
+        for response_line in _iter_lines(response.iter_content(chunk_size=chunk_size)):
+            yield _decode_event(response_line)
 
 
 class EmbeddingAPI:
@@ -338,19 +527,36 @@ class EmbeddingAPI:
     access_token : str
         Access token from Baidu AI Cloud.
 
+    transport : Transport
+        Transport to send requests with.
+
+    token_store : Optional[TokenStore]
+        Store the access token is shared through.
+
     EmbeddingV1 : str
         URL of Embedding V1 API.
 
+    model_info : Optional[ModelInfo]
+        Registered model of the endpoint, None if it is not registered.
+
     Methods
     -------
     __init__(
         self,
         api_key: str,
         secret_key: str,
-        url: str = EmbeddingAPI.EmbeddingV1
+        url: str = EmbeddingAPI.EmbeddingV1,
+        transport: Optional[Transport] = None,
+        token_store: Optional[TokenStore] = None
     ) -> None:
         Initialize Embedding API.
 
+    refresh_access_token(self) -> str:
+        Replace the access token.
+
+    prewarm(self) -> None:
+        Open a connection to the API ahead of the first request.
+
     __call__(
         self,
         texts: Texts,
@@ -362,7 +568,12 @@ class EmbeddingAPI:
     EmbeddingV1 = "https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/embeddings/embedding-v1"
 
     def __init__(
-        self: "EmbeddingAPI", api_key: str, secret_key: str, url: str = EmbeddingV1
+        self: "EmbeddingAPI",
+        api_key: str,
+        secret_key: str,
+        url: str = EmbeddingV1,
+        transport: Optional[Transport] = None,
+        token_store: Optional[TokenStore] = None,
     ) -> None:
         """
         Initialize Embedding API.
@@ -378,6 +589,12 @@ class EmbeddingAPI:
         url : Optional[str], optional
             URL of Embedding API, by default EmbeddingAPI.EmbeddingV1. You can also use other Embedding API urls.
 
+        transport : Optional[Transport], optional
+            Transport to send requests with, by default the default transport.
+
+        token_store : Optional[TokenStore], optional
+            Store to share the access token through, e.g. between processes, by default None.
+
         Examples
         --------
         >>> from wenxinworkshop import EmbeddingAPI
@@ -390,11 +607,62 @@ class EmbeddingAPI:
         ... )
         """
         self.url = url
-        self.access_token = get_access_token(api_key=api_key, secret_key=secret_key)
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.transport = transport if transport is not None else get_default_transport()
+        self.token_store = token_store
+        self.access_token = get_access_token(
+            api_key=api_key,
+            secret_key=secret_key,
+            transport=self.transport,
+            token_store=self.token_store,
+        )
+
+    @property
+    def model_info(self: "EmbeddingAPI") -> Optional[ModelInfo]:
+        return find_model(self.url)
+
+    def prewarm(self: "EmbeddingAPI") -> None:
+        """
+        Open a connection to the API ahead of the first request.
+
+        Examples
+        --------
+        >>> ernieembedding.prewarm()
+        """
+        self.transport.prewarm(self.url)
+
+    def refresh_access_token(self: "EmbeddingAPI") -> str:
+        """
+        Replace the access token, e.g. after it expired.
+
+        The token is also invalidated in the token store, unless another
+        client already replaced it there.
+
+        Returns
+        -------
+        str
+            New access token.
+        """
+        if self.token_store is not None:
+            key = token_store_key(self.api_key, self.secret_key)
+            with self.token_store.lock(key):
+                self.token_store.invalidate(key, self.access_token)
+
+        self.access_token = get_access_token(
+            api_key=self.api_key,
+            secret_key=self.secret_key,
+            transport=self.transport,
+            token_store=self.token_store,
+        )
+        return self.access_token
 
     def __call__(
-        self: "EmbeddingAPI", texts: Texts, user_id: Optional[str] = None
-    ) -> Embeddings:
+        self: "EmbeddingAPI",
+        texts: Texts,
+        user_id: Optional[str] = None,
+        full_response: bool = False,
+    ) -> Union[Embeddings, EmbeddingList]:
         """
         Get embeddings from Embedding API.
 
@@ -406,9 +674,13 @@ class EmbeddingAPI:
         user_id : Optional[str], optional
             User ID of Embedding API, by default None.
 
+        full_response : bool, optional
+            Whether to return an EmbeddingList with the metadata of the
+            response (id, usage, ...) instead of the embeddings only, by default False.
+
         Returns
         -------
-        Embeddings
+        Union[Embeddings, EmbeddingList]
             Embeddings from Embedding API.
 
         Raises
@@ -438,22 +710,16 @@ class EmbeddingAPI:
 
         data = {"input": texts, "user_id": user_id}
 
-        response = requests.request(
+        response = self.transport.request(
             method="POST",
             url=self.url,
             headers=headers,
             params=params,
-            data=json.dumps(data),
+            data=encode_json(data),
         )
 
-        try:
-            response_json: EmbeddingResponse = response.json()
-            embeddings: Embeddings = [
-                embedding["embedding"] for embedding in response_json["data"]
-            ]
-            return embeddings
-        except:
-            raise ValueError(response.text)
+        embedding_list = EmbeddingList(response.content)
+        return embedding_list if full_response else embedding_list.embeddings
 
 
 class PromptTemplateAPI:
@@ -468,6 +734,15 @@ class PromptTemplateAPI:
     access_token : str
         Access token from Baidu AI Cloud.
 
+    transport : Transport
+        Transport to send requests with.
+
+    token_store : Optional[TokenStore]
+        Store the access token is shared through.
+
+    templates : Dict[str, PromptTemplateResult]
+        Prefetched templates, rendered on the client side, by template ID.
+
     PromptTemplate : str
         URL of Prompt Template API.
 
@@ -477,16 +752,38 @@ class PromptTemplateAPI:
         self,
         api_key: str,
         secret_key: str,
-        url: str = PromptTemplate
+        url: str = PromptTemplate,
+        transport: Optional[Transport] = None,
+        token_store: Optional[TokenStore] = None,
+        prefetch: Optional[Iterable[int]] = None
     ) -> None:
         Initialize Prompt Template API.
 
+    refresh_access_token(self) -> str:
+        Replace the access token.
+
     __call__(
         self,
         template_id: int,
         **kwargs: str
     ) -> str:
         Get prompt template from Prompt Template API.
+
+    get_template(self, template_id: int) -> PromptTemplateResult:
+        Get a template without rendering it.
+
+    prefetch(self, template_ids: Iterable[int], max_workers: int = 8) -> None:
+        Fetch templates, to render them on the client side.
+
+    render(self, template_id: int, **kwargs: str) -> str:
+        Render a template, on the client side if it is prefetched.
+
+    render_many(
+        self,
+        items: Iterable[Tuple[int, Dict[str, str]]],
+        max_workers: int = 8
+    ) -> List[str]:
+        Render many templates concurrently.
     """
 
     PromptTemplate = (
@@ -498,6 +795,9 @@ class PromptTemplateAPI:
         api_key: str,
         secret_key: str,
         url: str = PromptTemplate,
+        transport: Optional[Transport] = None,
+        token_store: Optional[TokenStore] = None,
+        prefetch: Optional[Iterable[int]] = None,
     ) -> None:
         """
         Initialize Prompt Template API.
@@ -513,6 +813,16 @@ class PromptTemplateAPI:
         url : Optional[str], optional
             URL of Prompt Template API, by default PromptTemplateAPI.PromptTemplate. You can also use other Prompt Template API urls.
 
+        transport : Optional[Transport], optional
+            Transport to send requests with, by default the default transport.
+
+        token_store : Optional[TokenStore], optional
+            Store to share the access token through, e.g. between processes, by default None.
+
+        prefetch : Optional[Iterable[int]], optional
+            IDs of the templates to fetch now and render on the client side,
+            by default none.
+
         Examples
         --------
         >>> from wenxinworkshop import PromptTemplateAPI
@@ -525,7 +835,45 @@ class PromptTemplateAPI:
         ... )
         """
         self.url = url
-        self.access_token = get_access_token(api_key=api_key, secret_key=secret_key)
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.transport = transport if transport is not None else get_default_transport()
+        self.token_store = token_store
+        self.access_token = get_access_token(
+            api_key=api_key,
+            secret_key=secret_key,
+            transport=self.transport,
+            token_store=self.token_store,
+        )
+        self.templates: Dict[str, PromptTemplateResult] = {}
+
+        if prefetch is not None:
+            self.prefetch(prefetch)
+
+    def refresh_access_token(self: "PromptTemplateAPI") -> str:
+        """
+        Replace the access token, e.g. after it expired.
+
+        The token is also invalidated in the token store, unless another
+        client already replaced it there.
+
+        Returns
+        -------
+        str
+            New access token.
+        """
+        if self.token_store is not None:
+            key = token_store_key(self.api_key, self.secret_key)
+            with self.token_store.lock(key):
+                self.token_store.invalidate(key, self.access_token)
+
+        self.access_token = get_access_token(
+            api_key=self.api_key,
+            secret_key=self.secret_key,
+            transport=self.transport,
+            token_store=self.token_store,
+        )
+        return self.access_token
 
     def __call__(self, template_id: int, **kwargs: str) -> str:
         """
@@ -567,7 +915,7 @@ class PromptTemplateAPI:
             **kwargs,
         }
 
-        response = requests.request(
+        response = self.transport.request(
             method="GET", url=self.url, headers=headers, params=params
         )
 
@@ -577,6 +925,163 @@ class PromptTemplateAPI:
         except:
             raise ValueError(response.text)
 
+    def get_template(self: "PromptTemplateAPI", template_id: int) -> PromptTemplateResult:
+        """
+        Get a template without rendering it.
+
+        Parameters
+        ----------
+        template_id : int
+            ID of prompt template.
+
+        Returns
+        -------
+        PromptTemplateResult
+            Template, with its content and variables.
+
+        Raises
+        ------
+        ValueError
+            If request failed. Please check your API key and secret key. Or check the parameters.
+        """
+        headers = {"Content-Type": "application/json"}
+
+        params: Dict[str, Union[str, int]] = {
+            "access_token": self.access_token,
+            "id": template_id,
+        }
+
+        response = self.transport.request(
+            method="GET", url=self.url, headers=headers, params=params
+        )
+
+        try:
+            response_json: PromptTemplateResponse = response.json()
+            return response_json["result"]
+        except:
+            raise ValueError(response.text)
+
+    def prefetch(
+        self: "PromptTemplateAPI", template_ids: Iterable[int], max_workers: int = 8
+    ) -> None:
+        """
+        Fetch templates concurrently, to render them on the client side.
+
+        Parameters
+        ----------
+        template_ids : Iterable[int]
+            IDs of the templates.
+
+        max_workers : int, optional
+            Maximum number of concurrent requests, by default 8.
+
+        Raises
+        ------
+        ValueError
+            If a request failed.
+        """
+        unique: Dict[str, int] = {}
+        for template_id in template_ids:
+            unique.setdefault(str(template_id), template_id)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            templates = list(executor.map(self.get_template, unique.values()))
+        self.templates.update(zip(unique, templates))
+
+    def render(self: "PromptTemplateAPI", template_id: int, **kwargs: str) -> str:
+        """
+        Render a template, on the client side if it is prefetched.
+
+        A prefetched template is rendered by replacing each of its
+        `{variable}` placeholders; if a variable of the template is not
+        given, it is rendered by Prompt Template API instead.
+
+        Parameters
+        ----------
+        template_id : int
+            ID of prompt template.
+
+        **kwargs : str
+            Variables of prompt template.
+
+        Returns
+        -------
+        str
+            Prompt template content.
+        """
+        template = self.templates.get(str(template_id))
+        if template is not None:
+            variables = [name for name in template["templateVariables"].split(",") if name]
+            if all(name in kwargs for name in variables):
+                if not variables:
+                    return template["templateContent"]
+                # One pass, so values containing placeholders are left as is.
+                pattern = "|".join(re.escape("{%s}" % name) for name in variables)
+                return re.sub(
+                    pattern,
+                    lambda match: str(kwargs[match.group(0)[1:-1]]),
+                    template["templateContent"],
+                )
+
+        return self(template_id, **kwargs)
+
+    def render_many(
+        self: "PromptTemplateAPI",
+        items: Iterable[Tuple[int, Dict[str, str]]],
+        max_workers: int = 8,
+    ) -> List[str]:
+        """
+        Render many templates concurrently.
+
+        Identical renders are done once, prefetched templates are rendered
+        on the client side, and the other renders are requested concurrently
+        over the connection pool of the transport.
+
+        Parameters
+        ----------
+        items : Iterable[Tuple[int, Dict[str, str]]]
+            Template ID and variables of each render.
+
+        max_workers : int, optional
+            Maximum number of concurrent requests, by default 8. Keep it
+            within the connection pool size of the transport.
+
+        Returns
+        -------
+        List[str]
+            Rendered contents, in the order of the items.
+
+        Raises
+        ------
+        ValueError
+            If a request failed.
+
+        Examples
+        --------
+        >>> prompttemplate.prefetch([1968])
+        >>> prompts = prompttemplate.render_many(
+        ...     (1968, {'content': title}) for title in titles
+        ... )
+        """
+        keys: List[Tuple[str, Tuple[Tuple[str, str], ...]]] = []
+        unique: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Tuple[int, Dict[str, str]]] = {}
+        for template_id, kwargs in items:
+            key = (str(template_id), tuple(sorted(kwargs.items())))
+            keys.append(key)
+            unique.setdefault(key, (template_id, kwargs))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            rendered = dict(
+                zip(
+                    unique,
+                    executor.map(
+                        lambda item: self.render(item[0], **item[1]), unique.values()
+                    ),
+                )
+            )
+
+        return [rendered[key] for key in keys]
+
 
 """
 APIs of AI Studio.
@@ -595,17 +1100,28 @@ class AIStudioLLMAPI:
 
     authorization: str
 
+    transport: Transport
+
     ERNIEBot : str
 
+    ChatCompletions : str
+
+    model_info : Optional[ModelInfo]
+        Registered model of the endpoint, None if it is not registered.
+
     Methods
     -------
     __init__(
         self,
         user_id: str,
         access_token: str,
-        model: str = AIStudioLLMAPI.ERNIEBot
+        model: str = AIStudioLLMAPI.ERNIEBot,
+        url: str = AIStudioLLMAPI.ChatCompletions,
+        transport: Optional[Transport] = None
     ) -> None:
 
+    prewarm(self) -> None:
+
     __call__(
         self,
         messages: Messages,
@@ -613,12 +1129,23 @@ class AIStudioLLMAPI:
         top_p: Optional[float] = None,
         penalty_score: Optional[float] = None
     ) -> str:
+
+    send(
+        self,
+        data: bytes
+    ) -> str:
     """
 
     ERNIEBot = "ERNIE-Bot"
+    ChatCompletions = "https://aistudio.baidu.com/llm/lmapi/api/v1/chat/completions"
 
     def __init__(
-        self: "AIStudioLLMAPI", user_id: str, access_token: str, model: str = ERNIEBot
+        self: "AIStudioLLMAPI",
+        user_id: str,
+        access_token: str,
+        model: str = ERNIEBot,
+        url: str = ChatCompletions,
+        transport: Optional[Transport] = None,
     ) -> None:
         """
         Initialize LLM API.
@@ -634,6 +1161,12 @@ class AIStudioLLMAPI:
         model : str, optional
             Model of LLM API, by default AIStudioLLMAPI.ERNIEBot.
 
+        url : str, optional
+            URL of LLM API, by default AIStudioLLMAPI.ChatCompletions.
+
+        transport : Optional[Transport], optional
+            Transport to send requests with, by default the default transport.
+
         Examples
         --------
         >>> from wenxinworkshop import AIStudioLLMAPI
@@ -645,17 +1178,33 @@ class AIStudioLLMAPI:
         ...     model=AIStudioLLMAPI.ERNIEBot
         ... )
         """
-        self.url = "https://aistudio.baidu.com/llm/lmapi/api/v1/chat/completions"
+        self.url = url
         self.model = model
+        self.transport = transport if transport is not None else get_default_transport()
         self.authorization = "token {} {}".format(user_id, access_token)
 
+    @property
+    def model_info(self: "AIStudioLLMAPI") -> Optional[ModelInfo]:
+        return find_model(self.url, self.model)
+
+    def prewarm(self: "AIStudioLLMAPI") -> None:
+        """
+        Open a connection to the API ahead of the first request.
+
+        Examples
+        --------
+        >>> erniebot.prewarm()
+        """
+        self.transport.prewarm(self.url)
+
     def __call__(
         self: "AIStudioLLMAPI",
         messages: Messages,
         temperature: Optional[float] = None,
         top_p: Optional[float] = None,
         penalty_score: Optional[float] = None,
-    ) -> str:
+        full_response: bool = False,
+    ) -> Union[str, AIStudioChatCompletion]:
         """
         Get response from LLM API.
 
@@ -673,9 +1222,13 @@ class AIStudioLLMAPI:
         penalty_score : Optional[float], optional
             Penalty score of LLM API, by default None.
 
+        full_response : bool, optional
+            Whether to return an AIStudioChatCompletion with the metadata of
+            the response instead of the result only, by default False.
+
         Returns
         -------
-        str
+        Union[str, AIStudioChatCompletion]
             Response from LLM API.
 
         Raises
@@ -702,12 +1255,6 @@ class AIStudioLLMAPI:
         >>> print(response)
         你好！
         """
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": self.authorization,
-            "SDK-Version": "0.0.2",
-        }
-
         data = {
             "model": self.model,
             "messages": messages,
@@ -716,15 +1263,44 @@ class AIStudioLLMAPI:
             "penalty_score": penalty_score,
         }
 
-        response = requests.request(
-            method="POST", url=self.url, headers=headers, data=json.dumps(data)
+        return self.send(data=encode_json(data), full_response=full_response)
+
+    def send(
+        self: "AIStudioLLMAPI", data: bytes, full_response: bool = False
+    ) -> Union[str, AIStudioChatCompletion]:
+        """
+        Send an encoded request body to LLM API.
+
+        Parameters
+        ----------
+        data : bytes
+            JSON request body, as built by `__call__`.
+
+        full_response : bool, optional
+            Whether to return an AIStudioChatCompletion instead of the result only, by default False.
+
+        Returns
+        -------
+        Union[str, AIStudioChatCompletion]
+            Response from LLM API.
+
+        Raises
+        ------
+        ValueError
+            If request failed. Please check your API key and secret key. Or check the parameters.
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": self.authorization,
+            "SDK-Version": "0.0.2",
+        }
+
+        response = self.transport.request(
+            method="POST", url=self.url, headers=headers, data=data
         )
 
-        try:
-            response_json: AIStudioChatResponse = response.json()
-            return response_json["result"]["result"]
-        except:
-            raise ValueError(response.text)
+        completion = AIStudioChatCompletion(response.content)
+        return completion if full_response else completion.result
 
 
 class AIStudioEmbeddingAPI:
@@ -737,21 +1313,40 @@ class AIStudioEmbeddingAPI:
 
     authorization: str
 
+    transport: Transport
+
+    EmbeddingV1 : str
+
+    model_info : Optional[ModelInfo]
+        Registered model of the endpoint, None if it is not registered.
+
     Methods
     -------
     __init__(
         self,
         user_id: str,
-        access_token: str
+        access_token: str,
+        url: str = AIStudioEmbeddingAPI.EmbeddingV1,
+        transport: Optional[Transport] = None
     ) -> None:
 
+    prewarm(self) -> None:
+
     __call__(
         self,
         texts: Texts
     ) -> Embeddings:
     """
 
-    def __init__(self: "AIStudioEmbeddingAPI", user_id: str, access_token: str) -> None:
+    EmbeddingV1 = "https://aistudio.baidu.com/llm/lmapi/api/v1/embedding"
+
+    def __init__(
+        self: "AIStudioEmbeddingAPI",
+        user_id: str,
+        access_token: str,
+        url: str = EmbeddingV1,
+        transport: Optional[Transport] = None,
+    ) -> None:
         """
         Initialize Embedding API.
 
@@ -763,6 +1358,12 @@ class AIStudioEmbeddingAPI:
         access_token : str
             Access token of Embedding API.
 
+        url : str, optional
+            URL of Embedding API, by default AIStudioEmbeddingAPI.EmbeddingV1.
+
+        transport : Optional[Transport], optional
+            Transport to send requests with, by default the default transport.
+
         Examples
         --------
         >>> from wenxinworkshop import AIStudioEmbeddingAPI
@@ -773,10 +1374,27 @@ class AIStudioEmbeddingAPI:
         ...     access_token=access_token
         ... )
         """
-        self.url = "https://aistudio.baidu.com/llm/lmapi/api/v1/embedding"
+        self.url = url
+        self.transport = transport if transport is not None else get_default_transport()
         self.authorization = "token {} {}".format(user_id, access_token)
 
-    def __call__(self: "AIStudioEmbeddingAPI", texts: Texts) -> Embeddings:
+    @property
+    def model_info(self: "AIStudioEmbeddingAPI") -> Optional[ModelInfo]:
+        return find_model(self.url)
+
+    def prewarm(self: "AIStudioEmbeddingAPI") -> None:
+        """
+        Open a connection to the API ahead of the first request.
+
+        Examples
+        --------
+        >>> ernieembedding.prewarm()
+        """
+        self.transport.prewarm(self.url)
+
+    def __call__(
+        self: "AIStudioEmbeddingAPI", texts: Texts, full_response: bool = False
+    ) -> Union[Embeddings, AIStudioEmbeddingList]:
         """
         Get embeddings from Embedding API.
 
@@ -785,9 +1403,13 @@ class AIStudioEmbeddingAPI:
         texts : Texts
             Texts of inputs.
 
+        full_response : bool, optional
+            Whether to return an AIStudioEmbeddingList with the metadata of
+            the response instead of the embeddings only, by default False.
+
         Returns
         -------
-        Embeddings
+        Union[Embeddings, AIStudioEmbeddingList]
             Embeddings from Embedding API.
 
         Raises
@@ -820,18 +1442,12 @@ class AIStudioEmbeddingAPI:
             "input": texts,
         }
 
-        response = requests.request(
-            method="POST", url=self.url, headers=headers, data=json.dumps(data)
+        response = self.transport.request(
+            method="POST", url=self.url, headers=headers, data=encode_json(data)
         )
 
-        try:
-            response_json: AIStudioEmbeddingResponse = response.json()
-            embeddings: Embeddings = [
-                embedding["embedding"] for embedding in response_json["result"]["data"]
-            ]
-            return embeddings
-        except:
-            raise ValueError(response.text)
+        embedding_list = AIStudioEmbeddingList(response.content)
+        return embedding_list if full_response else embedding_list.embeddings
 
 
 if __name__ == "__main__":
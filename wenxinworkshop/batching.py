@@ -0,0 +1,440 @@
+import time
+import asyncio
+import collections
+
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from .types import Texts, Embedding, Embeddings
+
+
+__all__ = [
+    "AdaptiveBatcher",
+]
+
+
+"""
+Request batching of Wenxin Workshop.
+"""
+
+
+class AdaptiveBatcher:
+    """
+    Batcher merging the texts of concurrent async callers into embedding
+    requests, with a batch size and linger time tuned online.
+
+    Texts are queued and sent in batches of up to `batch_size` texts, at most
+    `max_concurrency` batches at a time. A batch is sent once it is full, or
+    once its oldest text has waited `linger` seconds; while every slot is
+    busy the texts wait in the queue, so batches fill up under load.
+
+    Every `adapt_every` texts, the p95 latency of those texts (from the call
+    to the result) is compared with `target_p95`:
+
+    - above the target, the linger time is halved, and the batch size grows
+      if texts are piling up in the queue (larger batches drain it in fewer
+      requests), or else, if the upstream latency alone exceeds the target,
+      shrinks by up to a quarter toward the size whose latency fits, as
+      estimated by a linear fit of the recent request latencies on their
+      batch sizes (a shrink which does not lower the latency is undone);
+    - well below the target, the batch size grows by one up to the maximum,
+      and if the batches were not full the linger time grows, trading spare
+      latency for fewer requests.
+
+    Attributes
+    ----------
+    api : Callable[..., Awaitable[Embeddings]]
+        Async Embedding API, e.g. AsyncEmbeddingAPI.
+
+    target_p95 : float
+        Target p95 latency of a text, in seconds.
+
+    max_batch_size : int
+        Maximum number of texts of a request.
+
+    max_linger : float
+        Maximum seconds a text waits for a batch to fill.
+
+    max_concurrency : int
+        Maximum number of requests in flight.
+
+    batch_size : int
+        Current batch size.
+
+    linger : float
+        Current linger time, in seconds.
+
+    Methods
+    -------
+    __call__(self, texts: Texts) -> Embeddings:
+        Get embeddings, batched with the texts of other callers.
+
+    embed(self, text: str) -> Embedding:
+        Get the embedding of one text.
+
+    stats(self) -> Dict[str, Any]:
+        Current parameters, counters, latency and throughput.
+
+    aclose(self) -> None:
+        Send the queued texts at once and wait for the requests in flight.
+    """
+
+    def __init__(
+        self: "AdaptiveBatcher",
+        api: Any,
+        target_p95: float = 0.5,
+        max_batch_size: Optional[int] = None,
+        max_linger: float = 0.05,
+        max_concurrency: int = 8,
+        adapt_every: int = 64,
+        window: int = 1024,
+    ) -> None:
+        """
+        Initialize adaptive batcher.
+
+        Parameters
+        ----------
+        api : Callable[..., Awaitable[Embeddings]]
+            Async Embedding API, e.g. AsyncEmbeddingAPI or AsyncCoalescingAPI.
+
+        target_p95 : float, optional
+            Target p95 latency of a text, in seconds, by default 0.5.
+
+        max_batch_size : Optional[int], optional
+            Maximum number of texts of a request, by default the maximum
+            batch size of the registered model, or 16.
+
+        max_linger : float, optional
+            Maximum seconds a text waits for a batch to fill, by default 0.05.
+
+        max_concurrency : int, optional
+            Maximum number of requests in flight, by default 8.
+
+        adapt_every : int, optional
+            Number of texts between two adjustments, by default 64.
+
+        window : int, optional
+            Number of recent texts and requests the metrics are computed
+            over, by default 1024.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import AdaptiveBatcher
+        >>> batcher = AdaptiveBatcher(ernieembedding, target_p95=0.3)
+        >>> embeddings = await asyncio.gather(*(batcher.embed(text) for text in texts))
+        >>> print(batcher.stats())
+        >>> await batcher.aclose()
+        """
+        if target_p95 <= 0:
+            raise ValueError("target_p95 must be positive.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        if max_batch_size is None:
+            model_info = getattr(api, "model_info", None)
+            max_batch_size = getattr(model_info, "max_batch_size", None) or 16
+
+        self.api = api
+        self.target_p95 = target_p95
+        self.max_batch_size = max_batch_size
+        self.max_linger = max_linger
+        self.max_concurrency = max_concurrency
+        self.adapt_every = adapt_every
+        self.batch_size = max_batch_size
+        self.linger = max_linger / 4
+
+        # Queued texts: (text, future, enqueued at).
+        self._queue: Deque[Tuple[str, "asyncio.Future[Embedding]", float]] = (
+            collections.deque()
+        )
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Future[None]"] = set()
+        self._in_flight = 0
+        self._closing = False
+        self._shrunk: Optional[Tuple[int, float]] = None
+        self._min_batch_size = 1
+
+        self._epoch: List[float] = []
+        self._epoch_upstream: List[float] = []
+        self._epoch_fill: List[float] = []
+        self._epoch_failed = 0
+        self._latencies: Deque[float] = collections.deque(maxlen=window)
+        # Recent requests: (texts, upstream latency).
+        self._upstream: Deque[Tuple[int, float]] = collections.deque(maxlen=window)
+        self._completions: Deque[Tuple[float, int]] = collections.deque(maxlen=window)
+        self._counts = {"texts": 0, "batches": 0, "failed": 0, "adjustments": 0}
+
+    async def __call__(self: "AdaptiveBatcher", texts: Texts) -> Embeddings:
+        """
+        Get embeddings, batched with the texts of other callers.
+
+        Parameters
+        ----------
+        texts : Texts
+            Texts of inputs.
+
+        Returns
+        -------
+        Embeddings
+            Embeddings, in the order of the texts.
+
+        Raises
+        ------
+        Exception
+            Error of the request of a batch the texts were in, e.g. the
+            ValueError of the API, raised in every caller of that batch.
+        """
+        if self._closing:
+            raise RuntimeError("The batcher is closed.")
+
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        futures = []
+        for text in texts:
+            future: "asyncio.Future[Embedding]" = loop.create_future()
+            self._queue.append((text, future, now))
+            futures.append(future)
+
+        if len(self._queue) >= self.batch_size or self._timer is None:
+            self._flush()
+
+        return list(await asyncio.gather(*futures))
+
+    async def embed(self: "AdaptiveBatcher", text: str) -> Embedding:
+        """
+        Get the embedding of one text.
+
+        Parameters
+        ----------
+        text : str
+            Text of input.
+
+        Returns
+        -------
+        Embedding
+            Embedding of the text.
+        """
+        return (await self([text]))[0]
+
+    def _flush(self: "AdaptiveBatcher") -> None:
+        # Send the batches which are full or lingered long enough, while
+        # slots are free, then wait for the oldest queued text.
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = time.monotonic()
+        while self._queue and self._in_flight < self.max_concurrency:
+            if (
+                len(self._queue) < self.batch_size
+                and now - self._queue[0][2] < self.linger
+                and not self._closing
+            ):
+                break
+
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                item = self._queue.popleft()
+                if not item[1].done():
+                    batch.append(item)
+            if not batch:
+                continue
+
+            self._in_flight += 1
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        if self._queue and self._in_flight < self.max_concurrency:
+            self._timer = asyncio.get_running_loop().call_later(
+                max(0.0, self._queue[0][2] + self.linger - now), self._on_timer
+            )
+
+    def _on_timer(self: "AdaptiveBatcher") -> None:
+        self._timer = None
+        self._flush()
+
+    async def _send(
+        self: "AdaptiveBatcher", batch: List[Tuple[str, "asyncio.Future[Embedding]", float]]
+    ) -> None:
+        started = time.monotonic()
+        try:
+            embeddings = await self.api(texts=[text for text, _, _ in batch])
+            if len(embeddings) != len(batch):
+                raise ValueError(
+                    "Got {} embeddings for {} texts.".format(len(embeddings), len(batch))
+                )
+        except Exception as e:
+            self._counts["failed"] += len(batch)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            self._record(batch, started, failed=True)
+        else:
+            for (_, future, _), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+            self._record(batch, started, failed=False)
+        finally:
+            self._in_flight -= 1
+            if self._queue:
+                self._flush()
+
+    def _record(
+        self: "AdaptiveBatcher",
+        batch: List[Tuple[str, "asyncio.Future[Embedding]", float]],
+        started: float,
+        failed: bool,
+    ) -> None:
+        # Failed batches count toward the epoch too, so a slow or throttled
+        # upstream is adapted to; only successful ones feed the upstream
+        # latency model and the throughput.
+        now = time.monotonic()
+        latencies = [now - enqueued for _, _, enqueued in batch]
+        self._epoch.extend(latencies)
+        self._epoch_upstream.append(now - started)
+        self._epoch_fill.append(len(batch) / self.batch_size)
+
+        if failed:
+            self._epoch_failed += len(batch)
+        else:
+            self._latencies.extend(latencies)
+            self._upstream.append((len(batch), now - started))
+            self._completions.append((now, len(batch)))
+            self._counts["texts"] += len(batch)
+            self._counts["batches"] += 1
+
+        if len(self._epoch) >= self.adapt_every:
+            self._adapt()
+
+    def _adapt(self: "AdaptiveBatcher") -> None:
+        # One adjustment per epoch of `adapt_every` texts, from the latencies
+        # of that epoch only, so each one sees the effect of the previous one.
+        latencies = sorted(self._epoch)
+        upstream = sorted(self._epoch_upstream)
+        p95 = latencies[int(len(latencies) * 0.95)]
+        upstream_p95 = upstream[int(len(upstream) * 0.95)]
+        fill = sum(self._epoch_fill) / len(self._epoch_fill)
+        backlog = len(self._queue) >= self.batch_size
+
+        if self._shrunk is not None:
+            # A shrink which did not lower the latency is undone, and the
+            # batch size is not shrunk below that size again: the latency
+            # is due to load rather than to the batch size.
+            size, before = self._shrunk
+            self._shrunk = None
+            if p95 >= before:
+                self.batch_size = self._min_batch_size = size
+
+        if p95 > self.target_p95:
+            self.linger /= 2
+            if backlog:
+                self.batch_size = min(
+                    self.max_batch_size, self.batch_size + max(1, self.batch_size // 4)
+                )
+            elif upstream_p95 > self.target_p95:
+                # Shrink toward the batch size whose expected upstream
+                # latency is half the target, unless the latency does not
+                # depend on the batch size.
+                intercept, slope = self._upstream_model()
+                if slope > 0:
+                    size = int((self.target_p95 / 2 - intercept) / slope)
+                    size = max(
+                        self._min_batch_size,
+                        self.batch_size * 3 // 4,
+                        min(self.batch_size, size),
+                    )
+                    if size < self.batch_size:
+                        self._shrunk = (self.batch_size, p95)
+                        self.batch_size = size
+        elif p95 < self.target_p95 * 0.7 and not self._epoch_failed:
+            # Fast failures, e.g. throttling, are no reason to grow.
+            self._min_batch_size = 1
+            self.batch_size = min(self.max_batch_size, self.batch_size + 1)
+            if fill < 1.0:
+                self.linger = min(self.max_linger, self.linger * 1.5 + 0.001)
+
+        self._counts["adjustments"] += 1
+        self._epoch = []
+        self._epoch_upstream = []
+        self._epoch_fill = []
+        self._epoch_failed = 0
+
+    def _upstream_model(self: "AdaptiveBatcher") -> Tuple[float, float]:
+        # Least-squares fit of the upstream latency of the recent requests,
+        # as a fixed cost plus a cost per text.
+        n = len(self._upstream)
+        if not n:
+            # Only failed requests so far.
+            return 0.0, 0.0
+        mean_size = sum(size for size, _ in self._upstream) / n
+        mean_latency = sum(latency for _, latency in self._upstream) / n
+        variance = sum((size - mean_size) ** 2 for size, _ in self._upstream)
+        if variance == 0:
+            return mean_latency, 0.0
+
+        slope = (
+            sum(
+                (size - mean_size) * (latency - mean_latency)
+                for size, latency in self._upstream
+            )
+            / variance
+        )
+        return mean_latency - slope * mean_size, slope
+
+    def stats(self: "AdaptiveBatcher") -> Dict[str, Any]:
+        """
+        Current parameters, counters, latency and throughput.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Batch size and linger time, texts queued and requests in flight,
+            texts and batches done, failed texts and adjustments, p50 / p95
+            latency of the recent texts and p95 latency of the recent
+            requests in milliseconds, mean texts per request, and texts per
+            second over the recent requests.
+        """
+        latencies = sorted(self._latencies)
+        upstream = sorted(latency for _, latency in self._upstream)
+        completions = list(self._completions)
+
+        throughput = 0.0
+        if len(completions) > 1 and completions[-1][0] > completions[0][0]:
+            throughput = sum(n for _, n in completions[1:]) / (
+                completions[-1][0] - completions[0][0]
+            )
+
+        return {
+            "batch_size": self.batch_size,
+            "linger_ms": self.linger * 1000,
+            "target_p95_ms": self.target_p95 * 1000,
+            "queued": len(self._queue),
+            "in_flight": self._in_flight,
+            "texts": self._counts["texts"],
+            "batches": self._counts["batches"],
+            "failed": self._counts["failed"],
+            "adjustments": self._counts["adjustments"],
+            "latency_p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "latency_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+            "upstream_p95_ms": upstream[int(len(upstream) * 0.95)] * 1000 if upstream else 0.0,
+            "mean_batch_size": (
+                sum(n for _, n in completions) / len(completions) if completions else 0.0
+            ),
+            "throughput": throughput,
+        }
+
+    async def aclose(self: "AdaptiveBatcher") -> None:
+        """
+        Send the queued texts at once and wait for the requests in flight.
+        """
+        self._closing = True
+        while self._queue or self._tasks:
+            self._flush()
+            if self._tasks:
+                await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def __aenter__(self: "AdaptiveBatcher") -> "AdaptiveBatcher":
+        return self
+
+    async def __aexit__(self: "AdaptiveBatcher", *args: Any) -> None:
+        await self.aclose()
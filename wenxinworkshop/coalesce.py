@@ -0,0 +1,427 @@
+import asyncio
+import threading
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .encoding import request_fingerprint
+from .deadlines import DeadlineExceeded, remaining
+
+
+__all__ = [
+    "SingleFlight",
+    "AsyncSingleFlight",
+    "CoalescingAPI",
+    "AsyncCoalescingAPI",
+]
+
+
+"""
+Request coalescing of Wenxin Workshop.
+"""
+
+
+class _Call:
+    """
+    One in-flight call and the callers waiting for it.
+    """
+
+    def __init__(self: "_Call") -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time, sharing its result between threads.
+
+    A thread calling `do` with the key of a call that is still running waits
+    for that call and gets its result (or its exception) instead of running
+    the function again. Results are not cached: once a call finished, the next
+    call with the same key runs the function again.
+
+    Attributes
+    ----------
+    calls : int
+        Number of calls of `do`.
+
+    executed : int
+        Number of calls which ran the function.
+
+    coalesced : int
+        Number of calls which waited for a running call instead.
+
+    Methods
+    -------
+    do(
+        self,
+        key: str,
+        function: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any
+    ) -> Any:
+        Call the function, or wait for the running call with the same key.
+
+    stats(self) -> Dict[str, int]:
+        Number of calls, executed calls and coalesced calls.
+    """
+
+    def __init__(self: "SingleFlight") -> None:
+        """
+        Initialize single flight group.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import SingleFlight
+        >>> group = SingleFlight()
+        >>> group.do('key', ernieembedding, texts=texts)
+        """
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self: "SingleFlight") -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_calls"] = {}
+        return state
+
+    def __setstate__(self: "SingleFlight", state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def do(
+        self: "SingleFlight",
+        key: str,
+        function: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Call the function, or wait for the running call with the same key.
+
+        Parameters
+        ----------
+        key : str
+            Key of the call, e.g. a request fingerprint.
+
+        function : Callable[..., Any]
+            Function to call.
+
+        *args : Any
+            Positional arguments of the function.
+
+        **kwargs : Any
+            Keyword arguments of the function.
+
+        Returns
+        -------
+        Any
+            Result of the function, shared by all coalesced callers.
+
+        Raises
+        ------
+        Exception
+            Exception raised by the function, raised in all coalesced callers.
+
+        DeadlineExceeded
+            If the current deadline passed while waiting for the running call.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.executed += 1
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            if not call.done.wait(remaining()):
+                raise DeadlineExceeded("Deadline exceeded waiting for the running call.")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def stats(self: "SingleFlight") -> Dict[str, int]:
+        """
+        Number of calls, executed calls, coalesced calls and calls in flight.
+
+        Returns
+        -------
+        Dict[str, int]
+            Counters of the group.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """
+    Run at most one coroutine per key at a time, sharing its result between tasks.
+
+    The coroutine runs in its own task, so cancelling one of the waiting
+    callers does not cancel the call for the others.
+
+    Attributes
+    ----------
+    calls : int
+        Number of calls of `do`.
+
+    executed : int
+        Number of calls which ran the coroutine.
+
+    coalesced : int
+        Number of calls which waited for a running call instead.
+
+    Methods
+    -------
+    do(
+        self,
+        key: str,
+        function: Callable[..., Awaitable[Any]],
+        *args: Any,
+        **kwargs: Any
+    ) -> Any:
+        Await the coroutine, or the running call with the same key.
+
+    stats(self) -> Dict[str, int]:
+        Number of calls, executed calls and coalesced calls.
+    """
+
+    def __init__(self: "AsyncSingleFlight") -> None:
+        """
+        Initialize async single flight group.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import AsyncSingleFlight
+        >>> group = AsyncSingleFlight()
+        >>> await group.do('key', ernieembedding, texts=texts)
+        """
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: Dict[str, "asyncio.Future[Any]"] = {}
+
+    def __getstate__(self: "AsyncSingleFlight") -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_calls"] = {}
+        return state
+
+    async def do(
+        self: "AsyncSingleFlight",
+        key: str,
+        function: Callable[..., Awaitable[Any]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Await the coroutine, or the running call with the same key.
+
+        Parameters
+        ----------
+        key : str
+            Key of the call, e.g. a request fingerprint.
+
+        function : Callable[..., Awaitable[Any]]
+            Coroutine function to call.
+
+        *args : Any
+            Positional arguments of the function.
+
+        **kwargs : Any
+            Keyword arguments of the function.
+
+        Returns
+        -------
+        Any
+            Result of the coroutine, shared by all coalesced callers.
+
+        Raises
+        ------
+        Exception
+            Exception raised by the coroutine, raised in all coalesced callers.
+
+        DeadlineExceeded
+            If the current deadline passed while waiting for the running call.
+        """
+        self.calls += 1
+        task = self._calls.get(key)
+
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            task = self._calls[key] = asyncio.ensure_future(function(*args, **kwargs))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), remaining())
+        except asyncio.TimeoutError as e:
+            if task.done():
+                # Raised by the coroutine itself.
+                raise
+            raise DeadlineExceeded("Deadline exceeded waiting for the running call.") from e
+
+    def stats(self: "AsyncSingleFlight") -> Dict[str, int]:
+        """
+        Number of calls, executed calls, coalesced calls and calls in flight.
+
+        Returns
+        -------
+        Dict[str, int]
+            Counters of the group.
+        """
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
+
+
+class CoalescingAPI:
+    """
+    API whose identical concurrent calls share one request.
+
+    Calls are keyed by the URL of the API and their arguments; streaming calls
+    are never coalesced. Coalesced callers get the same result object, so it
+    should not be modified in place.
+
+    Attributes
+    ----------
+    api : Union[LLMAPI, EmbeddingAPI, PromptTemplateAPI, AIStudioLLMAPI, AIStudioEmbeddingAPI]
+        API to send the requests with.
+
+    group : SingleFlight
+        Group the calls run in, its counters are the coalescing metrics.
+    """
+
+    def __init__(
+        self: "CoalescingAPI", api: Any, group: Optional[SingleFlight] = None
+    ) -> None:
+        """
+        Initialize coalescing API.
+
+        Parameters
+        ----------
+        api : Union[LLMAPI, EmbeddingAPI, PromptTemplateAPI, AIStudioLLMAPI, AIStudioEmbeddingAPI]
+            API to send the requests with.
+
+        group : Optional[SingleFlight], optional
+            Group the calls run in, by default a new one.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import CoalescingAPI
+        >>> ernieembedding = CoalescingAPI(ernieembedding)
+        >>> embeddings = ernieembedding(texts=texts)
+        >>> print(ernieembedding.group.stats())
+        """
+        self.api = api
+        self.group = group if group is not None else SingleFlight()
+
+    def __call__(self: "CoalescingAPI", **kwargs: Any) -> Any:
+        """
+        Call the API, or wait for the running identical call.
+
+        Parameters
+        ----------
+        **kwargs : Any
+            Keyword arguments of the API call.
+
+        Returns
+        -------
+        Any
+            Result of the API call.
+        """
+        if kwargs.get("stream"):
+            return self.api(**kwargs)
+
+        key = request_fingerprint(
+            self.api.url, dict(kwargs, model=getattr(self.api, "model", None))
+        )
+        return self.group.do(key, self.api, **kwargs)
+
+
+class AsyncCoalescingAPI:
+    """
+    Async API whose identical concurrent calls share one request.
+
+    Calls are keyed by the URL of the API and their arguments; streaming calls
+    are never coalesced. Coalesced callers get the same result object, so it
+    should not be modified in place.
+
+    Attributes
+    ----------
+    api : Union[AsyncLLMAPI, AsyncEmbeddingAPI]
+        Async API to send the requests with.
+
+    group : AsyncSingleFlight
+        Group the calls run in, its counters are the coalescing metrics.
+    """
+
+    def __init__(
+        self: "AsyncCoalescingAPI", api: Any, group: Optional[AsyncSingleFlight] = None
+    ) -> None:
+        """
+        Initialize async coalescing API.
+
+        Parameters
+        ----------
+        api : Union[AsyncLLMAPI, AsyncEmbeddingAPI]
+            Async API to send the requests with.
+
+        group : Optional[AsyncSingleFlight], optional
+            Group the calls run in, by default a new one.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import AsyncCoalescingAPI
+        >>> ernieembedding = AsyncCoalescingAPI(ernieembedding)
+        >>> embeddings = await ernieembedding(texts=texts)
+        """
+        self.api = api
+        self.group = group if group is not None else AsyncSingleFlight()
+
+    async def __call__(self: "AsyncCoalescingAPI", **kwargs: Any) -> Any:
+        """
+        Call the API, or wait for the running identical call.
+
+        Parameters
+        ----------
+        **kwargs : Any
+            Keyword arguments of the API call.
+
+        Returns
+        -------
+        Any
+            Result of the API call.
+        """
+        if kwargs.get("stream"):
+            return await self.api(**kwargs)
+
+        key = request_fingerprint(self.api.url, kwargs)
+        return await self.group.do(key, self.api, **kwargs)
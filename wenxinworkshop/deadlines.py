@@ -0,0 +1,110 @@
+import time
+import contextlib
+import contextvars
+
+from typing import Iterator, Optional
+
+
+__all__ = [
+    "DeadlineExceeded",
+    "deadline",
+    "get_deadline",
+    "remaining",
+]
+
+
+"""
+Deadlines of Wenxin Workshop.
+"""
+
+
+_deadline: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar(
+    "wenxinworkshop_deadline", default=None
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The time budget of a call is spent.
+    """
+
+
+@contextlib.contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Give every API call made in the block a shared time budget.
+
+    The deadline flows through token refresh, retries, rate limiter and
+    scheduler waits, HTTP requests and streaming reads: each of them only
+    gets the time left, and fails with DeadlineExceeded once it is spent.
+    Nested deadlines can only shorten the budget. The deadline is a context
+    variable, so it follows asyncio tasks and is independent per thread.
+
+    Parameters
+    ----------
+    timeout : Optional[float]
+        Seconds from now, None to keep the current deadline.
+
+    Yields
+    ------
+    Optional[float]
+        Deadline of the block, in `time.monotonic()` seconds.
+
+    Examples
+    --------
+    >>> from wenxinworkshop import deadline
+    >>> with deadline(2.0):
+    ...     response = erniebot(messages=messages)
+    """
+    current = _deadline.get()
+    if timeout is not None:
+        new = time.monotonic() + timeout
+        current = new if current is None else min(current, new)
+
+    token = _deadline.set(current)
+    try:
+        yield current
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """
+    Get the current deadline.
+
+    Returns
+    -------
+    Optional[float]
+        Deadline in `time.monotonic()` seconds, None if there is none.
+    """
+    return _deadline.get()
+
+
+def remaining(timeout: Optional[float] = None) -> Optional[float]:
+    """
+    Get the time left of the current deadline.
+
+    Parameters
+    ----------
+    timeout : Optional[float], optional
+        Timeout of the phase about to start, by default None.
+
+    Returns
+    -------
+    Optional[float]
+        The smaller of `timeout` and the seconds left, None if both are None.
+
+    Raises
+    ------
+    DeadlineExceeded
+        If the current deadline has passed.
+    """
+    current = _deadline.get()
+    if current is None:
+        return timeout
+
+    left = current - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded.")
+
+    return left if timeout is None else min(timeout, left)
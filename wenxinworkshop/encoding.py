@@ -0,0 +1,94 @@
+import json
+import gzip
+import hashlib
+
+from typing import Any, Dict
+
+
+__all__ = [
+    "encode_json",
+    "gzip_body",
+    "request_fingerprint",
+]
+
+
+"""
+Payload encoding of Wenxin Workshop.
+"""
+
+
+def encode_json(data: Dict[str, Any]) -> bytes:
+    """
+    Encode a request payload as compact UTF-8 JSON.
+
+    Top-level fields set to None are left out (the APIs treat a missing field
+    and a null field the same), no whitespace is emitted and non-ASCII text is
+    written as UTF-8 instead of 6-byte `\\uXXXX` escapes.
+
+    Parameters
+    ----------
+    data : Dict[str, Any]
+        Payload of the request.
+
+    Returns
+    -------
+    bytes
+        Encoded payload.
+
+    Examples
+    --------
+    >>> encode_json({'input': ['你好！'], 'user_id': None})
+    b'{"input":["\\xe4\\xbd\\xa0\\xe5\\xa5\\xbd\\xef\\xbc\\x81"]}'
+    """
+    return json.dumps(
+        {key: value for key, value in data.items() if value is not None},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("UTF-8")
+
+
+def gzip_body(body: bytes, level: int = 6) -> bytes:
+    """
+    Compress a request body with gzip.
+
+    Parameters
+    ----------
+    body : bytes
+        Request body.
+
+    level : int, optional
+        Compression level, by default 6.
+
+    Returns
+    -------
+    bytes
+        Compressed body, to be sent with `Content-Encoding: gzip`.
+    """
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def request_fingerprint(url: str, data: Dict[str, Any]) -> str:
+    """
+    Fingerprint of a request, identical for requests with the same effect.
+
+    Parameters
+    ----------
+    url : str
+        URL (or model) the request is sent to.
+
+    data : Dict[str, Any]
+        Payload of the request. Fields set to None are ignored and key order
+        does not matter.
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest.
+    """
+    canonical = json.dumps(
+        [url, {key: value for key, value in data.items() if value is not None}],
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode("UTF-8")).hexdigest()
@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import threading
+
+from typing import Any, Dict, Optional, Tuple
+
+from .encoding import request_fingerprint
+
+
+__all__ = [
+    "Journal",
+    "JournaledAPI",
+]
+
+
+"""
+Request journal of Wenxin Workshop.
+"""
+
+
+_KEY = b'{"key":'
+
+_RESPONSE = b',"response":'
+
+_END = b"}\n"
+
+_MISSING = object()
+
+
+def _record_key(line: bytes) -> Optional[str]:
+    # Key of a line holding a complete record, None if it does not hold one.
+    if not (line.startswith(_KEY) and line.endswith(_END)) or _RESPONSE not in line:
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or "response" not in record:
+        return None
+    key = record.get("key")
+    return key if isinstance(key, str) else None
+
+
+class Journal:
+    """
+    Append-only, disk-backed journal of responses, keyed by request fingerprint.
+
+    Each record is one JSON line `{"key": ..., "response": ...}` appended with
+    a single write, so several processes can append to the same file. An
+    in-memory index maps every key to the position of its response in the
+    file: lookups are O(1) and read only that response from disk, and opening
+    a journal only scans the keys. Writes are fsynced in batches, every
+    `fsync_every` records or `fsync_interval` seconds, and on `flush()` and
+    `close()`. On open, the file is truncated at the first line which is not
+    a complete record, e.g. a record torn by a crash.
+
+    The journal doubles as a persistent cache: a job restarted on the same
+    file skips the requests it already completed, and jobs can share a file.
+
+    Attributes
+    ----------
+    path : str
+        Path of the journal file.
+
+    fsync_every : int
+        Maximum number of records written between two fsyncs.
+
+    fsync_interval : float
+        Maximum seconds between a write and its fsync, checked on writes.
+
+    Methods
+    -------
+    get(self, key: str, default: Any = None) -> Any:
+        Get the response of a key.
+
+    put(self, key: str, response: Any) -> None:
+        Append the response of a key.
+
+    flush(self) -> None:
+        Fsync the written records.
+
+    stats(self) -> Dict[str, int]:
+        Journal counters.
+
+    close(self) -> None:
+        Fsync and close the journal.
+    """
+
+    def __init__(
+        self: "Journal",
+        path: str,
+        fsync_every: int = 64,
+        fsync_interval: float = 1.0,
+    ) -> None:
+        """
+        Open a journal, creating the file if needed.
+
+        Parameters
+        ----------
+        path : str
+            Path of the journal file.
+
+        fsync_every : int, optional
+            Maximum number of records written between two fsyncs, by default 64.
+            1 fsyncs every record.
+
+        fsync_interval : float, optional
+            Maximum seconds between a write and its fsync, by default 1.0.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import Journal, JournaledAPI
+        >>> with Journal('embeddings.jsonl') as journal:
+        ...     ernieembedding = JournaledAPI(ernieembedding, journal)
+        ...     for batch in batches:
+        ...         embeddings = ernieembedding(texts=batch)
+        >>> print(journal.stats())
+        """
+        if fsync_every < 1:
+            raise ValueError("fsync_every must be at least 1.")
+
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._open()
+
+    def _open(self: "Journal") -> None:
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._reader = open(self.path, "rb")
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._end = 0
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "writes": 0, "syncs": 0, "skipped": 0}
+
+        self._scan(recover=True)
+
+    def _scan(self: "Journal", recover: bool = False) -> None:
+        # Index the complete records appended since the last scan, by this
+        # process or others. Every line is decoded, so a torn record which
+        # happens to end like one is not indexed.
+        self._reader.seek(self._end)
+        offset = self._end
+        for line in self._reader:
+            key = _record_key(line)
+            if key is None and line.strip():
+                if recover:
+                    # Torn record of a crash: truncate the file there, so the
+                    # next record starts on a line of its own.
+                    dropped = 1 + sum(1 for rest in self._reader if rest.strip())
+                    self._counts["skipped"] += dropped
+                    os.ftruncate(self._fd, offset)
+                    break
+                if not line.endswith(b"\n"):
+                    # Record still being written by another process.
+                    break
+                self._counts["skipped"] += 1
+            elif key is not None:
+                start = offset + line.find(_RESPONSE) + len(_RESPONSE)
+                self._index[key] = (start, offset + len(line) - len(_END) - start)
+
+            offset += len(line)
+        self._end = offset
+
+    def _check_open(self: "Journal") -> None:
+        if self._fd is None:
+            raise ValueError("Journal is closed")
+
+    def _sync(self: "Journal") -> None:
+        if self._unsynced:
+            (getattr(os, "fdatasync", None) or os.fsync)(self._fd)
+            self._unsynced = 0
+            self._counts["syncs"] += 1
+        self._synced_at = time.monotonic()
+
+    def get(self: "Journal", key: str, default: Any = None) -> Any:
+        """
+        Get the response of a key.
+
+        Parameters
+        ----------
+        key : str
+            Key of the request, e.g. its `request_fingerprint`.
+
+        default : Any, optional
+            Value if the key is not in the journal, by default None.
+
+        Returns
+        -------
+        Any
+            Response of the key.
+
+        Raises
+        ------
+        ValueError
+            If the journal is closed.
+        """
+        with self._lock:
+            self._check_open()
+            position = self._index.get(key)
+            if position is None and os.fstat(self._fd).st_size > self._end:
+                # Records appended by another process.
+                self._scan()
+                position = self._index.get(key)
+
+            if position is None:
+                self._counts["misses"] += 1
+                return default
+
+            self._counts["hits"] += 1
+            self._reader.seek(position[0])
+            data = self._reader.read(position[1])
+
+        return json.loads(data)
+
+    def put(self: "Journal", key: str, response: Any) -> None:
+        """
+        Append the response of a key.
+
+        Parameters
+        ----------
+        key : str
+            Key of the request, e.g. its `request_fingerprint`.
+
+        response : Any
+            JSON-serializable response.
+
+        Raises
+        ------
+        ValueError
+            If the journal is closed.
+        """
+        prefix = _KEY + json.dumps(key).encode("UTF-8") + _RESPONSE
+        data = json.dumps(response, ensure_ascii=False, separators=(",", ":")).encode("UTF-8")
+
+        with self._lock:
+            self._check_open()
+            os.write(self._fd, prefix + data + _END)
+            end = os.lseek(self._fd, 0, os.SEEK_CUR)
+            self._index[key] = (end - len(_END) - len(data), len(data))
+            self._counts["writes"] += 1
+            self._unsynced += 1
+
+            if (
+                self._unsynced >= self.fsync_every
+                or time.monotonic() - self._synced_at >= self.fsync_interval
+            ):
+                self._sync()
+
+    def flush(self: "Journal") -> None:
+        """
+        Fsync the written records.
+        """
+        with self._lock:
+            self._sync()
+
+    def stats(self: "Journal") -> Dict[str, int]:
+        """
+        Journal counters.
+
+        Returns
+        -------
+        Dict[str, int]
+            Records in the index, lookup hits and misses, records written,
+            fsyncs, and invalid lines skipped.
+        """
+        with self._lock:
+            return dict(self._counts, records=len(self._index))
+
+    def close(self: "Journal") -> None:
+        """
+        Fsync and close the journal.
+        """
+        with self._lock:
+            if self._fd is None:
+                return
+            self._sync()
+            os.close(self._fd)
+            self._reader.close()
+            self._fd = None
+
+    def __contains__(self: "Journal", key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self: "Journal") -> int:
+        with self._lock:
+            return len(self._index)
+
+    def __getstate__(self: "Journal") -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "fsync_every": self.fsync_every,
+            "fsync_interval": self.fsync_interval,
+        }
+
+    def __setstate__(self: "Journal", state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._open()
+
+    def __enter__(self: "Journal") -> "Journal":
+        return self
+
+    def __exit__(self: "Journal", *args: Any) -> None:
+        self.close()
+
+
+class JournaledAPI:
+    """
+    API whose responses are recorded in a journal and replayed from it.
+
+    Calls are keyed by the URL of the API and their arguments, like
+    CoalescingAPI. A call found in the journal returns the recorded response
+    without any request, so a bulk job restarted after a crash skips the
+    items it already completed and spends no tokens on them again. Streaming
+    calls and calls with `full_response=True` are not journaled.
+
+    Attributes
+    ----------
+    api : Union[LLMAPI, EmbeddingAPI, PromptTemplateAPI, AIStudioLLMAPI, AIStudioEmbeddingAPI]
+        API to send the requests with.
+
+    journal : Journal
+        Journal of the responses.
+    """
+
+    def __init__(self: "JournaledAPI", api: Any, journal: Journal) -> None:
+        """
+        Initialize journaled API.
+
+        Parameters
+        ----------
+        api : Union[LLMAPI, EmbeddingAPI, PromptTemplateAPI, AIStudioLLMAPI, AIStudioEmbeddingAPI]
+            API to send the requests with.
+
+        journal : Journal
+            Journal of the responses.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import Journal, JournaledAPI
+        >>> journal = Journal('chat.jsonl')
+        >>> erniebot = JournaledAPI(erniebot, journal)
+        >>> with ThreadPoolExecutor(8) as executor:
+        ...     answers = list(executor.map(lambda m: erniebot(messages=m), conversations))
+        >>> journal.close()
+        """
+        self.api = api
+        self.journal = journal
+
+    def key(self: "JournaledAPI", **kwargs: Any) -> Optional[str]:
+        """
+        Journal key of a call.
+
+        Parameters
+        ----------
+        **kwargs : Any
+            Keyword arguments of the API call.
+
+        Returns
+        -------
+        Optional[str]
+            Key of the call, None if the call is not journaled.
+        """
+        if kwargs.get("stream") or kwargs.get("full_response"):
+            return None
+        return request_fingerprint(
+            self.api.url, dict(kwargs, model=getattr(self.api, "model", None))
+        )
+
+    def __call__(self: "JournaledAPI", **kwargs: Any) -> Any:
+        """
+        Replay the recorded response of a call, or call the API and record it.
+
+        Parameters
+        ----------
+        **kwargs : Any
+            Keyword arguments of the API call.
+
+        Returns
+        -------
+        Any
+            Result of the API call.
+        """
+        key = self.key(**kwargs)
+        if key is None:
+            return self.api(**kwargs)
+
+        response = self.journal.get(key, _MISSING)
+        if response is _MISSING:
+            response = self.api(**kwargs)
+            self.journal.put(key, response)
+        return response
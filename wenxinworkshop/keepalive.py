@@ -0,0 +1,204 @@
+import asyncio
+import threading
+
+from urllib.parse import urlsplit
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+__all__ = [
+    "KeepAlive",
+    "AsyncKeepAlive",
+]
+
+
+"""
+Connection keep-alive of Wenxin Workshop.
+"""
+
+
+def _targets(apis: List[Any]) -> List[Tuple[Any, str]]:
+    # One (transport, url) per host and transport: a ping keeps every
+    # endpoint of a host warm, since they share the connection pool.
+    targets: Dict[Tuple[int, str], Tuple[Any, str]] = {}
+    for api in apis:
+        parts = urlsplit(api.url)
+        targets.setdefault(
+            (id(api.transport), "{}://{}".format(parts.scheme, parts.netloc)),
+            (api.transport, api.url),
+        )
+    return list(targets.values())
+
+
+class KeepAlive:
+    """
+    Background pinger keeping the connections of APIs warm.
+
+    Every `interval` seconds, a HEAD request is sent to the host of each API
+    through its transport, so the pooled connection is not closed for being
+    idle and interactive requests (streaming chat first of all) never pay
+    DNS, TCP and TLS setup. The hosts are pinged once right away.
+
+    Attributes
+    ----------
+    interval : float
+        Seconds between two pings of a host.
+
+    pings : int
+        Number of pings sent.
+
+    Methods
+    -------
+    ping(self) -> None:
+        Ping every host now.
+
+    close(self) -> None:
+        Stop pinging.
+    """
+
+    def __init__(self: "KeepAlive", apis: List[Any], interval: float = 30.0) -> None:
+        """
+        Start pinging the hosts of APIs.
+
+        Parameters
+        ----------
+        apis : List[Any]
+            APIs to keep warm, e.g. LLMAPI or EmbeddingAPI.
+
+        interval : float, optional
+            Seconds between two pings of a host, by default 30.0. Keep it
+            below the idle timeout of the server and of the connection pool.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import KeepAlive
+        >>> keepalive = KeepAlive([erniebot, ernieembedding], interval=30.0)
+        >>> for item in erniebot(messages=messages, stream=True):
+        ...     print(item, end='')
+        >>> keepalive.close()
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive.")
+
+        self.interval = interval
+        self.pings = 0
+        self._targets = _targets(apis)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self: "KeepAlive") -> None:
+        self.ping()
+        while not self._stopped.wait(self.interval):
+            self.ping()
+
+    def ping(self: "KeepAlive") -> None:
+        """
+        Ping every host now.
+        """
+        for transport, url in self._targets:
+            if self._stopped.is_set():
+                return
+            transport.prewarm(url)
+            self.pings += 1
+
+    def close(self: "KeepAlive") -> None:
+        """
+        Stop pinging.
+        """
+        self._stopped.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def __enter__(self: "KeepAlive") -> "KeepAlive":
+        return self
+
+    def __exit__(self: "KeepAlive", *args: Any) -> None:
+        self.close()
+
+
+class AsyncKeepAlive:
+    """
+    Pinger keeping the connections of async APIs warm, as an asyncio task.
+
+    Every `interval` seconds, a HEAD request is sent to the host of each API
+    through its transport. The hosts are pinged once right away.
+
+    Attributes
+    ----------
+    interval : float
+        Seconds between two pings of a host.
+
+    pings : int
+        Number of pings sent.
+
+    Methods
+    -------
+    ping(self) -> None:
+        Ping every host now.
+
+    aclose(self) -> None:
+        Stop pinging.
+    """
+
+    def __init__(
+        self: "AsyncKeepAlive", apis: List[Any], interval: float = 30.0
+    ) -> None:
+        """
+        Start pinging the hosts of async APIs, from a running event loop.
+
+        Parameters
+        ----------
+        apis : List[Any]
+            Async APIs to keep warm, e.g. AsyncLLMAPI or AsyncEmbeddingAPI.
+
+        interval : float, optional
+            Seconds between two pings of a host, by default 30.0.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import AsyncKeepAlive
+        >>> async with AsyncKeepAlive([erniebot], interval=30.0):
+        ...     response_stream = await erniebot(messages=messages, stream=True)
+        ...     async for item in response_stream:
+        ...         print(item, end='')
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive.")
+
+        self.interval = interval
+        self.pings = 0
+        self._targets = _targets(apis)
+        self._task: Optional["asyncio.Task[None]"] = asyncio.ensure_future(self._run())
+
+    async def _run(self: "AsyncKeepAlive") -> None:
+        while True:
+            await self.ping()
+            await asyncio.sleep(self.interval)
+
+    async def ping(self: "AsyncKeepAlive") -> None:
+        """
+        Ping every host now, concurrently.
+        """
+        await asyncio.gather(
+            *(transport.prewarm(url) for transport, url in self._targets)
+        )
+        self.pings += len(self._targets)
+
+    async def aclose(self: "AsyncKeepAlive") -> None:
+        """
+        Stop pinging.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self: "AsyncKeepAlive") -> "AsyncKeepAlive":
+        return self
+
+    async def __aexit__(self: "AsyncKeepAlive", *args: Any) -> None:
+        await self.aclose()
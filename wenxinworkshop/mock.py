@@ -0,0 +1,463 @@
+import json
+import gzip
+import time
+import random
+import threading
+
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from typing import Any, Dict, List, Optional
+
+
+__all__ = [
+    "MockServer",
+]
+
+
+"""
+Local mock server of Wenxin Workshop and AI Studio.
+"""
+
+
+class MockServer:
+    """
+    Local stand-in server emulating the Wenxin Workshop and AI Studio APIs.
+
+    It answers the OAuth, chat (blocking and SSE streaming), embedding and
+    prompt template endpoints on the same paths as the real service, so it can
+    be used with `RequestsTransport(base_url=server.base_url)` for offline
+    testing, load testing and benchmarking.
+
+    Attributes
+    ----------
+    host : str
+        Host the server listens on.
+
+    port : int
+        Port the server listens on, chosen automatically if 0.
+
+    latency : float
+        Seconds to wait before answering each request.
+
+    connect_latency : float
+        Seconds to wait when a connection is opened, standing in for DNS,
+        TCP and TLS setup.
+
+    error_rate : float
+        Probability of answering with a QPS limit error.
+
+    chunks : int
+        Number of chunks of a streaming chat response.
+
+    chunk_interval : float
+        Seconds to wait between two chunks of a streaming chat response.
+
+    chunk_text : str
+        Text of each chunk of a chat response.
+
+    embedding_dim : int
+        Dimension of the returned embeddings.
+
+    gzip_min_size : Optional[int]
+        JSON responses of at least this many bytes are gzip compressed if the
+        client accepts it, None to never compress.
+
+    counts : Dict[str, int]
+        Number of requests received per endpoint.
+
+    Methods
+    -------
+    start(self) -> MockServer:
+        Start the server in a background thread.
+
+    stop(self) -> None:
+        Stop the server.
+    """
+
+    def __init__(
+        self: "MockServer",
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        chunks: int = 8,
+        chunk_interval: float = 0.0,
+        chunk_text: str = "你好，有什么可以帮助你的。",
+        embedding_dim: int = 384,
+        gzip_min_size: Optional[int] = 1024,
+        seed: Optional[int] = None,
+        connect_latency: float = 0.0,
+    ) -> None:
+        """
+        Initialize mock server.
+
+        Parameters
+        ----------
+        host : str, optional
+            Host to listen on, by default '127.0.0.1'.
+
+        port : int, optional
+            Port to listen on, by default 0 (any free port).
+
+        latency : float, optional
+            Seconds to wait before answering each request, by default 0.0.
+
+        error_rate : float, optional
+            Probability of answering with a QPS limit error, by default 0.0.
+
+        chunks : int, optional
+            Number of chunks of a streaming chat response, by default 8.
+
+        chunk_interval : float, optional
+            Seconds to wait between two streaming chunks, by default 0.0.
+
+        chunk_text : str, optional
+            Text of each chunk of a chat response.
+
+        embedding_dim : int, optional
+            Dimension of the returned embeddings, by default 384.
+
+        gzip_min_size : Optional[int], optional
+            Gzip JSON responses of at least this many bytes, by default 1024.
+
+        seed : Optional[int], optional
+            Seed of the error generator, by default None.
+
+        connect_latency : float, optional
+            Seconds to wait when a connection is opened, by default 0.0.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import LLMAPI, MockServer, RequestsTransport
+        >>> with MockServer(latency=0.05) as server:
+        ...     erniebot = LLMAPI(
+        ...         api_key='',
+        ...         secret_key='',
+        ...         transport=RequestsTransport(base_url=server.base_url)
+        ...     )
+        ...     print(erniebot(messages=[Message(role='user', content='你好！')]))
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.error_rate = error_rate
+        self.chunks = chunks
+        self.chunk_interval = chunk_interval
+        self.chunk_text = chunk_text
+        self.embedding_dim = embedding_dim
+        self.gzip_min_size = gzip_min_size
+        self.counts: Dict[str, int] = {}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self: "MockServer") -> str:
+        """
+        Base URL of the running server.
+        """
+        return "http://{}:{}".format(self.host, self.port)
+
+    def start(self: "MockServer") -> "MockServer":
+        """
+        Start the server in a background thread.
+
+        Returns
+        -------
+        MockServer
+            The server itself.
+        """
+        server = self
+
+        class Handler(_MockHandler):
+            mock = server
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self: "MockServer") -> None:
+        """
+        Stop the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self: "MockServer") -> "MockServer":
+        return self.start()
+
+    def __exit__(self: "MockServer", *args: Any) -> None:
+        self.stop()
+
+    def _count(self: "MockServer", endpoint: str) -> None:
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def _should_fail(self: "MockServer") -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def _embedding(self: "MockServer", text: str) -> List[float]:
+        generator = random.Random(text)
+        return [round(generator.uniform(-1.0, 1.0), 6) for _ in range(self.embedding_dim)]
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    mock: MockServer
+
+    def log_message(self: "_MockHandler", format: str, *args: Any) -> None:
+        pass
+
+    def setup(self: "_MockHandler") -> None:
+        super().setup()
+        if self.mock.connect_latency:
+            time.sleep(self.mock.connect_latency)
+
+    def do_GET(self: "_MockHandler") -> None:
+        self.handle_request()
+
+    def do_POST(self: "_MockHandler") -> None:
+        self.handle_request()
+
+    def do_HEAD(self: "_MockHandler") -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def handle_request(self: "_MockHandler") -> None:
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        try:
+            data: Dict[str, Any] = json.loads(body) if body else {}
+        except ValueError:
+            data = {}
+
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+
+        if path.endswith("/oauth/2.0/token"):
+            self.mock._count("oauth")
+            return self.send_json(
+                {
+                    "refresh_token": "mock-refresh-token",
+                    "expires_in": 2592000,
+                    "session_key": "mock-session-key",
+                    "access_token": "mock-access-token",
+                    "scope": "public",
+                    "session_secret": "mock-session-secret",
+                }
+            )
+
+        if path.startswith("/llm/lmapi/"):
+            return self.handle_aistudio(path, data)
+
+        if "/chat/" in path:
+            self.mock._count("chat")
+            if self.mock._should_fail():
+                return self.send_error_json(18, "Open api qps request limit reached")
+            if data.get("stream"):
+                return self.send_stream()
+            return self.send_json(self.chat_response(0, True, self.full_text()))
+
+        if "/embeddings/" in path:
+            self.mock._count("embedding")
+            if self.mock._should_fail():
+                return self.send_error_json(18, "Open api qps request limit reached")
+            return self.send_json(self.embedding_response(data.get("input") or []))
+
+        if path.endswith("/template/info"):
+            self.mock._count("template")
+            if self.mock._should_fail():
+                return self.send_error_json(18, "Open api qps request limit reached")
+            # Every template has a single `content` variable, left as is if not given.
+            template = "mock template {}: {{content}}".format(query.get("id", ""))
+            content = template
+            if "content" in query:
+                content = template.replace("{content}", query["content"])
+            return self.send_json(
+                {
+                    "log_id": 1,
+                    "result": {
+                        "templateId": query.get("id", ""),
+                        "templateName": "mock",
+                        "templateContent": template,
+                        "templateVariables": "content",
+                        "content": content,
+                    },
+                }
+            )
+
+        self.send_error_json(3, "Unsupported openapi method")
+
+    def handle_aistudio(self: "_MockHandler", path: str, data: Dict[str, Any]) -> None:
+        if path.endswith("/chat/completions"):
+            self.mock._count("aistudio_chat")
+            if self.mock._should_fail():
+                return self.send_aistudio_error()
+            result: Dict[str, Any] = self.chat_response(0, True, self.full_text())
+        elif path.endswith("/embedding"):
+            self.mock._count("aistudio_embedding")
+            if self.mock._should_fail():
+                return self.send_aistudio_error()
+            result = self.embedding_response(data.get("input") or [])
+        else:
+            return self.send_aistudio_error()
+
+        self.send_json(
+            {"logId": "mock", "errorCode": 0, "errorMsg": "success", "result": result}
+        )
+
+    def full_text(self: "_MockHandler") -> str:
+        return self.mock.chunk_text * self.mock.chunks
+
+    def chat_response(
+        self: "_MockHandler", sentence_id: int, is_end: bool, result: str
+    ) -> Dict[str, Any]:
+        return {
+            "id": "as-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "sentence_id": sentence_id,
+            "is_end": is_end,
+            "is_truncated": False,
+            "result": result,
+            "need_clear_history": False,
+            "ban_round": -1,
+            "usage": {
+                "prompt_tokens": 1,
+                "completion_tokens": len(result),
+                "total_tokens": len(result) + 1,
+            },
+        }
+
+    def embedding_response(self: "_MockHandler", texts: List[str]) -> Dict[str, Any]:
+        return {
+            "id": "as-mock",
+            "object": "embedding_list",
+            "created": int(time.time()),
+            "data": [
+                {
+                    "object": "embedding",
+                    "embedding": self.mock._embedding(text),
+                    "index": index,
+                }
+                for index, text in enumerate(texts)
+            ],
+            "usage": {
+                "prompt_tokens": sum(len(text) for text in texts),
+                "total_tokens": sum(len(text) for text in texts),
+            },
+        }
+
+    def send_json(self: "_MockHandler", response: Dict[str, Any]) -> None:
+        body = json.dumps(response, ensure_ascii=False).encode("UTF-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if (
+            self.mock.gzip_min_size is not None
+            and len(body) >= self.mock.gzip_min_size
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        ):
+            body = gzip.compress(body, mtime=0)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting, e.g. its deadline passed.
+            self.mock._count("cancelled")
+            self.close_connection = True
+
+    def send_error_json(self: "_MockHandler", error_code: int, error_msg: str) -> None:
+        self.send_json({"error_code": error_code, "error_msg": error_msg})
+
+    def send_aistudio_error(self: "_MockHandler") -> None:
+        self.send_json(
+            {
+                "logId": "mock",
+                "errorCode": 18,
+                "errorMsg": "Open api qps request limit reached",
+                "result": None,
+            }
+        )
+
+    def send_stream(self: "_MockHandler") -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            for sentence_id in range(self.mock.chunks):
+                if sentence_id and self.mock.chunk_interval:
+                    time.sleep(self.mock.chunk_interval)
+                is_end = sentence_id == self.mock.chunks - 1
+                event = "data: {}\n\n".format(
+                    json.dumps(
+                        self.chat_response(sentence_id, is_end, self.mock.chunk_text),
+                        ensure_ascii=False,
+                    )
+                ).encode("UTF-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+                self.wfile.flush()
+
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early.
+            self.mock._count("chat_stream_cancelled")
+            self.close_connection = True
+
+
+if __name__ == "__main__":
+    """
+    Run a mock server in the foreground.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Wenxin Workshop mock server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--chunk-interval", type=float, default=0.0)
+    parser.add_argument("--embedding-dim", type=int, default=384)
+    args = parser.parse_args()
+
+    server = MockServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        chunks=args.chunks,
+        chunk_interval=args.chunk_interval,
+        embedding_dim=args.embedding_dim,
+    ).start()
+
+    print("Mock server listening on {}".format(server.base_url))
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,336 @@
+import threading
+
+from typing import Any, Dict, List, Optional
+
+
+__all__ = [
+    "ModelInfo",
+    "register_model",
+    "get_model",
+    "find_model",
+    "list_models",
+]
+
+
+"""
+Model registry of Wenxin Workshop.
+"""
+
+
+class ModelInfo:
+    """
+    Endpoint and capabilities of a model.
+
+    Limits left to None are unknown, and the features sizing themselves
+    from them fall back to their own defaults.
+
+    Attributes
+    ----------
+    name : str
+        Name of the model, unique in the registry.
+
+    url : str
+        URL of the endpoint.
+
+    kind : str
+        'chat' or 'embedding'.
+
+    model : Optional[str]
+        Model field of the request body, for endpoints serving several models
+        (AI Studio), else None.
+
+    max_input_tokens : Optional[int]
+        Maximum tokens of the messages of a chat request, or of each text of
+        an embedding request.
+
+    max_batch_size : Optional[int]
+        Maximum number of texts of an embedding request.
+
+    dim : Optional[int]
+        Dimension of the embeddings.
+
+    qps : Optional[float]
+        Default rate limit of a credential, in requests per second.
+
+    input_price : Optional[float]
+        Price of 1000 input tokens, in CNY.
+
+    output_price : Optional[float]
+        Price of 1000 output tokens, in CNY.
+
+    Methods
+    -------
+    cost(self, usage: Dict[str, int]) -> Optional[float]:
+        Price of a request from its usage.
+
+    as_dict(self) -> Dict[str, Any]:
+        Fields of the model.
+    """
+
+    def __init__(
+        self: "ModelInfo",
+        name: str,
+        url: str,
+        kind: str = "chat",
+        model: Optional[str] = None,
+        max_input_tokens: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        dim: Optional[int] = None,
+        qps: Optional[float] = None,
+        input_price: Optional[float] = None,
+        output_price: Optional[float] = None,
+    ) -> None:
+        """
+        Describe a model.
+
+        Parameters
+        ----------
+        name : str
+            Name of the model, unique in the registry.
+
+        url : str
+            URL of the endpoint.
+
+        kind : str, optional
+            'chat' or 'embedding', by default 'chat'.
+
+        model : Optional[str], optional
+            Model field of the request body, by default None.
+
+        max_input_tokens : Optional[int], optional
+            Maximum input tokens, by default unknown.
+
+        max_batch_size : Optional[int], optional
+            Maximum number of texts of an embedding request, by default unknown.
+
+        dim : Optional[int], optional
+            Dimension of the embeddings, by default unknown.
+
+        qps : Optional[float], optional
+            Default rate limit of a credential, by default unknown.
+
+        input_price : Optional[float], optional
+            Price of 1000 input tokens, in CNY, by default unknown.
+
+        output_price : Optional[float], optional
+            Price of 1000 output tokens, in CNY, by default unknown.
+
+        Raises
+        ------
+        ValueError
+            If kind is not 'chat' or 'embedding'.
+        """
+        if kind not in ("chat", "embedding"):
+            raise ValueError("kind must be 'chat' or 'embedding'.")
+
+        self.name = name
+        self.url = url
+        self.kind = kind
+        self.model = model
+        self.max_input_tokens = max_input_tokens
+        self.max_batch_size = max_batch_size
+        self.dim = dim
+        self.qps = qps
+        self.input_price = input_price
+        self.output_price = output_price
+
+    def cost(self: "ModelInfo", usage: Dict[str, int]) -> Optional[float]:
+        """
+        Price of a request from its usage.
+
+        Parameters
+        ----------
+        usage : Dict[str, int]
+            Usage of the response, with 'prompt_tokens' and, for chat,
+            'completion_tokens'.
+
+        Returns
+        -------
+        Optional[float]
+            Price in CNY, None if the prices of the model are unknown.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import get_model
+        >>> response = erniebot(messages=messages, full_response=True)
+        >>> get_model('ERNIE-Bot').cost(response.usage)
+        0.0042
+        """
+        if self.input_price is None:
+            return None
+
+        cost = usage.get("prompt_tokens", 0) * self.input_price
+        if self.output_price is not None:
+            cost += usage.get("completion_tokens", 0) * self.output_price
+        return cost / 1000
+
+    def as_dict(self: "ModelInfo") -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    def __repr__(self: "ModelInfo") -> str:
+        return "ModelInfo({})".format(
+            ", ".join("{}={!r}".format(k, v) for k, v in self.__dict__.items())
+        )
+
+
+_models: Dict[str, ModelInfo] = {}
+
+_models_lock = threading.Lock()
+
+
+def register_model(info: ModelInfo) -> ModelInfo:
+    """
+    Register a model, e.g. a custom or fine-tuned endpoint.
+
+    A model registered with the name of another one replaces it, and a model
+    registered with the URL (and model field) of another one takes precedence
+    when APIs look up their model.
+
+    Parameters
+    ----------
+    info : ModelInfo
+        Model to register.
+
+    Returns
+    -------
+    ModelInfo
+        The registered model.
+
+    Examples
+    --------
+    >>> from wenxinworkshop import LLMAPI, ModelInfo, register_model
+    >>> model = register_model(ModelInfo(
+    ...     name='my-ernie',
+    ...     url='https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/my-ernie',
+    ...     max_input_tokens=4000,
+    ...     qps=2
+    ... ))
+    >>> erniebot = LLMAPI(api_key=api_key, secret_key=secret_key, url=model.url)
+    >>> erniebot.model_info.max_input_tokens
+    4000
+    """
+    with _models_lock:
+        _models.pop(info.name, None)
+        _models[info.name] = info
+    return info
+
+
+def get_model(name: str) -> ModelInfo:
+    """
+    Get a registered model by name.
+
+    Parameters
+    ----------
+    name : str
+        Name of the model.
+
+    Returns
+    -------
+    ModelInfo
+        The model.
+
+    Raises
+    ------
+    KeyError
+        If no model has this name.
+    """
+    with _models_lock:
+        return _models[name]
+
+
+def find_model(url: str, model: Optional[str] = None) -> Optional[ModelInfo]:
+    """
+    Find the model served at a URL.
+
+    Parameters
+    ----------
+    url : str
+        URL of the endpoint.
+
+    model : Optional[str], optional
+        Model field of the request body, for endpoints serving several
+        models, by default None.
+
+    Returns
+    -------
+    Optional[ModelInfo]
+        The model registered last with this URL and model field, None if
+        there is none.
+    """
+    with _models_lock:
+        for info in reversed(list(_models.values())):
+            if info.url == url and (model is None or info.model == model):
+                return info
+    return None
+
+
+def list_models(kind: Optional[str] = None) -> List[ModelInfo]:
+    """
+    List the registered models.
+
+    Parameters
+    ----------
+    kind : Optional[str], optional
+        Only list 'chat' or 'embedding' models, by default all of them.
+
+    Returns
+    -------
+    List[ModelInfo]
+        Registered models, in registration order.
+    """
+    with _models_lock:
+        return [info for info in _models.values() if kind is None or info.kind == kind]
+
+
+# Limits and prices of the public endpoints as documented by Baidu AI Cloud
+# and AI Studio; register a model with the same name to override them.
+register_model(
+    ModelInfo(
+        name="ERNIE-Bot",
+        url="https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/completions",
+        max_input_tokens=2000,
+        qps=5,
+        input_price=0.012,
+        output_price=0.012,
+    )
+)
+register_model(
+    ModelInfo(
+        name="ERNIE-Bot-turbo",
+        url="https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/eb-instant",
+        max_input_tokens=7168,
+        qps=5,
+        input_price=0.008,
+        output_price=0.008,
+    )
+)
+register_model(
+    ModelInfo(
+        name="Embedding-V1",
+        url="https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/embeddings/embedding-v1",
+        kind="embedding",
+        max_input_tokens=384,
+        max_batch_size=16,
+        dim=384,
+        qps=10,
+        input_price=0.002,
+    )
+)
+register_model(
+    ModelInfo(
+        name="AIStudio/ERNIE-Bot",
+        url="https://aistudio.baidu.com/llm/lmapi/api/v1/chat/completions",
+        model="ERNIE-Bot",
+        max_input_tokens=2000,
+    )
+)
+register_model(
+    ModelInfo(
+        name="AIStudio/Embedding-V1",
+        url="https://aistudio.baidu.com/llm/lmapi/api/v1/embedding",
+        kind="embedding",
+        max_input_tokens=384,
+        max_batch_size=16,
+        dim=384,
+    )
+)
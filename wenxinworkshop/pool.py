@@ -0,0 +1,488 @@
+import sys
+import json
+import functools
+import time
+import threading
+
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple
+
+from .streams import ChatStream
+from .ratelimit import RateLimiter
+from .deadlines import DeadlineExceeded, remaining
+
+
+__all__ = [
+    "PooledCredential",
+    "CredentialPool",
+    "get_error_code",
+]
+
+
+"""
+Credential pool of Wenxin Workshop.
+"""
+
+
+# Error codes meaning the credential is over its quota.
+THROTTLE_ERROR_CODES = (4, 17, 18, 19, 336501, 336502)
+
+# Error codes meaning the access token is invalid or expired.
+TOKEN_ERROR_CODES = (110, 111)
+
+
+def _transport_errors() -> Tuple[type, ...]:
+    # Connection errors of the transports: requests, and httpx once a
+    # transport imported it.
+    return _resolve_transport_errors(sys.modules.get("httpx") is not None)
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_transport_errors(with_httpx: bool) -> Tuple[type, ...]:
+    import requests
+
+    errors: Tuple[type, ...] = (requests.RequestException,)
+    if with_httpx:
+        errors += (sys.modules["httpx"].HTTPError,)
+    return errors
+
+
+def get_error_code(error: Exception) -> Optional[int]:
+    """
+    Get the API error code of an exception raised by an API.
+
+    Parameters
+    ----------
+    error : Exception
+        Exception raised by an API, whose message is the response text.
+
+    Returns
+    -------
+    Optional[int]
+        `error_code` (Wenxin Workshop) or `errorCode` (AI Studio), None if absent.
+    """
+    if not error.args or not isinstance(error.args[0], str):
+        return None
+
+    text = error.args[0]
+    if text.startswith("data:"):
+        text = text[5:]
+
+    try:
+        response_json = json.loads(text)
+    except ValueError:
+        return None
+
+    if not isinstance(response_json, dict):
+        return None
+
+    error_code = response_json.get("error_code", response_json.get("errorCode"))
+    return error_code if isinstance(error_code, int) and error_code else None
+
+
+class PooledCredential:
+    """
+    One credential of a credential pool and its load / health state.
+
+    Attributes
+    ----------
+    credential : Dict[str, Any]
+        Keyword arguments creating the API, e.g. api_key and secret_key.
+
+    api : Any
+        API created from the credential.
+
+    weight : float
+        Share of the traffic of the credential.
+
+    limiter : Optional[RateLimiter]
+        Rate limiter of the credential, None if unlimited.
+
+    in_flight : int
+        Number of requests currently sent with the credential.
+
+    requests : int
+        Number of requests sent with the credential.
+
+    failures : int
+        Number of consecutive failures of the credential.
+
+    benched_until : float
+        Monotonic time until which the credential is not used.
+    """
+
+    def __init__(
+        self: "PooledCredential",
+        credential: Dict[str, Any],
+        api: Any,
+        weight: float = 1.0,
+        qps: Optional[float] = None,
+    ) -> None:
+        self.credential = credential
+        self.api = api
+        self.weight = weight
+        self.limiter = RateLimiter(qps=qps) if qps else None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.benched_until = 0.0
+        self.current_weight = 0.0
+
+    @property
+    def load(self: "PooledCredential") -> float:
+        """
+        In-flight requests relative to the weight of the credential.
+        """
+        return self.in_flight / self.weight
+
+    def is_benched(self: "PooledCredential", now: float) -> bool:
+        return self.benched_until > now
+
+
+class CredentialPool:
+    """
+    Pool of credentials spreading requests over several API keys or AI Studio tokens.
+
+    Each credential has its own API instance (so its own access token), an
+    optional rate limiter and health state. Requests go to the least-loaded
+    (or weighted round-robin) credential with quota left. A credential that
+    is throttled or failing is benched for a while and the request is retried
+    with another credential, so aggregate throughput scales with the number
+    of keys.
+
+    Attributes
+    ----------
+    api : type
+        API class, e.g. LLMAPI, EmbeddingAPI or AIStudioLLMAPI.
+
+    members : List[PooledCredential]
+        Credentials of the pool.
+
+    strategy : str
+        'least_loaded' or 'weighted'.
+
+    bench_seconds : float
+        Base seconds a throttled or failing credential is benched.
+
+    max_retries : int
+        Maximum number of other credentials tried after a failure.
+
+    Methods
+    -------
+    __call__(self, *args: Any, **kwargs: Any) -> Any:
+        Call the API with one credential of the pool.
+
+    stats(self) -> List[Dict[str, Any]]:
+        Load and health state of each credential.
+    """
+
+    def __init__(
+        self: "CredentialPool",
+        api: type,
+        credentials: List[Dict[str, Any]],
+        strategy: str = "least_loaded",
+        bench_seconds: float = 1.0,
+        max_retries: int = 2,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Initialize credential pool.
+
+        Parameters
+        ----------
+        api : type
+            API class, e.g. LLMAPI, EmbeddingAPI or AIStudioLLMAPI.
+
+        credentials : List[Dict[str, Any]]
+            Keyword arguments creating the API for each credential
+            (api_key / secret_key, or user_id / access_token for AI Studio).
+            The optional keys 'weight' and 'qps' set the share of traffic and
+            the rate limit of the credential; 'qps' defaults to the default
+            QPS of the registered model, pass None to disable the rate limit.
+
+        strategy : str, optional
+            'least_loaded' or 'weighted', by default 'least_loaded'.
+
+        bench_seconds : float, optional
+            Base seconds a throttled or failing credential is benched, doubled
+            for every consecutive failure, by default 1.0.
+
+        max_retries : int, optional
+            Maximum number of other credentials tried after a failure, by default 2.
+
+        **kwargs : Any
+            Keyword arguments shared by all APIs, e.g. url or transport.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import LLMAPI, CredentialPool
+        >>> erniebot = CredentialPool(
+        ...     api=LLMAPI,
+        ...     credentials=[
+        ...         {'api_key': '...', 'secret_key': '...', 'qps': 5},
+        ...         {'api_key': '...', 'secret_key': '...', 'qps': 10, 'weight': 2},
+        ...     ],
+        ...     url=LLMAPI.ERNIEBot
+        ... )
+        >>> response = erniebot(messages=messages)
+        """
+        if strategy not in ("least_loaded", "weighted"):
+            raise ValueError("strategy must be 'least_loaded' or 'weighted'.")
+        if not credentials:
+            raise ValueError("credentials must not be empty.")
+
+        self.api = api
+        self.strategy = strategy
+        self.bench_seconds = bench_seconds
+        self.max_retries = max_retries
+        self.kwargs = kwargs
+        self.members: List[PooledCredential] = []
+        self._lock = threading.Lock()
+
+        for credential in credentials:
+            credential = dict(credential)
+            weight = credential.pop("weight", 1.0)
+            has_qps = "qps" in credential
+            qps = credential.pop("qps", None)
+            instance = api(**credential, **kwargs)
+
+            model_info = getattr(instance, "model_info", None)
+            if not has_qps and model_info is not None:
+                qps = model_info.qps
+            self.members.append(
+                PooledCredential(
+                    credential=credential,
+                    api=instance,
+                    weight=weight,
+                    qps=qps,
+                )
+            )
+
+    def _select(
+        self: "CredentialPool", exclude: List[PooledCredential]
+    ) -> PooledCredential:
+        now = time.monotonic()
+
+        with self._lock:
+            candidates = [m for m in self.members if m not in exclude] or self.members
+            healthy = [m for m in candidates if not m.is_benched(now)]
+
+            if not healthy:
+                # Everything is benched: use the one coming back first.
+                member = min(candidates, key=lambda m: m.benched_until)
+            elif self.strategy == "weighted":
+                # Smooth weighted round-robin.
+                total = sum(m.weight for m in healthy)
+                for m in healthy:
+                    m.current_weight += m.weight
+                member = max(healthy, key=lambda m: m.current_weight)
+                member.current_weight -= total
+            else:
+                member = min(
+                    healthy,
+                    key=lambda m: (m.limiter.delay() if m.limiter else 0.0, m.load),
+                )
+
+            member.in_flight += 1
+            member.requests += 1
+
+        try:
+            wait = member.benched_until - time.monotonic()
+            if wait > 0:
+                budget = remaining()
+                if budget is not None and budget < wait:
+                    raise DeadlineExceeded("Deadline exceeded waiting for a credential.")
+                time.sleep(wait)
+            if member.limiter is not None and not member.limiter.acquire():
+                raise DeadlineExceeded("Deadline exceeded waiting for the rate limiter.")
+        except DeadlineExceeded:
+            with self._lock:
+                member.in_flight -= 1
+            raise
+
+        return member
+
+    def _release(
+        self: "CredentialPool", member: PooledCredential, error: Optional[Exception]
+    ) -> None:
+        with self._lock:
+            member.in_flight -= 1
+            if error is None:
+                member.failures = 0
+            else:
+                member.failures += 1
+                member.benched_until = time.monotonic() + self.bench_seconds * 2 ** min(
+                    member.failures - 1, 6
+                )
+
+    def _refresh(self: "CredentialPool", member: PooledCredential) -> None:
+        if hasattr(member.api, "refresh_access_token"):
+            member.api.refresh_access_token()
+        else:
+            member.api = self.api(**member.credential, **self.kwargs)
+
+    def _stream(
+        self: "CredentialPool",
+        member: PooledCredential,
+        response_stream: Iterator[str],
+    ) -> Iterator[str]:
+        if isinstance(response_stream, ChatStream):
+            return _PooledChatStream(self, member, response_stream)
+        return self._iterate(member, response_stream)
+
+    def _iterate(
+        self: "CredentialPool",
+        member: PooledCredential,
+        response_stream: Iterator[str],
+    ) -> Generator[str, None, None]:
+        error: Optional[Exception] = None
+        try:
+            yield from response_stream
+        except ValueError as e:
+            if get_error_code(e) in THROTTLE_ERROR_CODES:
+                error = e
+            raise
+        finally:
+            self._release(member, error)
+
+    def __call__(self: "CredentialPool", *args: Any, **kwargs: Any) -> Any:
+        """
+        Call the API with one credential of the pool.
+
+        Parameters
+        ----------
+        *args : Any
+            Arguments of the API call.
+
+        **kwargs : Any
+            Keyword arguments of the API call.
+
+        Returns
+        -------
+        Any
+            Response of the API.
+
+        Raises
+        ------
+        ValueError
+            If request failed with every credential tried.
+
+        DeadlineExceeded
+            If the current deadline passed before the request succeeded.
+        """
+        transport_errors = _transport_errors()
+        tried: List[PooledCredential] = []
+
+        while True:
+            remaining()
+            member = self._select(exclude=tried)
+            tried.append(member)
+
+            try:
+                response = member.api(*args, **kwargs)
+            except (ValueError,) + transport_errors as e:
+                error_code = get_error_code(e)
+                retryable = (
+                    error_code in THROTTLE_ERROR_CODES
+                    or error_code in TOKEN_ERROR_CODES
+                    or isinstance(e, transport_errors)
+                )
+
+                if error_code in TOKEN_ERROR_CODES:
+                    self._release(member, None)
+                    self._refresh(member)
+                else:
+                    self._release(member, e if retryable else None)
+
+                if not retryable or len(tried) > self.max_retries:
+                    raise
+                continue
+            except BaseException:
+                # Deadline, interrupt or bad arguments: the credential is
+                # not to blame, but it must be given back.
+                self._release(member, None)
+                raise
+
+            if isinstance(response, Iterator):
+                return self._stream(member, response)
+
+            self._release(member, None)
+            return response
+
+    def __getstate__(self: "CredentialPool") -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self: "CredentialPool", state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def stats(self: "CredentialPool") -> List[Dict[str, Any]]:
+        """
+        Load and health state of each credential.
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            One entry per credential, in the order given.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "index": index,
+                    "weight": member.weight,
+                    "in_flight": member.in_flight,
+                    "requests": member.requests,
+                    "failures": member.failures,
+                    "benched": member.is_benched(now),
+                }
+                for index, member in enumerate(self.members)
+            ]
+
+
+class _PooledChatStream(ChatStream):
+    # ChatStream giving its credential back to the pool once closed: when
+    # exhausted, stopped, closed explicitly or garbage collected.
+
+    def __init__(
+        self: "_PooledChatStream",
+        pool: CredentialPool,
+        member: PooledCredential,
+        stream: ChatStream,
+    ) -> None:
+        # Take over the response of the stream; the stream itself must not
+        # close it when it is garbage collected.
+        self.__dict__.update(stream.__dict__)
+        stream.closed = True
+        self._pool = pool
+        self._member: Optional[PooledCredential] = member
+        self._error: Optional[Exception] = None
+        self._reading = False
+        self._release_lock = threading.Lock()
+
+    def _release(self: "_PooledChatStream") -> None:
+        with self._release_lock:
+            member, self._member = self._member, None
+        if member is not None:
+            self._pool._release(member, self._error)
+
+    def _next_result(self: "_PooledChatStream") -> Optional[str]:
+        # A failed event closes the stream before the error is raised: hold
+        # the release back until it is known whether to bench the credential.
+        self._reading = True
+        try:
+            return super()._next_result()
+        except ValueError as e:
+            if get_error_code(e) in THROTTLE_ERROR_CODES:
+                self._error = e
+            raise
+        finally:
+            self._reading = False
+            if self.closed:
+                self._release()
+
+    def close(self: "_PooledChatStream") -> None:
+        super().close()
+        if not self._reading:
+            self._release()
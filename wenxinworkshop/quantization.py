@@ -0,0 +1,485 @@
+from typing import Any, Iterator, Optional, Tuple, Union
+
+from .similarity import _numpy, _matrix, _blocked_top_k, normalize as _normalize
+from .types import Embeddings
+
+
+__all__ = [
+    "truncate",
+    "PCA",
+    "Int8Embeddings",
+    "BinaryEmbeddings",
+    "recall_at_k",
+]
+
+
+"""
+Embedding compression of Wenxin Workshop.
+
+Requires numpy, please install it by `pip install numpy`.
+"""
+
+
+def truncate(
+    embeddings: Union[Embeddings, Any], dim: int, normalize: bool = True
+) -> Any:
+    """
+    Keep the first `dim` dimensions of embeddings (Matryoshka-style truncation).
+
+    Parameters
+    ----------
+    embeddings : Union[Embeddings, numpy.ndarray]
+        Embeddings, one per row.
+
+    dim : int
+        Number of dimensions to keep.
+
+    normalize : bool, optional
+        Whether to L2-normalize the truncated embeddings, by default True.
+
+    Returns
+    -------
+    numpy.ndarray
+        Truncated float32 embeddings.
+    """
+    matrix = _matrix(embeddings)[:, :dim]
+    return _normalize(matrix) if normalize else matrix
+
+
+class PCA:
+    """
+    Dimension reduction by principal component analysis, fitted on a sample.
+
+    Attributes
+    ----------
+    dim : int
+        Number of dimensions kept.
+
+    mean : Optional[numpy.ndarray]
+        Mean of the sample, None before fitting.
+
+    components : Optional[numpy.ndarray]
+        Principal components, one per row, None before fitting.
+
+    explained_variance_ratio : float
+        Share of the variance of the sample kept by the components.
+
+    Methods
+    -------
+    fit(self, embeddings: Union[Embeddings, numpy.ndarray]) -> PCA:
+        Fit the components on a sample of embeddings.
+
+    transform(self, embeddings: Union[Embeddings, numpy.ndarray]) -> numpy.ndarray:
+        Project embeddings on the components.
+    """
+
+    def __init__(self: "PCA", dim: int, normalize: bool = True) -> None:
+        """
+        Initialize PCA.
+
+        Parameters
+        ----------
+        dim : int
+            Number of dimensions kept.
+
+        normalize : bool, optional
+            Whether to L2-normalize the projected embeddings, by default True.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import PCA
+        >>> pca = PCA(dim=128).fit(sample_embeddings)
+        >>> reduced = pca.transform(embeddings)
+        """
+        self.dim = dim
+        self.normalize = normalize
+        self.mean: Optional[Any] = None
+        self.components: Optional[Any] = None
+        self.explained_variance_ratio = 0.0
+
+    def fit(self: "PCA", embeddings: Union[Embeddings, Any]) -> "PCA":
+        """
+        Fit the components on a sample of embeddings.
+
+        Parameters
+        ----------
+        embeddings : Union[Embeddings, numpy.ndarray]
+            Sample of embeddings, at least `dim` of them.
+
+        Returns
+        -------
+        PCA
+            The fitted PCA.
+        """
+        np = _numpy()
+        matrix = _matrix(embeddings)
+        if len(matrix) < self.dim:
+            raise ValueError("PCA needs at least `dim` embeddings to fit.")
+
+        self.mean = matrix.mean(axis=0)
+        _, singular_values, vt = np.linalg.svd(matrix - self.mean, full_matrices=False)
+        self.components = vt[: self.dim]
+
+        variance = singular_values**2
+        self.explained_variance_ratio = float(variance[: self.dim].sum() / variance.sum())
+        return self
+
+    def transform(self: "PCA", embeddings: Union[Embeddings, Any]) -> Any:
+        """
+        Project embeddings on the components.
+
+        Parameters
+        ----------
+        embeddings : Union[Embeddings, numpy.ndarray]
+            Embeddings, one per row.
+
+        Returns
+        -------
+        numpy.ndarray
+            Reduced float32 embeddings.
+        """
+        if self.components is None:
+            raise ValueError("PCA is not fitted, please call `fit` first.")
+
+        reduced = (_matrix(embeddings) - self.mean) @ self.components.T
+        return _normalize(reduced) if self.normalize else reduced
+
+
+class Int8Embeddings:
+    """
+    Embeddings quantized to int8 with one scale per vector (4x smaller than float32).
+
+    The embeddings are L2-normalized before quantization, so `similarity` is
+    the cosine similarity. It is computed on the int8 codes directly, without
+    dequantizing the stored embeddings.
+
+    Attributes
+    ----------
+    codes : numpy.ndarray
+        int8 codes, one embedding per row.
+
+    scales : numpy.ndarray
+        float32 scale of each embedding.
+
+    nbytes : int
+        Memory used by codes and scales.
+
+    Methods
+    -------
+    dequantize(self) -> numpy.ndarray:
+        Approximate float32 embeddings.
+
+    similarity(self, queries: Union[Embeddings, numpy.ndarray]) -> numpy.ndarray:
+        Cosine similarity of queries against the embeddings.
+
+    top_k(
+        self,
+        queries: Union[Embeddings, numpy.ndarray],
+        k: int = 10
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        Indices and similarities of the k most similar embeddings of each query.
+    """
+
+    def __init__(
+        self: "Int8Embeddings",
+        embeddings: Union[Embeddings, Any],
+        block_size: int = 4096,
+    ) -> None:
+        """
+        Quantize embeddings.
+
+        Parameters
+        ----------
+        embeddings : Union[Embeddings, numpy.ndarray]
+            Embeddings, one per row.
+
+        block_size : int, optional
+            Number of embeddings compared per block in `similarity` and `top_k`,
+            bounding their temporary memory, by default 4096.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import Int8Embeddings
+        >>> index = Int8Embeddings(ernieembedding(texts=texts))
+        >>> indices, scores = index.top_k(ernieembedding(texts=[query]), k=5)
+        """
+        self.block_size = block_size
+        self.codes, self.scales = self.quantize(embeddings)
+
+    @staticmethod
+    def quantize(embeddings: Union[Embeddings, Any]) -> Tuple[Any, Any]:
+        """
+        Quantize normalized embeddings to int8 codes and per-vector scales.
+
+        Parameters
+        ----------
+        embeddings : Union[Embeddings, numpy.ndarray]
+            Embeddings, one per row.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            int8 codes and float32 scales.
+        """
+        np = _numpy()
+        matrix = _normalize(_matrix(embeddings))
+        scales = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127.0
+        codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def __len__(self: "Int8Embeddings") -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self: "Int8Embeddings") -> int:
+        return int(self.codes.nbytes + self.scales.nbytes)
+
+    def dequantize(self: "Int8Embeddings") -> Any:
+        """
+        Approximate float32 embeddings.
+
+        Returns
+        -------
+        numpy.ndarray
+            Dequantized embeddings.
+        """
+        return self.codes.astype(self.scales.dtype) * self.scales[:, None]
+
+    def similarity(self: "Int8Embeddings", queries: Union[Embeddings, Any]) -> Any:
+        """
+        Cosine similarity of queries against the embeddings.
+
+        Parameters
+        ----------
+        queries : Union[Embeddings, numpy.ndarray]
+            Query embeddings, one per row.
+
+        Returns
+        -------
+        numpy.ndarray
+            Similarities, one row per query and one column per embedding.
+        """
+        np = _numpy()
+        codes, scales = self.quantize(queries)
+        similarities = np.empty((len(codes), len(self.codes)), dtype=np.float32)
+        for start, block in self._blocks(codes, scales):
+            similarities[:, start : start + block.shape[1]] = block
+        return similarities
+
+    def _blocks(self: "Int8Embeddings", codes: Any, scales: Any) -> Iterator[Tuple[int, Any]]:
+        # Widen one block of codes at a time, so the stored embeddings are
+        # never copied as a whole; the code products are rescaled once per pair.
+        np = _numpy()
+        codes = codes.astype(np.float32)
+        for start in range(0, len(self.codes), self.block_size):
+            block = self.codes[start : start + self.block_size].astype(np.float32)
+            dots = codes @ block.T
+            yield start, dots * scales[:, None] * self.scales[None, start : start + len(block)]
+
+    def top_k(
+        self: "Int8Embeddings", queries: Union[Embeddings, Any], k: int = 10
+    ) -> Tuple[Any, Any]:
+        """
+        Indices and similarities of the k most similar embeddings of each query.
+
+        Parameters
+        ----------
+        queries : Union[Embeddings, numpy.ndarray]
+            Query embeddings, one per row.
+
+        k : int, optional
+            Number of results per query, by default 10.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Indices and similarities, most similar first.
+        """
+        codes, scales = self.quantize(queries)
+        return _blocked_top_k(self._blocks(codes, scales), len(codes), k)
+
+
+class BinaryEmbeddings:
+    """
+    Embeddings quantized to one bit per dimension (32x smaller than float32).
+
+    Each dimension keeps its sign only. `similarity` is the fraction of equal
+    bits rescaled to [-1, 1], computed with XOR and popcount on the packed
+    bits; it approximates the cosine similarity and is best used to shortlist
+    candidates which are then rescored with a finer representation.
+
+    Attributes
+    ----------
+    bits : numpy.ndarray
+        Packed sign bits, one embedding per row.
+
+    dim : int
+        Number of dimensions of the embeddings.
+
+    nbytes : int
+        Memory used by the bits.
+
+    Methods
+    -------
+    similarity(self, queries: Union[Embeddings, numpy.ndarray]) -> numpy.ndarray:
+        Hamming similarity of queries against the embeddings.
+
+    top_k(
+        self,
+        queries: Union[Embeddings, numpy.ndarray],
+        k: int = 10
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        Indices and similarities of the k most similar embeddings of each query.
+    """
+
+    def __init__(
+        self: "BinaryEmbeddings",
+        embeddings: Union[Embeddings, Any],
+        block_size: int = 1024,
+    ) -> None:
+        """
+        Quantize embeddings.
+
+        Parameters
+        ----------
+        embeddings : Union[Embeddings, numpy.ndarray]
+            Embeddings, one per row.
+
+        block_size : int, optional
+            Number of embeddings compared per block in `similarity` and `top_k`,
+            bounding their temporary memory, by default 1024.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import BinaryEmbeddings
+        >>> index = BinaryEmbeddings(ernieembedding(texts=texts))
+        >>> indices, scores = index.top_k(ernieembedding(texts=[query]), k=100)
+        """
+        matrix = _matrix(embeddings)
+        self.dim = matrix.shape[1]
+        self.block_size = block_size
+        self.bits = self.quantize(matrix)
+
+    @staticmethod
+    def quantize(embeddings: Union[Embeddings, Any]) -> Any:
+        """
+        Pack the sign bits of embeddings.
+
+        Parameters
+        ----------
+        embeddings : Union[Embeddings, numpy.ndarray]
+            Embeddings, one per row.
+
+        Returns
+        -------
+        numpy.ndarray
+            uint8 packed bits.
+        """
+        np = _numpy()
+        return np.packbits(_matrix(embeddings) > 0, axis=1)
+
+    def __len__(self: "BinaryEmbeddings") -> int:
+        return len(self.bits)
+
+    @property
+    def nbytes(self: "BinaryEmbeddings") -> int:
+        return int(self.bits.nbytes)
+
+    def similarity(self: "BinaryEmbeddings", queries: Union[Embeddings, Any]) -> Any:
+        """
+        Hamming similarity of queries against the embeddings, in [-1, 1].
+
+        Parameters
+        ----------
+        queries : Union[Embeddings, numpy.ndarray]
+            Query embeddings, one per row.
+
+        Returns
+        -------
+        numpy.ndarray
+            Similarities, one row per query and one column per embedding.
+        """
+        np = _numpy()
+        bits = self.quantize(queries)
+        similarities = np.empty((len(bits), len(self.bits)), dtype=np.float64)
+        for start, block in self._blocks(bits):
+            similarities[:, start : start + block.shape[1]] = block
+        return similarities
+
+    def _blocks(self: "BinaryEmbeddings", bits: Any) -> Iterator[Tuple[int, Any]]:
+        for start in range(0, len(self.bits), self.block_size):
+            block = self.bits[start : start + self.block_size]
+            xor = bits[:, None, :] ^ block[None, :, :]
+            yield start, 1.0 - 2.0 * _popcount(xor).sum(axis=2) / self.dim
+
+    def top_k(
+        self: "BinaryEmbeddings", queries: Union[Embeddings, Any], k: int = 10
+    ) -> Tuple[Any, Any]:
+        """
+        Indices and similarities of the k most similar embeddings of each query.
+
+        Parameters
+        ----------
+        queries : Union[Embeddings, numpy.ndarray]
+            Query embeddings, one per row.
+
+        k : int, optional
+            Number of results per query, by default 10.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Indices and similarities, most similar first.
+        """
+        bits = self.quantize(queries)
+        return _blocked_top_k(self._blocks(bits), len(bits), k)
+
+
+_POPCOUNT: Optional[Any] = None
+
+
+def _popcount(array: Any) -> Any:
+    global _POPCOUNT
+    np = _numpy()
+
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(array)
+
+    if _POPCOUNT is None:
+        _POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(
+            axis=1, dtype=np.uint8
+        )
+    return _POPCOUNT[array]
+
+
+def recall_at_k(exact: Any, approximate: Any, k: int = 10) -> float:
+    """
+    Share of the exact top-k results also found by an approximate search.
+
+    Parameters
+    ----------
+    exact : numpy.ndarray
+        Indices of the exact top results, one row per query.
+
+    approximate : numpy.ndarray
+        Indices of the approximate top results, one row per query.
+
+    k : int, optional
+        Number of results compared per query, by default 10.
+
+    Returns
+    -------
+    float
+        Recall in [0, 1].
+
+    Examples
+    --------
+    >>> exact, _ = Int8Embeddings(corpus).top_k(queries, k=10)
+    >>> approximate, _ = BinaryEmbeddings(corpus).top_k(queries, k=10)
+    >>> recall_at_k(exact, approximate, k=10)
+    """
+    found, total = 0, 0
+    for e, a in zip(exact, approximate):
+        found += len(set(e[:k].tolist()) & set(a[:k].tolist()))
+        total += len(e[:k])
+    return found / total if total else 1.0
@@ -0,0 +1,477 @@
+import time
+import threading
+import collections
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple, Union
+
+from .similarity import _numpy, normalize, top_k
+from .types import Embedding, Embeddings, Message, Messages, Texts
+
+
+__all__ = [
+    "estimate_tokens",
+    "pack_context",
+    "RAGAnswer",
+    "RAGPipeline",
+]
+
+
+"""
+Retrieval-augmented chat of Wenxin Workshop.
+"""
+
+
+def _model_limit(api: Any, field: str, default: int, fraction: float = 1.0) -> int:
+    # Limit of the registered model of an API, if the API and the limit are known.
+    model_info = getattr(api, "model_info", None)
+    limit = getattr(model_info, field, None) if model_info is not None else None
+    return int(limit * fraction) if limit else default
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text.
+
+    CJK characters count as one token each, other text as one token per four
+    characters. This errs on the high side for ERNIE models, so a budget
+    checked with it is not exceeded.
+
+    Parameters
+    ----------
+    text : str
+        Text to estimate.
+
+    Returns
+    -------
+    int
+        Estimated number of tokens.
+    """
+    cjk = sum(1 for char in text if "⺀" <= char <= "鿿" or "＀" <= char <= "￯")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def pack_context(documents: Texts, max_tokens: int) -> List[int]:
+    """
+    Pick the documents to put in a prompt within a token budget.
+
+    Documents are taken in the order given (most relevant first); a document
+    which does not fit is skipped and smaller ones after it can still fill
+    the rest of the budget.
+
+    Parameters
+    ----------
+    documents : Texts
+        Candidate documents, most relevant first.
+
+    max_tokens : int
+        Token budget of the documents.
+
+    Returns
+    -------
+    List[int]
+        Indices of the documents picked, in the order given.
+    """
+    picked, used = [], 0
+    for index, document in enumerate(documents):
+        tokens = estimate_tokens(document)
+        if used + tokens <= max_tokens:
+            picked.append(index)
+            used += tokens
+    return picked
+
+
+class RAGAnswer:
+    """
+    Answer of a retrieval-augmented chat request.
+
+    Attributes
+    ----------
+    question : str
+        Question asked.
+
+    documents : List[Tuple[int, float]]
+        Index in the pipeline and similarity of each document put in the prompt.
+
+    prompt : str
+        Prompt sent to the LLM API.
+
+    answer : Union[str, Iterator[str]]
+        Answer, or a stream of its chunks.
+
+    timings : Dict[str, float]
+        Milliseconds spent in each stage. For streams `first_chunk` and
+        `total` are added once the stream is read.
+    """
+
+    def __init__(
+        self: "RAGAnswer",
+        question: str,
+        documents: List[Tuple[int, float]],
+        prompt: str,
+        answer: Union[str, Iterator[str]],
+        timings: Dict[str, float],
+    ) -> None:
+        self.question = question
+        self.documents = documents
+        self.prompt = prompt
+        self.answer = answer
+        self.timings = timings
+
+    def __repr__(self: "RAGAnswer") -> str:
+        return "RAGAnswer(question={!r}, documents={!r}, timings={!r})".format(
+            self.question, self.documents, self.timings
+        )
+
+
+class RAGPipeline:
+    """
+    Retrieval-augmented chat: embed the question, retrieve documents, ask the LLM.
+
+    Stages overlap where they are independent: the chat connection is
+    pre-warmed while the question is embedded and the documents are
+    retrieved, and with `stream=True` the answer is returned as soon as the
+    chat stream is open. Question embeddings are kept in an LRU cache.
+
+    Requires numpy, please install it by `pip install numpy`.
+
+    Attributes
+    ----------
+    embedding_api : Union[EmbeddingAPI, AIStudioEmbeddingAPI]
+        API embedding the documents and questions.
+
+    llm_api : Union[LLMAPI, AIStudioLLMAPI]
+        API answering the questions.
+
+    documents : Texts
+        Documents retrieved from.
+
+    k : int
+        Number of documents retrieved per question.
+
+    max_context_tokens : int
+        Token budget of the documents put in the prompt.
+
+    template : str
+        Prompt template with `{context}` and `{question}` fields.
+
+    cache_stats : Dict[str, int]
+        Hits and misses of the question embedding cache.
+
+    Methods
+    -------
+    add_documents(
+        self,
+        documents: Texts,
+        embeddings: Optional[Embeddings] = None
+    ) -> None:
+        Add documents, embedding them if needed.
+
+    embed_query(self, question: str) -> Embedding:
+        Embed a question, using the cache.
+
+    retrieve(self, question: str, k: Optional[int] = None) -> List[Tuple[int, float]]:
+        Indices and similarities of the documents most similar to a question.
+
+    __call__(
+        self,
+        question: str,
+        stream: bool = False,
+        history: Optional[Messages] = None,
+        **options: Any
+    ) -> RAGAnswer:
+        Answer a question with the retrieved documents.
+    """
+
+    TEMPLATE = "已知信息：\n{context}\n\n根据上述已知信息，简洁和专业地回答问题：\n{question}"
+
+    def __init__(
+        self: "RAGPipeline",
+        embedding_api: Any,
+        llm_api: Any,
+        documents: Optional[Texts] = None,
+        embeddings: Optional[Embeddings] = None,
+        k: int = 5,
+        max_context_tokens: Optional[int] = None,
+        template: str = TEMPLATE,
+        cache_size: int = 1024,
+        batch_size: Optional[int] = None,
+        prewarm_idle: float = 30.0,
+        prewarm_wait: float = 1.0,
+    ) -> None:
+        """
+        Initialize retrieval-augmented chat pipeline.
+
+        Parameters
+        ----------
+        embedding_api : Union[EmbeddingAPI, AIStudioEmbeddingAPI]
+            API embedding the documents and questions.
+
+        llm_api : Union[LLMAPI, AIStudioLLMAPI]
+            API answering the questions.
+
+        documents : Optional[Texts], optional
+            Documents retrieved from, by default none.
+
+        embeddings : Optional[Embeddings], optional
+            Embeddings of the documents, by default requested from `embedding_api`.
+
+        k : int, optional
+            Number of documents retrieved per question, by default 5.
+
+        max_context_tokens : Optional[int], optional
+            Token budget of the documents put in the prompt, by default three
+            quarters of the maximum input tokens of the chat model, or 2000 if
+            the model is not registered.
+
+        template : str, optional
+            Prompt template with `{context}` and `{question}` fields,
+            by default RAGPipeline.TEMPLATE.
+
+        cache_size : int, optional
+            Number of question embeddings cached, by default 1024.
+
+        batch_size : Optional[int], optional
+            Number of documents embedded per request, by default the maximum
+            batch size of the embedding model, or 16 if the model is not registered.
+
+        prewarm_idle : float, optional
+            Seconds without chat request after which the chat connection is
+            pre-warmed during retrieval, by default 30.0.
+
+        prewarm_wait : float, optional
+            Maximum seconds the chat request waits for the pre-warming
+            connection once retrieval is done, by default 1.0.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import RAGPipeline
+        >>> rag = RAGPipeline(ernieembedding, erniebot, documents=documents)
+        >>> result = rag('文心一言是什么？', stream=True)
+        >>> for item in result.answer:
+        ...     print(item, end='')
+        >>> print(result.timings)
+        """
+        self.embedding_api = embedding_api
+        self.llm_api = llm_api
+        self.k = k
+        self.max_context_tokens = max_context_tokens or _model_limit(
+            llm_api, "max_input_tokens", 2000, 0.75
+        )
+        self.template = template
+        self.cache_size = cache_size
+        self.batch_size = batch_size or _model_limit(
+            embedding_api, "max_batch_size", 16
+        )
+        self.prewarm_idle = prewarm_idle
+        self.prewarm_wait = prewarm_wait
+        self.documents: Texts = []
+        self.cache_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+        self._matrix: Any = None
+        self._cache: "collections.OrderedDict[str, Embedding]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._last_chat = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=4)
+
+        if documents:
+            self.add_documents(documents, embeddings)
+
+    def add_documents(
+        self: "RAGPipeline", documents: Texts, embeddings: Optional[Embeddings] = None
+    ) -> None:
+        """
+        Add documents, embedding them if needed.
+
+        Parameters
+        ----------
+        documents : Texts
+            Documents to add.
+
+        embeddings : Optional[Embeddings], optional
+            Embeddings of the documents, by default requested from
+            `embedding_api` in concurrent batches of `batch_size`.
+        """
+        if embeddings is None:
+            batches = [
+                documents[start : start + self.batch_size]
+                for start in range(0, len(documents), self.batch_size)
+            ]
+            results = self._executor.map(
+                lambda texts: self.embedding_api(texts=texts), batches
+            )
+            embeddings = [embedding for batch in results for embedding in batch]
+
+        if len(embeddings) != len(documents):
+            raise ValueError(
+                "Got {} embeddings for {} documents.".format(len(embeddings), len(documents))
+            )
+
+        matrix = normalize(embeddings)
+        with self._lock:
+            self.documents = self.documents + list(documents)
+            if self._matrix is None:
+                self._matrix = matrix
+            else:
+                self._matrix = _numpy().concatenate([self._matrix, matrix])
+
+    def embed_query(self: "RAGPipeline", question: str) -> Embedding:
+        """
+        Embed a question, using the cache.
+
+        Parameters
+        ----------
+        question : str
+            Question to embed.
+
+        Returns
+        -------
+        Embedding
+            Embedding of the question.
+        """
+        with self._lock:
+            embedding = self._cache.get(question)
+            if embedding is not None:
+                self._cache.move_to_end(question)
+                self.cache_stats["hits"] += 1
+                return embedding
+            self.cache_stats["misses"] += 1
+
+        embedding = self.embedding_api(texts=[question])[0]
+
+        with self._lock:
+            self._cache[question] = embedding
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return embedding
+
+    def retrieve(
+        self: "RAGPipeline", question: str, k: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Indices and similarities of the documents most similar to a question.
+
+        Parameters
+        ----------
+        question : str
+            Question to retrieve documents for.
+
+        k : Optional[int], optional
+            Number of documents, by default `self.k`.
+
+        Returns
+        -------
+        List[Tuple[int, float]]
+            Index and cosine similarity of each document, most similar first.
+        """
+        return self._search(self.embed_query(question), k)
+
+    def _search(
+        self: "RAGPipeline", embedding: Embedding, k: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        matrix = self._matrix
+        if matrix is None or not len(matrix):
+            return []
+        indices, scores = top_k(embedding, matrix, k=k or self.k, normalized=True)
+        return list(zip(indices[0].tolist(), scores[0].tolist()))
+
+    def _prewarm(self: "RAGPipeline") -> None:
+        transport = getattr(self.llm_api, "transport", None)
+        if transport is not None and hasattr(transport, "prewarm"):
+            transport.prewarm(self.llm_api.url)
+
+    def __call__(
+        self: "RAGPipeline",
+        question: str,
+        stream: bool = False,
+        history: Optional[Messages] = None,
+        **options: Any,
+    ) -> RAGAnswer:
+        """
+        Answer a question with the retrieved documents.
+
+        Parameters
+        ----------
+        question : str
+            Question to answer.
+
+        stream : bool, optional
+            Whether to stream the answer, by default False.
+
+        history : Optional[Messages], optional
+            Previous turns of the conversation, by default none.
+
+        **options : Any
+            Keyword arguments of the LLM API call, e.g. temperature.
+
+        Returns
+        -------
+        RAGAnswer
+            Answer, documents used and per-stage timings.
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        prewarm = None
+        if time.monotonic() - self._last_chat > self.prewarm_idle:
+            # The chat connection is idle: open it while retrieval runs.
+            prewarm = self._executor.submit(self._prewarm)
+
+        embedding = self.embed_query(question)
+        timings["embed"] = (time.perf_counter() - start) * 1000
+
+        mark = time.perf_counter()
+        retrieved = self._search(embedding)
+        timings["retrieve"] = (time.perf_counter() - mark) * 1000
+
+        mark = time.perf_counter()
+        picked = pack_context(
+            [self.documents[i] for i, _ in retrieved], self.max_context_tokens
+        )
+        documents = [retrieved[i] for i in picked]
+        prompt = self.template.format(
+            context="\n\n".join(self.documents[i] for i, _ in documents), question=question
+        )
+        timings["pack"] = (time.perf_counter() - mark) * 1000
+
+        if prewarm is not None:
+            mark = time.perf_counter()
+            # A slow handshake must not hold the request up for long: the
+            # chat request opens its own connection instead.
+            wait([prewarm], timeout=self.prewarm_wait)
+            timings["prewarm_wait"] = (time.perf_counter() - mark) * 1000
+
+        messages: Messages = list(history or []) + [Message(role="user", content=prompt)]
+
+        mark = time.perf_counter()
+        self._last_chat = time.monotonic()
+        if stream:
+            answer: Union[str, Iterator[str]] = self._timed(
+                self.llm_api(messages=messages, stream=True, **options), timings, start
+            )
+        else:
+            answer = self.llm_api(messages=messages, **options)
+        timings["chat"] = (time.perf_counter() - mark) * 1000
+        timings["total"] = (time.perf_counter() - start) * 1000
+
+        return RAGAnswer(question, documents, prompt, answer, timings)
+
+    @staticmethod
+    def _timed(
+        response_stream: Iterator[str], timings: Dict[str, float], start: float
+    ) -> Generator[str, None, None]:
+        try:
+            for chunk in response_stream:
+                if "first_chunk" not in timings:
+                    timings["first_chunk"] = (time.perf_counter() - start) * 1000
+                yield chunk
+        finally:
+            timings["total"] = (time.perf_counter() - start) * 1000
+            if hasattr(response_stream, "close"):
+                response_stream.close()  # type: ignore
+
+    def close(self: "RAGPipeline") -> None:
+        """
+        Stop the worker threads of the pipeline.
+        """
+        self._executor.shutdown(wait=False)
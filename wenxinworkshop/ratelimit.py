@@ -0,0 +1,152 @@
+import time
+import threading
+
+from typing import Any, Dict, Optional
+
+from .deadlines import remaining
+
+
+__all__ = [
+    "RateLimiter",
+]
+
+
+"""
+Rate limiting of Wenxin Workshop.
+"""
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Attributes
+    ----------
+    qps : float
+        Tokens added per second.
+
+    burst : float
+        Capacity of the bucket.
+
+    Methods
+    -------
+    acquire(
+        self,
+        timeout: Optional[float] = None
+    ) -> bool:
+        Wait for a token.
+
+    try_acquire(self) -> bool:
+        Take a token if one is available.
+
+    delay(self) -> float:
+        Seconds until a token is available.
+    """
+
+    def __init__(
+        self: "RateLimiter", qps: float, burst: Optional[float] = None
+    ) -> None:
+        """
+        Initialize rate limiter.
+
+        Parameters
+        ----------
+        qps : float
+            Tokens added per second.
+
+        burst : Optional[float], optional
+            Capacity of the bucket, by default max(1, qps).
+
+        Examples
+        --------
+        >>> from wenxinworkshop import RateLimiter
+        >>> limiter = RateLimiter(qps=5)
+        >>> limiter.acquire()
+        True
+        """
+        if qps <= 0:
+            raise ValueError("qps must be positive.")
+
+        self.qps = qps
+        self.burst = burst if burst is not None else max(1.0, qps)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __getstate__(self: "RateLimiter") -> Dict[str, Any]:
+        return {"qps": self.qps, "burst": self.burst}
+
+    def __setstate__(self: "RateLimiter", state: Dict[str, Any]) -> None:
+        self.__init__(**state)  # type: ignore
+
+    def _refill(self: "RateLimiter") -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.qps)
+        self._updated = now
+
+    def delay(self: "RateLimiter") -> float:
+        """
+        Seconds until a token is available.
+
+        Returns
+        -------
+        float
+            0.0 if a token is available now.
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (1.0 - self._tokens) / self.qps)
+
+    def try_acquire(self: "RateLimiter") -> bool:
+        """
+        Take a token if one is available.
+
+        Returns
+        -------
+        bool
+            Whether a token was taken.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def acquire(self: "RateLimiter", timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a token.
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            Maximum seconds to wait, by default None (wait forever). The wait
+            is also bounded by the current deadline.
+
+        Returns
+        -------
+        bool
+            Whether a token was taken before the timeout.
+
+        Raises
+        ------
+        DeadlineExceeded
+            If the current deadline has passed.
+        """
+        timeout = remaining(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.qps
+
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left < wait:
+                    return False
+
+            time.sleep(wait)
@@ -0,0 +1,401 @@
+import re
+import json
+import functools
+
+from typing import Any, Dict, List, Optional, Union
+
+from .types import Embeddings
+
+
+__all__ = [
+    "LazyResponse",
+    "ChatCompletion",
+    "EmbeddingList",
+    "AIStudioChatCompletion",
+    "AIStudioEmbeddingList",
+]
+
+
+"""
+Response objects of Wenxin Workshop.
+"""
+
+
+_decoder = json.JSONDecoder()
+
+_MISSING = object()
+
+
+@functools.lru_cache(maxsize=None)
+def _key_pattern(key: str) -> "re.Pattern[str]":
+    # A key is only matched right after `{` or `,`: inside a JSON string every
+    # quote is escaped, so a match can never be part of a string value.
+    return re.compile(r'[{,]\s*"' + re.escape(key) + r'"\s*:\s*')
+
+
+# Strings, skipped whole, and brackets, counted for the nesting depth.
+_STRUCTURE = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+
+
+def _scan(text: str, key: str, start: int = 0) -> Any:
+    """
+    Decode the value of the key `key` of the top-level object of a JSON text,
+    without decoding the rest of the text.
+    """
+    depth = 0
+    position = start
+    for match in _key_pattern(key).finditer(text, start):
+        # Nesting depth at the `{` or `,` before the key; keys of nested
+        # objects (e.g. in `function_call` or `usage`) are skipped.
+        end = match.start() + 1
+        for token in _STRUCTURE.finditer(text, position, end):
+            c = token.group()
+            if c == "{" or c == "[":
+                depth += 1
+            elif c == "}" or c == "]":
+                depth -= 1
+        position = end
+        if depth == 1:
+            return _decoder.raw_decode(text, match.end())[0]
+    return _MISSING
+
+
+class LazyResponse:
+    """
+    JSON response kept as raw bytes, whose fields are decoded on access.
+
+    Fields are read with attribute access on the subclasses, or with
+    `response['field']` / `response.get('field')`. Reading a single field
+    only decodes that field; `data` decodes the whole response once.
+
+    Attributes
+    ----------
+    raw : bytes
+        Body of the response.
+
+    text : str
+        Body of the response, decoded as UTF-8.
+
+    data : Dict[str, Any]
+        Whole decoded response.
+    """
+
+    __slots__ = ("raw", "_text", "_data")
+
+    def __init__(self: "LazyResponse", raw: Union[bytes, str]) -> None:
+        """
+        Wrap the body of a response.
+
+        Parameters
+        ----------
+        raw : Union[bytes, str]
+            Body of the response.
+        """
+        if isinstance(raw, str):
+            self._text: Optional[str] = raw
+            self.raw = raw.encode("UTF-8")
+        else:
+            self._text = None
+            self.raw = raw
+        self._data: Optional[Dict[str, Any]] = None
+
+    @property
+    def text(self: "LazyResponse") -> str:
+        if self._text is None:
+            self._text = self.raw.decode("UTF-8")
+        return self._text
+
+    @property
+    def data(self: "LazyResponse") -> Dict[str, Any]:
+        if self._data is None:
+            self._data = json.loads(self.text)
+        return self._data
+
+    def get(self: "LazyResponse", key: str, default: Any = None) -> Any:
+        """
+        Get a top-level field, decoding only that field.
+
+        Parameters
+        ----------
+        key : str
+            Name of the field.
+
+        default : Any, optional
+            Value if the field is absent, by default None.
+
+        Returns
+        -------
+        Any
+            Value of the field.
+        """
+        if self._data is not None:
+            return self._data.get(key, default)
+        try:
+            value = _scan(self.text, key)
+        except ValueError:
+            value = _MISSING
+        if value is _MISSING:
+            # Not found by the fast path: decode everything.
+            return self.data.get(key, default)
+        return value
+
+    def __getitem__(self: "LazyResponse", key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __repr__(self: "LazyResponse") -> str:
+        return "{}({})".format(self.__class__.__name__, self.text)
+
+
+class ChatCompletion(LazyResponse):
+    """
+    Response of LLM API.
+
+    Only `result` is decoded when the response is received; the other
+    fields are decoded from the raw body on first access.
+
+    Attributes
+    ----------
+    result : str
+        Generated text, ending before the first stop sequence if any.
+
+    id : str
+        ID of the response.
+
+    created : int
+        Created time of the response.
+
+    is_truncated : bool
+        Whether the response is truncated.
+
+    need_clear_history : bool
+        Whether to clear the history.
+
+    ban_round : int
+        Ban round of the response.
+
+    usage : ChatUsage
+        Usage of the response.
+
+    function_call : Optional[Dict[str, str]]
+        Function call of the response (name, thoughts and JSON-encoded
+        arguments), None if the model did not call a function.
+    """
+
+    __slots__ = ("result",)
+
+    def __init__(
+        self: "ChatCompletion", raw: Union[bytes, str], stop: Optional[List[str]] = None
+    ) -> None:
+        """
+        Wrap the body of a response of LLM API.
+
+        Parameters
+        ----------
+        raw : Union[bytes, str]
+            Body of the response.
+
+        stop : Optional[List[str]], optional
+            Stop sequences, the result ends before the first one, by default None.
+
+        Raises
+        ------
+        ValueError
+            If the response has no result, e.g. an error response.
+        """
+        super().__init__(raw)
+        try:
+            result = _scan(self.text, "result")
+        except ValueError:
+            result = _MISSING
+        if not isinstance(result, str):
+            raise ValueError(self.text)
+
+        for stop_sequence in stop or []:
+            if stop_sequence and stop_sequence in result:
+                result = result[: result.index(stop_sequence)]
+        self.result: str = result
+
+    @property
+    def id(self: "ChatCompletion") -> str:
+        return self.get("id")
+
+    @property
+    def created(self: "ChatCompletion") -> int:
+        return self.get("created")
+
+    @property
+    def is_truncated(self: "ChatCompletion") -> bool:
+        return self.get("is_truncated")
+
+    @property
+    def need_clear_history(self: "ChatCompletion") -> bool:
+        return self.get("need_clear_history")
+
+    @property
+    def ban_round(self: "ChatCompletion") -> int:
+        return self.get("ban_round")
+
+    @property
+    def usage(self: "ChatCompletion") -> Dict[str, int]:
+        return self.get("usage")
+
+    @property
+    def function_call(self: "ChatCompletion") -> Optional[Dict[str, str]]:
+        return self.get("function_call")
+
+    def __str__(self: "ChatCompletion") -> str:
+        return self.result
+
+
+class EmbeddingList(LazyResponse):
+    """
+    Response of Embedding API.
+
+    Only the embedding vectors are decoded when the response is received,
+    without building a dict per embedding; the other fields are decoded from
+    the raw body on first access.
+
+    Attributes
+    ----------
+    embeddings : Embeddings
+        Embeddings, in the order of the texts.
+
+    id : str
+        ID of the response.
+
+    created : int
+        Created time of the response.
+
+    usage : EmbeddingUsage
+        Usage of the response.
+    """
+
+    __slots__ = ("embeddings",)
+
+    def __init__(self: "EmbeddingList", raw: Union[bytes, str]) -> None:
+        """
+        Wrap the body of a response of Embedding API.
+
+        Parameters
+        ----------
+        raw : Union[bytes, str]
+            Body of the response.
+
+        Raises
+        ------
+        ValueError
+            If the response has no embeddings, e.g. an error response.
+        """
+        super().__init__(raw)
+        text = self.text
+        pattern = _key_pattern("embedding")
+        embeddings: Embeddings = []
+
+        try:
+            # Decode each vector where it is, skipping the objects around them.
+            match = pattern.search(text)
+            while match is not None:
+                embedding, end = _decoder.raw_decode(text, match.end())
+                embeddings.append(embedding)
+                match = pattern.search(text, end)
+
+            if not embeddings:
+                embeddings = [item["embedding"] for item in self._items()]
+        except (ValueError, TypeError, KeyError):
+            raise ValueError(text)
+
+        self.embeddings = embeddings
+
+    def _items(self: "EmbeddingList") -> List[Dict[str, Any]]:
+        return self.data["data"]
+
+    @property
+    def id(self: "EmbeddingList") -> str:
+        return self.get("id")
+
+    @property
+    def created(self: "EmbeddingList") -> int:
+        return self.get("created")
+
+    @property
+    def usage(self: "EmbeddingList") -> Dict[str, int]:
+        return self.get("usage")
+
+    def __len__(self: "EmbeddingList") -> int:
+        return len(self.embeddings)
+
+
+class AIStudioChatCompletion(ChatCompletion):
+    """
+    Response of LLM API of AI Studio.
+
+    Attributes
+    ----------
+    result : str
+        Generated text.
+
+    log_id : str
+        Log ID of the response.
+
+    id : str
+        ID of the chat.
+
+    usage : AIStudioChatUsage
+        Usage of the chat.
+    """
+
+    __slots__ = ("_result",)
+
+    def __init__(self: "AIStudioChatCompletion", raw: Union[bytes, str]) -> None:
+        LazyResponse.__init__(self, raw)
+        try:
+            outer = _scan(self.text, "result")
+            result = outer["result"]
+        except (ValueError, TypeError, KeyError):
+            raise ValueError(self.text)
+        if not isinstance(result, str):
+            raise ValueError(self.text)
+        self._result: Dict[str, Any] = outer
+        self.result = result
+
+    @property
+    def log_id(self: "AIStudioChatCompletion") -> str:
+        return LazyResponse.get(self, "logId")
+
+    def get(self: "AIStudioChatCompletion", key: str, default: Any = None) -> Any:
+        # Chat fields are nested in the result object of AI Studio responses.
+        return self._result.get(key, default)
+
+
+class AIStudioEmbeddingList(EmbeddingList):
+    """
+    Response of Embedding API of AI Studio.
+
+    Attributes
+    ----------
+    embeddings : Embeddings
+        Embeddings, in the order of the texts.
+
+    log_id : str
+        Log ID of the response.
+
+    usage : AIStudioEmbeddingUsage
+        Usage of the response.
+    """
+
+    __slots__ = ()
+
+    def _items(self: "AIStudioEmbeddingList") -> List[Dict[str, Any]]:
+        return self.data["result"]["data"]
+
+    @property
+    def log_id(self: "AIStudioEmbeddingList") -> str:
+        return LazyResponse.get(self, "logId")
+
+    def get(self: "AIStudioEmbeddingList", key: str, default: Any = None) -> Any:
+        # Embedding fields are nested in the result object of AI Studio responses.
+        result = LazyResponse.get(self, "result", {})
+        return result.get(key, default) if isinstance(result, dict) else default
@@ -0,0 +1,480 @@
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+import collections
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .ratelimit import RateLimiter
+from .deadlines import DeadlineExceeded, remaining
+
+
+__all__ = [
+    "Scheduler",
+    "ScheduledAPI",
+]
+
+
+"""
+Request scheduling of Wenxin Workshop.
+"""
+
+
+class _Request:
+    """
+    One queued request of a scheduler.
+    """
+
+    __slots__ = (
+        "function",
+        "args",
+        "kwargs",
+        "priority",
+        "tenant",
+        "deadline",
+        "submitted",
+        "future",
+        "context",
+    )
+
+    def __init__(
+        self: "_Request",
+        function: Callable[..., Any],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        priority: int,
+        tenant: Any,
+        deadline: Optional[float],
+    ) -> None:
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.tenant = tenant
+        self.deadline = deadline
+        self.submitted = time.monotonic()
+        self.future: "Future[Any]" = Future()
+        self.context = contextvars.copy_context()
+
+
+class Scheduler:
+    """
+    Client-side request scheduler with priority classes and fair queuing.
+
+    Requests are started by a fixed number of workers, at most `qps` per
+    second when a rate limiter is given, in this order:
+
+    - by priority class, lower first (INTERACTIVE before NORMAL before BATCH);
+    - within a class, by weighted fair queuing between tenants (e.g. user_ids),
+      so a tenant submitting a large backfill does not starve the others.
+
+    A request with a deadline which can no longer be met, because it expired
+    or because the rate limiter cannot start it in time, is dropped and its
+    future fails with TimeoutError.
+
+    Attributes
+    ----------
+    workers : int
+        Number of requests running at the same time.
+
+    limiter : Optional[RateLimiter]
+        Rate limiter shared by all requests, None if unlimited.
+
+    weights : Dict[Any, float]
+        Weight of each tenant, 1.0 for tenants not listed.
+
+    Methods
+    -------
+    submit(
+        self,
+        function: Callable[..., Any],
+        *args: Any,
+        priority: int = Scheduler.NORMAL,
+        tenant: Any = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> Future:
+        Queue a call of the function.
+
+    stats(self) -> Dict[str, Any]:
+        Counters, queue depth and wait time of each priority class.
+
+    close(self) -> None:
+        Stop the scheduler and cancel the queued requests.
+    """
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BATCH = 2
+
+    def __init__(
+        self: "Scheduler",
+        workers: int = 8,
+        limiter: Optional[RateLimiter] = None,
+        weights: Optional[Dict[Any, float]] = None,
+    ) -> None:
+        """
+        Initialize scheduler.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of requests running at the same time, by default 8.
+
+        limiter : Optional[RateLimiter], optional
+            Rate limiter shared by all requests, e.g. the QPS quota of the
+            credential, by default None.
+
+        weights : Optional[Dict[Any, float]], optional
+            Weight of each tenant, by default 1.0 for every tenant.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import Scheduler, RateLimiter
+        >>> scheduler = Scheduler(workers=8, limiter=RateLimiter(qps=5))
+        >>> future = scheduler.submit(erniebot, messages=messages, priority=Scheduler.INTERACTIVE)
+        >>> future.result()
+        """
+        if workers < 1:
+            raise ValueError("workers must be positive.")
+
+        self.workers = workers
+        self.limiter = limiter
+        self.weights = weights or {}
+        self._queue: List[Tuple[int, float, int, _Request]] = []
+        self._counter = itertools.count()
+        self._virtual: Dict[int, float] = collections.defaultdict(float)
+        self._finish: Dict[Tuple[int, Any], float] = {}
+        self._running = 0
+        self._closed = False
+        self._counts: Dict[str, int] = collections.Counter()
+        self._depths: Dict[int, int] = collections.Counter()
+        self._waits: Dict[int, Deque[float]] = collections.defaultdict(
+            lambda: collections.deque(maxlen=1024)
+        )
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self: "Scheduler",
+        function: Callable[..., Any],
+        *args: Any,
+        priority: int = NORMAL,
+        tenant: Any = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> "Future[Any]":
+        """
+        Queue a call of the function.
+
+        Parameters
+        ----------
+        function : Callable[..., Any]
+            Function to call, e.g. an API.
+
+        *args : Any
+            Positional arguments of the function.
+
+        priority : int, optional
+            Priority class, lower runs first, by default Scheduler.NORMAL.
+
+        tenant : Any, optional
+            Tenant the request is fairly queued as, by default None.
+
+        timeout : Optional[float], optional
+            Seconds the request may wait before it must start, by default None.
+            The current deadline also applies, to the wait and to the call.
+
+        **kwargs : Any
+            Keyword arguments of the function.
+
+        Returns
+        -------
+        Future
+            Future of the result of the function.
+        """
+        timeout = remaining(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        request = _Request(function, args, kwargs, priority, tenant, deadline)
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed.")
+
+            # Weighted fair queuing: the virtual finish time of a request grows
+            # by 1 / weight for every request of its tenant still queued.
+            key = (priority, tenant)
+            start = max(self._virtual[priority], self._finish.get(key, 0.0))
+            finish = self._finish[key] = start + 1.0 / self.weights.get(tenant, 1.0)
+
+            heapq.heappush(self._queue, (priority, finish, next(self._counter), request))
+            self._counts["submitted"] += 1
+            self._depths[priority] += 1
+            self._condition.notify_all()
+
+        return request.future
+
+    def _drop(self: "Scheduler", request: _Request) -> None:
+        # A future cancelled by its caller (e.g. at the deadline of a
+        # ScheduledAPI call) is only discarded.
+        if not request.future.set_running_or_notify_cancel():
+            return
+        self._counts["dropped"] += 1
+        request.future.set_exception(
+            TimeoutError("Request dropped, its deadline can no longer be met.")
+        )
+
+    def _expire(self: "Scheduler", now: float) -> None:
+        expired = [
+            item
+            for item in self._queue
+            if item[3].deadline is not None and item[3].deadline < now
+        ]
+        if expired:
+            self._queue = [
+                item
+                for item in self._queue
+                if item[3].deadline is None or item[3].deadline >= now
+            ]
+            heapq.heapify(self._queue)
+            for item in expired:
+                self._depths[item[0]] -= 1
+                self._drop(item[3])
+
+    def _dispatch(self: "Scheduler") -> None:
+        while True:
+            with self._condition:
+                while not self._closed:
+                    # Drop expired requests even while every worker is busy,
+                    # waking up at the earliest deadline in the queue.
+                    self._expire(time.monotonic())
+                    if self._queue and self._running < self.workers:
+                        break
+                    deadlines = [
+                        item[3].deadline
+                        for item in self._queue
+                        if item[3].deadline is not None
+                    ]
+                    self._condition.wait(
+                        min(deadlines) - time.monotonic() if deadlines else None
+                    )
+                if self._closed:
+                    return
+
+                now = time.monotonic()
+                delay = self.limiter.delay() if self.limiter is not None else 0.0
+                self._expire(now + delay)
+                if not self._queue:
+                    continue
+
+                if delay > 0.0:
+                    # Wait for the rate limiter, but re-evaluate the head of
+                    # the queue if a more urgent request arrives meanwhile.
+                    self._condition.wait(delay)
+                    continue
+
+                if self.limiter is not None and not self.limiter.try_acquire():
+                    continue
+
+                priority, finish, _, request = heapq.heappop(self._queue)
+                self._virtual[priority] = finish
+                if len(self._finish) > 2 * len(self._queue) + 64:
+                    # Finish times at or below the virtual time are the same
+                    # as none, e.g. of tenants with nothing queued: evict them.
+                    self._finish = {
+                        key: finish_time
+                        for key, finish_time in self._finish.items()
+                        if finish_time > self._virtual[key[0]]
+                    }
+                self._depths[priority] -= 1
+                self._waits[priority].append(now - request.submitted)
+
+                if not request.future.set_running_or_notify_cancel():
+                    continue
+                self._running += 1
+
+            try:
+                self._executor.submit(self._run, request)
+            except Exception as e:
+                # E.g. the executor is shut down: fail this request only, so
+                # the dispatcher keeps running.
+                request.future.set_exception(e)
+                with self._condition:
+                    self._counts["failed"] += 1
+                    self._running -= 1
+
+    def _run(self: "Scheduler", request: _Request) -> None:
+        try:
+            result = request.context.run(
+                request.function, *request.args, **request.kwargs
+            )
+        except BaseException as e:
+            request.future.set_exception(e)
+            outcome = "failed"
+        else:
+            request.future.set_result(result)
+            outcome = "completed"
+
+        with self._condition:
+            self._counts[outcome] += 1
+            self._running -= 1
+            self._condition.notify_all()
+
+    def stats(self: "Scheduler") -> Dict[str, Any]:
+        """
+        Counters, queue depth and wait time of each priority class.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Requests submitted, completed, failed and dropped, requests
+            running, and for each priority class the queue depth and the
+            p50 / p95 wait in milliseconds of its last 1024 started requests.
+        """
+        with self._condition:
+            classes = {}
+            for priority in sorted(set(self._depths) | set(self._waits)):
+                waits = sorted(self._waits[priority])
+                classes[priority] = {
+                    "queued": self._depths[priority],
+                    "wait_p50_ms": waits[len(waits) // 2] * 1000 if waits else 0.0,
+                    "wait_p95_ms": waits[int(len(waits) * 0.95)] * 1000 if waits else 0.0,
+                }
+
+            return {
+                "submitted": self._counts["submitted"],
+                "completed": self._counts["completed"],
+                "failed": self._counts["failed"],
+                "dropped": self._counts["dropped"],
+                "running": self._running,
+                "queued": len(self._queue),
+                "classes": classes,
+            }
+
+    def close(self: "Scheduler") -> None:
+        """
+        Stop the scheduler, cancel the queued requests and wait for the running ones.
+        """
+        with self._condition:
+            self._closed = True
+            for _, _, _, request in self._queue:
+                request.future.cancel()
+            self._queue = []
+            self._depths.clear()
+            self._condition.notify_all()
+
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self: "Scheduler") -> "Scheduler":
+        return self
+
+    def __exit__(self: "Scheduler", *args: Any) -> None:
+        self.close()
+
+
+class ScheduledAPI:
+    """
+    API whose calls go through a scheduler.
+
+    Attributes
+    ----------
+    api : Union[LLMAPI, EmbeddingAPI, PromptTemplateAPI, AIStudioLLMAPI, AIStudioEmbeddingAPI]
+        API to send the requests with.
+
+    scheduler : Scheduler
+        Scheduler the calls are queued in.
+
+    priority : int
+        Priority class of the calls.
+
+    tenant : Any
+        Tenant of the calls, by default the user_id of each call.
+
+    timeout : Optional[float]
+        Seconds a call may wait in the queue.
+    """
+
+    def __init__(
+        self: "ScheduledAPI",
+        api: Any,
+        scheduler: Scheduler,
+        priority: int = Scheduler.NORMAL,
+        tenant: Any = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Initialize scheduled API.
+
+        Parameters
+        ----------
+        api : Union[LLMAPI, EmbeddingAPI, PromptTemplateAPI, AIStudioLLMAPI, AIStudioEmbeddingAPI]
+            API to send the requests with.
+
+        scheduler : Scheduler
+            Scheduler the calls are queued in.
+
+        priority : int, optional
+            Priority class of the calls, by default Scheduler.NORMAL.
+
+        tenant : Any, optional
+            Tenant of the calls, by default the user_id of each call.
+
+        timeout : Optional[float], optional
+            Seconds a call may wait in the queue, by default None.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import Scheduler, ScheduledAPI
+        >>> scheduler = Scheduler(limiter=RateLimiter(qps=5))
+        >>> chat = ScheduledAPI(erniebot, scheduler, priority=Scheduler.INTERACTIVE, timeout=10)
+        >>> backfill = ScheduledAPI(ernieembedding, scheduler, priority=Scheduler.BATCH)
+        """
+        self.api = api
+        self.scheduler = scheduler
+        self.priority = priority
+        self.tenant = tenant
+        self.timeout = timeout
+
+    def __call__(self: "ScheduledAPI", **kwargs: Any) -> Any:
+        """
+        Queue a call of the API and wait for its result.
+
+        Parameters
+        ----------
+        **kwargs : Any
+            Keyword arguments of the API call.
+
+        Returns
+        -------
+        Any
+            Result of the API call.
+
+        Raises
+        ------
+        TimeoutError
+            If the call was dropped because it could not start in time.
+
+        DeadlineExceeded
+            If the current deadline passed before the result.
+        """
+        future = self.scheduler.submit(
+            self.api,
+            priority=self.priority,
+            tenant=self.tenant if self.tenant is not None else kwargs.get("user_id"),
+            timeout=self.timeout,
+            **kwargs,
+        )
+        try:
+            future.exception(remaining())
+        except FutureTimeoutError as e:
+            future.cancel()
+            raise DeadlineExceeded("Deadline exceeded.") from e
+        return future.result()
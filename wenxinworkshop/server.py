@@ -0,0 +1,813 @@
+import json
+import time
+import uuid
+import base64
+import asyncio
+import threading
+
+from array import array
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from .apis import LLMAPI, EmbeddingAPI, AIStudioLLMAPI, AIStudioEmbeddingAPI
+from .coalesce import AsyncSingleFlight
+from .encoding import request_fingerprint
+from .journal import Journal
+from .models import ModelInfo, get_model, list_models
+from .pool import CredentialPool, THROTTLE_ERROR_CODES, get_error_code
+from .transports import Transport
+
+
+__all__ = [
+    "ProxyServer",
+]
+
+
+"""
+OpenAI-compatible proxy server of Wenxin Workshop.
+"""
+
+
+_MISSING = object()
+
+_END = object()
+
+
+class _HTTPError(Exception):
+    """
+    Error answered to the client, in the format of the OpenAI API.
+    """
+
+    def __init__(
+        self: "_HTTPError", status: int, message: str, type: str = "invalid_request_error"
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.type = type
+
+    @classmethod
+    def upstream(cls: type, error: Exception) -> "_HTTPError":
+        # Throttling is answered as such, so clients back off; other errors
+        # of the API are the client's, transport errors are the upstream's.
+        code = get_error_code(error)
+        if code in THROTTLE_ERROR_CODES:
+            return cls(429, str(error), "rate_limit_error")
+        if code is not None:
+            return cls(400, str(error))
+        return cls(502, "Upstream request failed: {}".format(error), "upstream_error")
+
+    def body(self: "_HTTPError") -> Dict[str, Any]:
+        return {"error": {"message": self.message, "type": self.type, "code": self.status}}
+
+
+def _is_aistudio(info: ModelInfo) -> bool:
+    return urlsplit(info.url).netloc.startswith("aistudio.")
+
+
+def _messages(messages: Any) -> List[Dict[str, Any]]:
+    # ERNIE has no system role: system messages are prepended to the first
+    # user message.
+    if not isinstance(messages, list) or not messages:
+        raise _HTTPError(400, "messages must be a non-empty list.")
+
+    system: List[str] = []
+    converted: List[Dict[str, Any]] = []
+    for message in messages:
+        if not isinstance(message, dict):
+            raise _HTTPError(400, "Each message must be an object.")
+
+        role = message.get("role")
+        content = message.get("content")
+        if content is None:
+            content = ""
+        elif isinstance(content, list):
+            # Content parts: only text is supported.
+            if not all(
+                isinstance(part, dict) and isinstance(part.get("text", ""), str)
+                for part in content
+            ):
+                raise _HTTPError(400, "Each content part must be an object with a text.")
+            content = "".join(part.get("text", "") for part in content)
+        elif not isinstance(content, str):
+            raise _HTTPError(400, "content must be a string or a list of content parts.")
+
+        if role == "system":
+            system.append(content)
+            continue
+        if role not in ("user", "assistant", "function"):
+            raise _HTTPError(400, "Unsupported message role: {!r}.".format(role))
+
+        item: Dict[str, Any] = {"role": role, "content": content}
+        for key in ("name", "function_call"):
+            if message.get(key) is not None:
+                item[key] = message[key]
+        converted.append(item)
+
+    if not converted or converted[0]["role"] != "user":
+        raise _HTTPError(
+            400, "messages must start with a user message, after any system message."
+        )
+    if system:
+        converted[0]["content"] = "\n\n".join(system + [converted[0]["content"]])
+    return converted
+
+
+def _functions(request: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    # Legacy `functions`, or function `tools`.
+    functions = request.get("functions")
+    if functions:
+        if not isinstance(functions, list) or not all(
+            isinstance(function, dict) for function in functions
+        ):
+            raise _HTTPError(400, "functions must be a list of objects.")
+        return functions
+
+    tools = request.get("tools") or []
+    if not isinstance(tools, list) or not all(isinstance(tool, dict) for tool in tools):
+        raise _HTTPError(400, "tools must be a list of objects.")
+    functions = []
+    for tool in tools:
+        if tool.get("type") != "function":
+            continue
+        if not isinstance(tool.get("function"), dict):
+            raise _HTTPError(400, "Each function tool must have a function object.")
+        functions.append(tool["function"])
+    return functions or None
+
+
+def _stop(stop: Any) -> Optional[List[str]]:
+    if isinstance(stop, str):
+        return [stop]
+    if stop is not None and (
+        not isinstance(stop, list) or not all(isinstance(s, str) for s in stop)
+    ):
+        raise _HTTPError(400, "stop must be a string or a list of strings.")
+    return stop
+
+
+def _number(request: Dict[str, Any], name: str) -> Optional[float]:
+    value = request.get(name)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+        raise _HTTPError(400, "{} must be a number.".format(name))
+    return value
+
+
+def _usage(usage: Optional[Dict[str, int]]) -> Dict[str, int]:
+    usage = usage or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0),
+    }
+
+
+def _encode_embedding(embedding: List[float], encoding_format: str) -> Any:
+    if encoding_format == "base64":
+        return base64.b64encode(array("f", embedding).tobytes()).decode("ascii")
+    return embedding
+
+
+class ProxyServer:
+    """
+    Local HTTP server exposing the APIs with the OpenAI chat and embedding API.
+
+    Services in any language can use an OpenAI client (`base_url` set to the
+    server) and share one sidecar per node, which concentrates the upstream
+    connections, access tokens and quota:
+
+    - `POST /v1/chat/completions`, blocking or streamed as server-sent events;
+    - `POST /v1/embeddings`, with float or base64 encoding;
+    - `GET /v1/models` and `GET /stats`.
+
+    Each model of the registry is served by a CredentialPool over all the
+    credentials of its platform, created on first use, so requests are spread
+    over the credentials within their rate limits and retried on throttling.
+    Every API shares one transport, i.e. one connection pool. Identical
+    concurrent blocking requests share one upstream request, and with a
+    journal embedding responses are also replayed across restarts; chat
+    completions are sampled, so they are never replayed. Embedding inputs are
+    split into batches of the maximum batch size of the model, sent
+    concurrently.
+
+    The server runs on asyncio and the blocking API calls run in a thread
+    pool, `workers` at a time.
+
+    Attributes
+    ----------
+    host : str
+        Host the server listens on.
+
+    port : int
+        Port the server listens on, chosen automatically if 0.
+
+    credentials : List[Dict[str, Any]]
+        Credentials of the pools (see CredentialPool).
+
+    chat_model : str
+        Model of chat requests without a model.
+
+    embedding_model : str
+        Model of embedding requests without a model.
+
+    transport : Optional[Transport]
+        Transport shared by all APIs.
+
+    journal : Optional[Journal]
+        Journal of the embedding responses, None to not record them.
+
+    group : AsyncSingleFlight
+        Group coalescing identical concurrent requests.
+
+    Methods
+    -------
+    start(self) -> ProxyServer:
+        Start listening.
+
+    serve_forever(self) -> None:
+        Start listening and serve until cancelled.
+
+    aclose(self) -> None:
+        Stop listening and shut the thread pool down.
+
+    stats(self) -> Dict[str, Any]:
+        Counters of the pools, of coalescing and of the journal.
+    """
+
+    def __init__(
+        self: "ProxyServer",
+        credentials: List[Dict[str, Any]],
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        chat_model: str = "ERNIE-Bot",
+        embedding_model: str = "Embedding-V1",
+        transport: Optional[Transport] = None,
+        journal: Optional[Journal] = None,
+        workers: int = 32,
+    ) -> None:
+        """
+        Initialize proxy server.
+
+        Parameters
+        ----------
+        credentials : List[Dict[str, Any]]
+            Credentials of the pools: api_key / secret_key for Baidu AI Cloud
+            models, user_id / access_token for AI Studio models, with the
+            optional 'weight' and 'qps' keys of CredentialPool.
+
+        host : str, optional
+            Host to listen on, by default '127.0.0.1'.
+
+        port : int, optional
+            Port to listen on, by default 8080. 0 chooses a free port.
+
+        chat_model : str, optional
+            Model of chat requests without a model, by default 'ERNIE-Bot'.
+
+        embedding_model : str, optional
+            Model of embedding requests without a model, by default 'Embedding-V1'.
+
+        transport : Optional[Transport], optional
+            Transport shared by all APIs, by default the default transport.
+
+        journal : Optional[Journal], optional
+            Journal of the embedding responses, by default None.
+
+        workers : int, optional
+            Maximum number of API calls running at the same time, by default 32.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import ProxyServer
+        >>> server = ProxyServer(
+        ...     credentials=[{'api_key': '...', 'secret_key': '...'}],
+        ...     port=8080
+        ... )
+        >>> asyncio.run(server.serve_forever())
+
+        >>> from openai import OpenAI
+        >>> client = OpenAI(base_url='http://127.0.0.1:8080/v1', api_key='-')
+        >>> client.chat.completions.create(model='ERNIE-Bot', messages=messages)
+        """
+        for credential in credentials:
+            if not (
+                {"api_key", "secret_key"} <= credential.keys()
+                or {"user_id", "access_token"} <= credential.keys()
+            ):
+                raise ValueError(
+                    "Each credential needs api_key and secret_key, or user_id and access_token."
+                )
+
+        self.host = host
+        self.port = port
+        self.credentials = credentials
+        self.chat_model = chat_model
+        self.embedding_model = embedding_model
+        self.transport = transport
+        self.journal = journal
+        self.group = AsyncSingleFlight()
+
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="wenxinworkshop-proxy")
+        self._clients: Dict[str, CredentialPool] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._streaming: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def base_url(self: "ProxyServer") -> str:
+        """
+        Base URL of the OpenAI API of the running server.
+        """
+        return "http://{}:{}/v1".format(self.host, self.port)
+
+    def _served(self: "ProxyServer", info: ModelInfo) -> bool:
+        aistudio = _is_aistudio(info)
+        return any(("access_token" in c) == aistudio for c in self.credentials)
+
+    def _client(self: "ProxyServer", info: ModelInfo) -> CredentialPool:
+        # Created on first use, in a worker: creating the APIs fetches their
+        # access tokens.
+        with self._lock:
+            client = self._clients.get(info.name)
+            if client is None:
+                aistudio = _is_aistudio(info)
+                if info.kind == "chat":
+                    api: type = AIStudioLLMAPI if aistudio else LLMAPI
+                else:
+                    api = AIStudioEmbeddingAPI if aistudio else EmbeddingAPI
+
+                kwargs: Dict[str, Any] = {"url": info.url, "transport": self.transport}
+                if aistudio and info.model is not None:
+                    kwargs["model"] = info.model
+
+                client = self._clients[info.name] = CredentialPool(
+                    api,
+                    [c for c in self.credentials if ("access_token" in c) == aistudio],
+                    **kwargs,
+                )
+            return client
+
+    def _model(self: "ProxyServer", name: Any, kind: str) -> ModelInfo:
+        try:
+            info = get_model(name)
+        except (KeyError, TypeError):
+            raise _HTTPError(404, "Unknown model: {!r}.".format(name), "model_not_found")
+        if info.kind != kind or not self._served(info):
+            raise _HTTPError(
+                404, "Model {!r} is not served for {}.".format(name, kind), "model_not_found"
+            )
+        return info
+
+    async def _run(self: "ProxyServer", function: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, function, *args)
+        except _HTTPError:
+            raise
+        except Exception as e:
+            raise _HTTPError.upstream(e)
+
+    async def _cached(
+        self: "ProxyServer",
+        key: str,
+        function: Callable[..., Any],
+        *args: Any,
+        journaled: bool = False,
+    ) -> Any:
+        # Coalesce identical concurrent requests, and replay or record the
+        # deterministic ones in the journal.
+        journal = self.journal if journaled else None
+
+        async def call() -> Any:
+            if journal is not None:
+                body = await self._run(journal.get, key, _MISSING)
+                if body is not _MISSING:
+                    return body
+
+            body = await self._run(function, *args)
+            if journal is not None:
+                await self._run(journal.put, key, body)
+            return body
+
+        return await self.group.do(key, call)
+
+    def _complete(
+        self: "ProxyServer", info: ModelInfo, kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        completion = self._client(info)(full_response=True, **kwargs)
+        function_call = completion.function_call
+
+        message: Dict[str, Any] = {"role": "assistant", "content": completion.result}
+        if function_call:
+            message["content"] = None
+            message["function_call"] = {
+                "name": function_call.get("name"),
+                "arguments": function_call.get("arguments"),
+            }
+
+        if function_call:
+            finish_reason = "function_call"
+        elif completion.get("is_truncated"):
+            finish_reason = "length"
+        else:
+            finish_reason = "stop"
+
+        return {
+            "id": "chatcmpl-{}".format(completion.id or uuid.uuid4().hex),
+            "object": "chat.completion",
+            "created": completion.created or int(time.time()),
+            "model": info.name,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": _usage(completion.usage),
+        }
+
+    def _embed(
+        self: "ProxyServer", info: ModelInfo, texts: List[str]
+    ) -> Dict[str, Any]:
+        embeddings = self._client(info)(texts=texts, full_response=True)
+        return {
+            "embeddings": embeddings.embeddings,
+            "prompt_tokens": _usage(embeddings.usage)["prompt_tokens"],
+        }
+
+    async def _chat(
+        self: "ProxyServer", request: Dict[str, Any], writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> None:
+        info = self._model(request.get("model") or self.chat_model, "chat")
+        kwargs: Dict[str, Any] = {
+            "messages": _messages(request.get("messages")),
+            "temperature": _number(request, "temperature"),
+            "top_p": _number(request, "top_p"),
+        }
+        if not _is_aistudio(info):
+            kwargs.update(
+                user_id=request.get("user"),
+                stop=_stop(request.get("stop")),
+                functions=_functions(request),
+            )
+        else:
+            unsupported = [
+                name
+                for name in ("stop", "functions", "tools")
+                if request.get(name) is not None
+            ]
+            if unsupported:
+                raise _HTTPError(
+                    400,
+                    "Model {!r} does not support: {}.".format(info.name, ", ".join(unsupported)),
+                )
+
+        if request.get("stream") and not _is_aistudio(info):
+            await self._stream(info, kwargs, writer)
+            return
+
+        if request.get("stream"):
+            # AI Studio does not stream: one chunk with the whole response.
+            body = await self._run(self._complete, info, kwargs)
+
+            async def chunks() -> AsyncIterator[str]:
+                yield body["choices"][0]["message"].get("content") or ""
+
+            await self._send_events(writer, body["id"], info.name, chunks())
+            return
+
+        key = request_fingerprint(info.name, kwargs)
+        body = await self._cached(key, self._complete, info, kwargs)
+        await self._send(writer, 200, body, keep_alive)
+
+    async def _stream(
+        self: "ProxyServer",
+        info: ModelInfo,
+        kwargs: Dict[str, Any],
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        response_stream = await self._run(
+            lambda: self._client(info)(stream=True, **kwargs)
+        )
+
+        async def chunks() -> AsyncIterator[str]:
+            chunk = first
+            while chunk is not _END:
+                yield chunk
+                chunk = await self._run(next, response_stream, _END)
+
+        try:
+            # Errors of the API usually come with the first chunk, while the
+            # status code can still tell them.
+            first = await self._run(next, response_stream, _END)
+            await self._send_events(
+                writer, "chatcmpl-{}".format(uuid.uuid4().hex), info.name, chunks()
+            )
+        finally:
+            response_stream.close()
+
+    async def _send_events(
+        self: "ProxyServer",
+        writer: asyncio.StreamWriter,
+        id: str,
+        model: str,
+        chunks: AsyncIterator[str],
+    ) -> None:
+        created = int(time.time())
+
+        def event(delta: Dict[str, Any], finish_reason: Optional[str]) -> Dict[str, Any]:
+            return {
+                "id": id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        self._streaming.add(writer)
+        self._write_head(
+            writer,
+            200,
+            [
+                ("Content-Type", "text/event-stream"),
+                ("Cache-Control", "no-cache"),
+                ("Transfer-Encoding", "chunked"),
+            ],
+        )
+        delta: Dict[str, Any] = {"role": "assistant", "content": ""}
+        try:
+            async for chunk in chunks:
+                await self._write_event(writer, event(dict(delta, content=chunk), None))
+                delta = {}
+            final: Dict[str, Any] = event({}, "stop")
+        except _HTTPError as e:
+            # Too late for a status code: the error is the last event.
+            final = e.body()
+
+        await self._write_event(writer, final)
+        await self._write_chunk(writer, b"data: [DONE]\n\n")
+        await self._write_chunk(writer, b"")
+        self._streaming.discard(writer)
+
+    async def _embeddings(
+        self: "ProxyServer", request: Dict[str, Any], writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> None:
+        info = self._model(request.get("model") or self.embedding_model, "embedding")
+        texts = request.get("input")
+        if isinstance(texts, str):
+            texts = [texts]
+        if (
+            not isinstance(texts, list)
+            or not texts
+            or not all(isinstance(text, str) for text in texts)
+        ):
+            raise _HTTPError(400, "input must be a string or a non-empty list of strings.")
+
+        encoding_format = request.get("encoding_format") or "float"
+        if encoding_format not in ("float", "base64"):
+            raise _HTTPError(400, "encoding_format must be 'float' or 'base64'.")
+
+        size = info.max_batch_size or 16
+        batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+        results = await asyncio.gather(
+            *(
+                self._cached(
+                    request_fingerprint(info.name, {"texts": batch}),
+                    self._embed,
+                    info,
+                    batch,
+                    journaled=True,
+                )
+                for batch in batches
+            )
+        )
+
+        data: List[Dict[str, Any]] = []
+        for result in results:
+            for embedding in result["embeddings"]:
+                data.append(
+                    {
+                        "object": "embedding",
+                        "index": len(data),
+                        "embedding": _encode_embedding(embedding, encoding_format),
+                    }
+                )
+        prompt_tokens = sum(result["prompt_tokens"] for result in results)
+
+        await self._send(
+            writer,
+            200,
+            {
+                "object": "list",
+                "data": data,
+                "model": info.name,
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+            },
+            keep_alive,
+        )
+
+    def _models(self: "ProxyServer") -> Dict[str, Any]:
+        return {
+            "object": "list",
+            "data": [
+                {"id": info.name, "object": "model", "owned_by": "baidu"}
+                for info in list_models()
+                if self._served(info)
+            ],
+        }
+
+    def stats(self: "ProxyServer") -> Dict[str, Any]:
+        """
+        Counters of the pools, of coalescing and of the journal.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Credential stats of the pool of each model used so far,
+            coalescing counters, and journal counters if there is a journal.
+        """
+        with self._lock:
+            clients = dict(self._clients)
+
+        stats: Dict[str, Any] = {
+            "models": {name: client.stats() for name, client in clients.items()},
+            "coalescing": self.group.stats(),
+        }
+        if self.journal is not None:
+            stats["journal"] = self.journal.stats()
+        return stats
+
+    def _write_head(
+        self: "ProxyServer",
+        writer: asyncio.StreamWriter,
+        status: int,
+        headers: List[Tuple[str, str]],
+    ) -> None:
+        lines = ["HTTP/1.1 {} {}".format(status, HTTPStatus(status).phrase)]
+        lines.extend("{}: {}".format(name, value) for name, value in headers)
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _write_chunk(self: "ProxyServer", writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+
+    async def _write_event(
+        self: "ProxyServer", writer: asyncio.StreamWriter, data: Dict[str, Any]
+    ) -> None:
+        await self._write_chunk(
+            writer, b"data: %s\n\n" % json.dumps(data, ensure_ascii=False).encode("UTF-8")
+        )
+
+    async def _send(
+        self: "ProxyServer",
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: Dict[str, Any],
+        keep_alive: bool,
+    ) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("UTF-8")
+        self._write_head(
+            writer,
+            status,
+            [
+                ("Content-Type", "application/json"),
+                ("Content-Length", str(len(data))),
+                ("Connection", "keep-alive" if keep_alive else "close"),
+            ],
+        )
+        writer.write(data)
+        await writer.drain()
+
+    async def _read_request(
+        self: "ProxyServer", reader: asyncio.StreamReader
+    ) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        line = await reader.readline()
+        if not line.strip():
+            return None
+
+        try:
+            method, target, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise _HTTPError(400, "Malformed request line.")
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise _HTTPError(411, "Chunked request bodies are not supported.")
+        length = headers.get("content-length") or "0"
+        if not length.isdecimal():
+            raise _HTTPError(400, "Invalid Content-Length: {!r}.".format(length))
+        body = await reader.readexactly(int(length))
+        return method, urlsplit(target).path, headers, body
+
+    async def _handle(
+        self: "ProxyServer", reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _HTTPError as e:
+                    await self._send(writer, e.status, e.body(), False)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    await self._dispatch(method, path, body, writer, keep_alive)
+                except _HTTPError as e:
+                    await self._send(writer, e.status, e.body(), keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The client went away, e.g. in the middle of a stream.
+            pass
+        except Exception as e:
+            # A bug of the server: answered as such, unless a stream already
+            # sent its status code.
+            if writer not in self._streaming:
+                error = _HTTPError(500, "Internal server error: {!r}.".format(e), "server_error")
+                try:
+                    await self._send(writer, error.status, error.body(), False)
+                except ConnectionError:
+                    pass
+        finally:
+            self._streaming.discard(writer)
+            writer.close()
+
+    async def _dispatch(
+        self: "ProxyServer",
+        method: str,
+        path: str,
+        body: bytes,
+        writer: asyncio.StreamWriter,
+        keep_alive: bool,
+    ) -> None:
+        path = path.rstrip("/")
+        if method == "GET" and path == "/v1/models":
+            await self._send(writer, 200, self._models(), keep_alive)
+            return
+        if method == "GET" and path == "/stats":
+            await self._send(writer, 200, self.stats(), keep_alive)
+            return
+
+        handlers = {"/v1/chat/completions": self._chat, "/v1/embeddings": self._embeddings}
+        if path not in handlers:
+            raise _HTTPError(404, "Unknown endpoint: {} {}.".format(method, path), "not_found")
+        if method != "POST":
+            raise _HTTPError(405, "Use POST for {}.".format(path))
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            raise _HTTPError(400, "The body is not valid JSON.")
+        if not isinstance(request, dict):
+            raise _HTTPError(400, "The body must be a JSON object.")
+
+        await handlers[path](request, writer, keep_alive)
+
+    async def start(self: "ProxyServer") -> "ProxyServer":
+        """
+        Start listening.
+
+        Returns
+        -------
+        ProxyServer
+            The server itself.
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self: "ProxyServer") -> None:
+        """
+        Start listening and serve until cancelled.
+        """
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()  # type: ignore
+        finally:
+            await self.aclose()
+
+    async def aclose(self: "ProxyServer") -> None:
+        """
+        Stop listening and shut the thread pool down.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self: "ProxyServer") -> "ProxyServer":
+        return await self.start()
+
+    async def __aexit__(self: "ProxyServer", *args: Any) -> None:
+        await self.aclose()
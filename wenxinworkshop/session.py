@@ -0,0 +1,249 @@
+import json
+
+from typing import Any, Dict, Generator, Iterator, List, Optional, Union
+
+from .encoding import encode_json
+
+from .types import Message, Messages
+
+
+__all__ = [
+    "ChatSession",
+]
+
+
+"""
+Chat sessions of Wenxin Workshop.
+"""
+
+
+class ChatSession:
+    """
+    Multi-turn chat session with an incrementally encoded history.
+
+    Every request of a conversation resends the whole history. The session
+    keeps the JSON encoding of the messages sent so far and only encodes the
+    new turns, so the CPU spent per request stays constant instead of growing
+    with the length of the conversation.
+
+    Messages must be added through the session (`__call__` / `append`); after
+    editing `messages` in place call `reset()` to drop the encoded prefix.
+
+    Attributes
+    ----------
+    api : Union[LLMAPI, AIStudioLLMAPI]
+        LLM API to send the conversation to.
+
+    messages : Messages
+        History of the conversation.
+
+    options : Dict[str, Any]
+        Request fields sent with every request, e.g. temperature or user_id.
+
+    stats : Dict[str, int]
+        Number of requests, message bytes encoded and message bytes reused.
+
+    Methods
+    -------
+    append(self, message: Message) -> None:
+        Add a message to the history.
+
+    encode(self, **options: Any) -> bytes:
+        Encode the request body of the current history.
+
+    __call__(
+        self,
+        content: str,
+        stream: Optional[bool] = None,
+        **options: Any
+    ) -> Union[str, Generator[str, None, None]]:
+        Send a user message and add the reply to the history.
+
+    reset(self) -> None:
+        Drop the encoded prefix.
+    """
+
+    def __init__(
+        self: "ChatSession",
+        api: Any,
+        messages: Optional[Messages] = None,
+        **options: Any,
+    ) -> None:
+        """
+        Initialize chat session.
+
+        Parameters
+        ----------
+        api : Union[LLMAPI, AIStudioLLMAPI]
+            LLM API to send the conversation to.
+
+        messages : Optional[Messages], optional
+            Initial history, by default empty.
+
+        **options : Any
+            Request fields sent with every request, e.g. temperature or user_id.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import ChatSession
+        >>> session = ChatSession(erniebot, temperature=0.7)
+        >>> session('你好！')
+        '你好，有什么可以帮助你的。'
+        >>> session('介绍一下你自己。')
+        >>> print(session.stats)
+        """
+        self.api = api
+        self.messages: Messages = []
+        self.options = options
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "bytes_encoded": 0,
+            "bytes_reused": 0,
+        }
+        self._prefix = bytearray()
+        self._ends: List[int] = []
+
+        for message in messages or []:
+            self.append(message)
+
+    def append(self: "ChatSession", message: Message) -> None:
+        """
+        Add a message to the history.
+
+        Parameters
+        ----------
+        message : Message
+            Message to add.
+        """
+        self.messages.append(message)
+
+    def reset(self: "ChatSession") -> None:
+        """
+        Drop the encoded prefix, e.g. after editing `messages` in place.
+        """
+        self._prefix = bytearray()
+        self._ends = []
+
+    def encode(self: "ChatSession", **options: Any) -> bytes:
+        """
+        Encode the request body of the current history.
+
+        Only messages added since the last call are encoded, the rest is
+        copied from the encoded prefix.
+
+        Parameters
+        ----------
+        **options : Any
+            Request fields overriding the options of the session.
+
+        Returns
+        -------
+        bytes
+            JSON request body.
+        """
+        self.stats["bytes_reused"] += len(self._prefix)
+
+        for message in self.messages[len(self._ends) :]:
+            encoded = json.dumps(
+                message, ensure_ascii=False, separators=(",", ":")
+            ).encode("UTF-8")
+            if self._prefix:
+                self._prefix += b","
+            self._prefix += encoded
+            self._ends.append(len(self._prefix))
+            self.stats["bytes_encoded"] += len(encoded)
+
+        fields: Dict[str, Any] = {}
+        if hasattr(self.api, "model"):
+            fields["model"] = self.api.model
+        fields.update(self.options)
+        fields.update(options)
+
+        # '{"model":...,"temperature":...}' -> '{"messages":[...],"model":...,...}'
+        tail = encode_json(fields)[1:]
+        return b"".join(
+            (b'{"messages":[', self._prefix, b"]", b"," if len(tail) > 1 else b"", tail)
+        )
+
+    def __call__(
+        self: "ChatSession",
+        content: str,
+        stream: Optional[bool] = None,
+        **options: Any,
+    ) -> Union[str, Generator[str, None, None]]:
+        """
+        Send a user message and add the reply to the history.
+
+        Parameters
+        ----------
+        content : str
+            Content of the user message.
+
+        stream : Optional[bool], optional
+            Whether to stream the reply, by default None. Only LLMAPI streams.
+
+        **options : Any
+            Request fields overriding the options of the session.
+
+        Returns
+        -------
+        Union[str, Generator[str, None, None]]
+            Reply of the assistant.
+
+        Raises
+        ------
+        ValueError
+            If request failed. The user message is removed from the history.
+            If `stream` is set with an AIStudioLLMAPI, which does not stream.
+        """
+        if stream:
+            from .apis import AIStudioLLMAPI
+
+            if isinstance(self.api, AIStudioLLMAPI):
+                raise ValueError("AIStudioLLMAPI does not support streaming.")
+
+        self.append(Message(role="user", content=content))
+
+        if stream:
+            options["stream"] = True
+
+        try:
+            data = self.encode(**options)
+            self.stats["requests"] += 1
+            if stream:
+                response = self.api.send(data=data, stream=True)
+            else:
+                response = self.api.send(data=data)
+        except Exception:
+            self._pop()
+            raise
+
+        if stream:
+            return self._stream(response)
+
+        self.append(Message(role="assistant", content=response))
+        return response
+
+    def _pop(self: "ChatSession") -> None:
+        self.messages.pop()
+        count = len(self.messages)
+        if len(self._ends) > count:
+            del self._prefix[self._ends[count - 1] if count else 0 :]
+            del self._ends[count:]
+
+    def _stream(
+        self: "ChatSession", response_stream: Iterator[str]
+    ) -> Generator[str, None, None]:
+        chunks = []
+        try:
+            for chunk in response_stream:
+                chunks.append(chunk)
+                yield chunk
+        except BaseException:
+            # Failed or abandoned stream: the turn is not part of the history.
+            self._pop()
+            if hasattr(response_stream, "close"):
+                response_stream.close()  # type: ignore
+            raise
+
+        self.append(Message(role="assistant", content="".join(chunks)))
@@ -0,0 +1,264 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .types import Embeddings
+
+
+__all__ = [
+    "normalize",
+    "top_k",
+    "near_duplicates",
+    "mmr",
+]
+
+
+"""
+Embedding similarity of Wenxin Workshop.
+
+Requires numpy, please install it by `pip install numpy`.
+"""
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "Embedding utilities require numpy, please install it by `pip install numpy`."
+        )
+    return numpy
+
+
+def _matrix(embeddings: Union[Embeddings, Any]) -> Any:
+    np = _numpy()
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    return matrix
+
+
+def _top_k(scores: Any, k: int) -> Tuple[Any, Any]:
+    np = _numpy()
+    k = min(k, scores.shape[1])
+    indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-top, axis=1, kind="stable")
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+def _blocked_top_k(blocks: Iterable[Tuple[int, Any]], rows: int, k: int) -> Tuple[Any, Any]:
+    # Running top-k over blocks of scores, each given with the index of its
+    # first column, so the whole score matrix is never built.
+    np = _numpy()
+    best_indices = np.empty((rows, 0), dtype=np.int64)
+    best_scores = np.empty((rows, 0), dtype=np.float32)
+
+    for start, block in blocks:
+        indices, scores = _top_k(block, k)
+        candidates = np.concatenate([best_scores, scores], axis=1)
+        order, best_scores = _top_k(candidates, k)
+        best_indices = np.take_along_axis(
+            np.concatenate([best_indices, indices + start], axis=1), order, axis=1
+        )
+
+    return best_indices, best_scores
+
+
+def normalize(embeddings: Union[Embeddings, Any]) -> Any:
+    """
+    Build an L2-normalized float32 matrix from embeddings.
+
+    Parameters
+    ----------
+    embeddings : Union[Embeddings, numpy.ndarray]
+        Embeddings, one per row, or a single embedding.
+
+    Returns
+    -------
+    numpy.ndarray
+        Normalized embeddings, one per row; dot products are cosine similarities.
+
+    Examples
+    --------
+    >>> from wenxinworkshop import normalize
+    >>> matrix = normalize(ernieembedding(texts=texts))
+    """
+    np = _numpy()
+    matrix = _matrix(embeddings)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def top_k(
+    queries: Union[Embeddings, Any],
+    corpus: Union[Embeddings, Any],
+    k: int = 10,
+    block_size: int = 8192,
+    normalized: bool = False,
+) -> Tuple[Any, Any]:
+    """
+    Find the k corpus embeddings most similar to each query.
+
+    The corpus is compared one block at a time, keeping a running top-k, so
+    the similarity matrix of all queries against the whole corpus is never
+    built.
+
+    Parameters
+    ----------
+    queries : Union[Embeddings, numpy.ndarray]
+        Query embeddings, one per row, or a single embedding.
+
+    corpus : Union[Embeddings, numpy.ndarray]
+        Corpus embeddings, one per row.
+
+    k : int, optional
+        Number of results per query, by default 10.
+
+    block_size : int, optional
+        Number of corpus embeddings compared per block, by default 8192.
+
+    normalized : bool, optional
+        Whether the corpus is already L2-normalized, e.g. by `normalize`, so
+        it is not normalized again on every search, by default False.
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Indices and cosine similarities, one row per query, most similar first.
+
+    Examples
+    --------
+    >>> from wenxinworkshop import normalize, top_k
+    >>> corpus = normalize(ernieembedding(texts=texts))
+    >>> indices, scores = top_k(ernieembedding(texts=[query]), corpus, k=5, normalized=True)
+    """
+    queries = normalize(queries)
+    prepare = _matrix if normalized else normalize
+    blocks = (
+        (start, queries @ prepare(corpus[start : start + block_size]).T)
+        for start in range(0, len(corpus), block_size)
+    )
+    return _blocked_top_k(blocks, len(queries), k)
+
+
+def near_duplicates(
+    embeddings: Union[Embeddings, Any],
+    threshold: float = 0.95,
+    block_size: int = 2048,
+) -> List[List[int]]:
+    """
+    Group embeddings whose cosine similarity is at least `threshold`.
+
+    Pairs are compared one block of rows at a time, so memory stays bounded
+    by `block_size` x number of embeddings. Groups are the connected
+    components of the near-duplicate pairs.
+
+    Parameters
+    ----------
+    embeddings : Union[Embeddings, numpy.ndarray]
+        Embeddings, one per row.
+
+    threshold : float, optional
+        Minimum cosine similarity of near-duplicates, by default 0.95.
+
+    block_size : int, optional
+        Number of rows compared per block, by default 2048.
+
+    Returns
+    -------
+    List[List[int]]
+        Groups of more than one embedding, as sorted lists of indices.
+
+    Examples
+    --------
+    >>> from wenxinworkshop import near_duplicates
+    >>> groups = near_duplicates(ernieembedding(texts=texts), threshold=0.98)
+    >>> keep = sorted(set(range(len(texts))) - {i for g in groups for i in g[1:]})
+    """
+    np = _numpy()
+    matrix = normalize(embeddings)
+    parents = list(range(len(matrix)))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for start in range(0, len(matrix), block_size):
+        # Upper triangle only: each row is compared with the rows after it.
+        scores = matrix[start : start + block_size] @ matrix[start:].T
+        rows, columns = np.nonzero(np.triu(scores >= threshold, k=1))
+        for row, column in zip((rows + start).tolist(), (columns + start).tolist()):
+            a, b = find(row), find(column)
+            if a != b:
+                parents[max(a, b)] = min(a, b)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(matrix)):
+        groups.setdefault(find(i), []).append(i)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def mmr(
+    query: Union[Embeddings, Any],
+    candidates: Union[Embeddings, Any],
+    k: int = 10,
+    diversity: float = 0.3,
+    scores: Optional[Any] = None,
+) -> List[int]:
+    """
+    Rerank candidates by maximal marginal relevance.
+
+    Each step picks the candidate maximizing
+    `(1 - diversity) * similarity to the query - diversity * max similarity to the picked ones`.
+
+    Parameters
+    ----------
+    query : Union[Embeddings, numpy.ndarray]
+        Query embedding.
+
+    candidates : Union[Embeddings, numpy.ndarray]
+        Candidate embeddings, one per row, e.g. the top results of `top_k`.
+
+    k : int, optional
+        Number of candidates to pick, by default 10.
+
+    diversity : float, optional
+        Weight of diversity against relevance, in [0, 1], by default 0.3.
+
+    scores : Optional[numpy.ndarray], optional
+        Relevance of each candidate, by default the cosine similarity to the query.
+
+    Returns
+    -------
+    List[int]
+        Indices of the picked candidates, in order.
+
+    Examples
+    --------
+    >>> from wenxinworkshop import mmr
+    >>> indices, _ = top_k(query_embedding, corpus, k=50)
+    >>> picked = indices[0][mmr(query_embedding, corpus[indices[0]], k=5)]
+    """
+    np = _numpy()
+    matrix = normalize(candidates)
+    relevance = (
+        (matrix @ normalize(query)[0])
+        if scores is None
+        else np.asarray(scores, dtype=np.float32).reshape(-1)
+    )
+
+    picked: List[int] = []
+    redundancy = np.full(len(matrix), -np.inf, dtype=np.float32)
+    available = np.ones(len(matrix), dtype=bool)
+
+    for _ in range(min(k, len(matrix))):
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        marginal = (1 - diversity) * relevance - diversity * penalty
+        marginal[~available] = -np.inf
+        best = int(np.argmax(marginal))
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, matrix @ matrix[best])
+
+    return picked
@@ -0,0 +1,1060 @@
+import sys
+import json
+import time
+import queue
+import threading
+import collections
+
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .encoding import request_fingerprint
+from .coalesce import _Call
+from .deadlines import DeadlineExceeded, get_deadline, remaining
+from .structured import Path, iter_json
+from .types import ChatResponse
+
+
+__all__ = [
+    "ChatStream",
+    "StreamAccumulator",
+    "BufferedChatStream",
+    "MulticastStream",
+    "Subscription",
+    "StreamMulticaster",
+]
+
+
+"""
+Streaming responses of Wenxin Workshop.
+"""
+
+
+_decoder = json.JSONDecoder()
+
+_WHITESPACE = json.decoder.WHITESPACE
+
+
+def _decode_event(line: str) -> str:
+    # Result of a `data: {...}` line, decoded in place after the prefix
+    # rather than from a sliced copy of the line.
+    try:
+        if not line.startswith("data:"):
+            raise ValueError(line)
+        response_json: ChatResponse
+        response_json, _ = _decoder.raw_decode(line, _WHITESPACE.match(line, 5).end())
+        return response_json["result"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(line)
+
+
+class _LineReader:
+    """
+    Splitter of the body of a streaming response into its non-empty lines.
+
+    Each line is decoded straight from a memoryview of the received chunk;
+    only a line split across two chunks is copied, into a small buffer.
+    """
+
+    __slots__ = ("_pending",)
+
+    def __init__(self: "_LineReader") -> None:
+        self._pending = bytearray()
+
+    def feed(self: "_LineReader", data: bytes) -> List[str]:
+        # Lines completed by a chunk of the body.
+        if self._pending:
+            self._pending += data
+            data = self._pending
+
+        lines = []
+        start = 0
+        with memoryview(data) as view:
+            while True:
+                end = data.find(b"\n", start)
+                if end < 0:
+                    break
+                stop = end - 1 if end > start and data[end - 1] == 13 else end
+                if stop > start:
+                    lines.append(str(view[start:stop], "UTF-8"))
+                start = end + 1
+            self._pending = bytearray(view[start:])
+        return lines
+
+    def close(self: "_LineReader") -> List[str]:
+        # Last line, if the body does not end with a newline.
+        line = self._pending.decode("UTF-8").strip()
+        self._pending = bytearray()
+        return [line] if line else []
+
+
+def _read_errors() -> Tuple[type, ...]:
+    # Errors of a response read past its timeout: OSError, and the timeouts
+    # of httpx once a transport imported it.
+    httpx = sys.modules.get("httpx")
+    if httpx is None:
+        return (OSError,)
+    return (OSError, httpx.TimeoutException)
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    reader = _LineReader()
+    for data in chunks:
+        yield from reader.feed(data)
+    yield from reader.close()
+
+
+class ChatStream:
+    """
+    Cancellable iterator over the chunks of a streaming chat response.
+
+    Closing the stream (explicitly, by leaving a `with` block, or when it is
+    garbage collected) closes the underlying response at once, so the
+    connection is not left open when the consumer stops early.
+
+    With `stop` sequences the stream ends as soon as one of them appears in
+    the generated text, even if it is split across chunks; the text before
+    the stop sequence is returned and the stop sequence itself is not.
+
+    The deadline current when the stream is created (see `deadline`) applies
+    to the whole stream, even when it is read from another thread: once it
+    passes the stream is closed and DeadlineExceeded is raised.
+
+    Attributes
+    ----------
+    response : requests.Response
+        Streaming response of LLM API.
+
+    chunk_size : int
+        Chunk size used to read the response.
+
+    stop : List[str]
+        Stop sequences.
+
+    closed : bool
+        Whether the stream is closed.
+
+    stopped : Optional[str]
+        Stop sequence that ended the stream, None otherwise.
+
+    deadline : Optional[float]
+        Deadline of the stream, in `time.monotonic()` seconds.
+
+    Methods
+    -------
+    close(self) -> None:
+        Close the stream and its response.
+
+    buffered(self, maxsize: int = 64) -> BufferedChatStream:
+        Read the stream ahead in a background thread, at most `maxsize` chunks.
+
+    accumulate(self, max_chars: Optional[int] = None) -> StreamAccumulator:
+        Gather the chunks into the full text, yielding them as they arrive.
+
+    json(self, path: Path = (), schema: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        Iterate over the elements of a JSON array in the response.
+    """
+
+    def __init__(
+        self: "ChatStream",
+        response: Any,
+        chunk_size: int = 512,
+        stop: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Initialize chat stream.
+
+        Parameters
+        ----------
+        response : requests.Response
+            Streaming response of LLM API.
+
+        chunk_size : int, optional
+            Chunk size used to read the response, by default 512.
+
+        stop : Optional[List[str]], optional
+            Stop sequences, by default None.
+
+        Examples
+        --------
+        >>> with erniebot(messages=messages, stream=True, stop=['。']) as response_stream:
+        ...     for item in response_stream:
+        ...         print(item, end='')
+        你好，有什么可以帮助你的
+        """
+        self.response = response
+        self.chunk_size = chunk_size
+        self.stop = [s for s in stop or [] if s]
+        self.closed = False
+        self.stopped: Optional[str] = None
+        self.deadline = get_deadline()
+        self._lines = _iter_lines(response.iter_content(chunk_size=chunk_size))
+        self._hold = ""
+        self._holdback = max((len(s) for s in self.stop), default=1) - 1
+
+    def __iter__(self: "ChatStream") -> "ChatStream":
+        return self
+
+    def _check_deadline(self: "ChatStream") -> None:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.close()
+            raise DeadlineExceeded("Deadline exceeded.")
+
+    def _next_result(self: "ChatStream") -> Optional[str]:
+        for response_line in self._lines:
+            self._check_deadline()
+            try:
+                return _decode_event(response_line)
+            except ValueError:
+                self.close()
+                raise
+        return None
+
+    def __next__(self: "ChatStream") -> str:
+        while not self.closed:
+            self._check_deadline()
+            try:
+                result = self._next_result()
+            except _read_errors() as e:
+                # Read timeout of a response requested with a deadline
+                # (requests exceptions are OSErrors, httpx ones are not).
+                if self.deadline is None:
+                    raise
+                self.close()
+                raise DeadlineExceeded(str(e)) from e
+
+            if result is None:
+                self.close()
+                if self._hold:
+                    text, self._hold = self._hold, ""
+                    return text
+                break
+
+            if not self.stop:
+                return result
+
+            text = self._hold + result
+            found = [(text.find(s), s) for s in self.stop if s in text]
+            if found:
+                index, self.stopped = min(found)
+                self._hold = ""
+                self.close()
+                if index:
+                    return text[:index]
+                break
+
+            # Hold back the tail that could be the start of a stop sequence.
+            split = max(0, len(text) - self._holdback)
+            text, self._hold = text[:split], text[split:]
+            if text:
+                return text
+
+        raise StopIteration
+
+    def close(self: "ChatStream") -> None:
+        """
+        Close the stream and its response.
+        """
+        if not self.closed:
+            self.closed = True
+            self.response.close()
+
+    def buffered(self: "ChatStream", maxsize: int = 64) -> "BufferedChatStream":
+        """
+        Read the stream ahead in a background thread, at most `maxsize` chunks.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            Maximum number of chunks read ahead, by default 64.
+
+        Returns
+        -------
+        BufferedChatStream
+            Buffered stream.
+        """
+        return BufferedChatStream(self, maxsize=maxsize)
+
+    def accumulate(
+        self: "ChatStream", max_chars: Optional[int] = None
+    ) -> "StreamAccumulator":
+        """
+        Gather the chunks into the full text, yielding them as they arrive.
+
+        Parameters
+        ----------
+        max_chars : Optional[int], optional
+            Maximum number of characters kept, by default None (no limit).
+
+        Returns
+        -------
+        StreamAccumulator
+            Accumulator of the stream.
+
+        Examples
+        --------
+        >>> answer = erniebot(messages=messages, stream=True).accumulate().consume()
+        """
+        return StreamAccumulator(self, max_chars=max_chars)
+
+    def json(
+        self: "ChatStream",
+        path: Path = (),
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Any]:
+        """
+        Iterate over the elements of a JSON array in the response, each as
+        soon as it is generated.
+
+        Parameters
+        ----------
+        path : Path, optional
+            Path of the array in the JSON value, by default the value itself.
+
+        schema : Optional[Dict[str, Any]], optional
+            JSON schema of the value, by default None. Requires jsonschema.
+
+        Returns
+        -------
+        Iterator[Any]
+            Elements of the array.
+
+        Examples
+        --------
+        >>> response_stream = erniebot(messages=messages, stream=True)
+        >>> for item in response_stream.json(path=('items',)):
+        ...     process(item)
+        """
+        return iter_json(self, path=path, schema=schema)
+
+    def __enter__(self: "ChatStream") -> "ChatStream":
+        return self
+
+    def __exit__(self: "ChatStream", *args: Any) -> None:
+        self.close()
+
+    def __del__(self: "ChatStream") -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class StreamAccumulator:
+    """
+    Consumer of a chat stream gathering its chunks into the full text.
+
+    Iterating over the accumulator yields the chunks (the deltas) as they
+    arrive, while keeping them in a list which is joined only when the text
+    is read, instead of concatenating a new string at every chunk. With
+    `max_chars`, the stream is closed once that many characters arrived, so
+    a runaway generation cannot grow the text without bound.
+
+    It accepts a ChatStream or any iterable of chunks, and also the async
+    streams of AsyncLLMAPI, with `async for` and `aconsume()`.
+
+    Attributes
+    ----------
+    stream : Union[Iterable[str], AsyncIterable[str]]
+        Stream of chunks.
+
+    max_chars : Optional[int]
+        Maximum number of characters kept, None for no limit.
+
+    chunks : int
+        Number of chunks received.
+
+    chars : int
+        Number of characters kept.
+
+    truncated : bool
+        Whether the stream was cut at `max_chars`.
+
+    done : bool
+        Whether the stream is exhausted or was cut at `max_chars`.
+
+    Methods
+    -------
+    consume(self) -> str:
+        Read the rest of the stream and get the full text.
+
+    aconsume(self) -> str:
+        Read the rest of an async stream and get the full text.
+
+    summary(self) -> Dict[str, Any]:
+        Counters and timings of the stream.
+    """
+
+    def __init__(
+        self: "StreamAccumulator", stream: Any, max_chars: Optional[int] = None
+    ) -> None:
+        """
+        Initialize stream accumulator.
+
+        Parameters
+        ----------
+        stream : Union[Iterable[str], AsyncIterable[str]]
+            Stream of chunks, e.g. a ChatStream.
+
+        max_chars : Optional[int], optional
+            Maximum number of characters kept, by default None (no limit).
+
+        Examples
+        --------
+        >>> from wenxinworkshop import StreamAccumulator
+        >>> accumulator = StreamAccumulator(erniebot(messages=messages, stream=True))
+        >>> for delta in accumulator:
+        ...     print(delta, end='')
+        >>> answer = accumulator.text
+        >>> print(accumulator.summary())
+        """
+        self.stream = stream
+        self.max_chars = max_chars
+        self.chunks = 0
+        self.chars = 0
+        self.truncated = False
+        self.done = False
+        self._parts: List[str] = []
+        self._iterator: Any = None
+        self._started: Optional[float] = None
+        self._first: Optional[float] = None
+        self._ended: Optional[float] = None
+
+    @property
+    def text(self: "StreamAccumulator") -> str:
+        """
+        Text received so far.
+        """
+        if len(self._parts) > 1:
+            # Joined once, then kept as a single part.
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def _add(self: "StreamAccumulator", chunk: str) -> str:
+        now = time.monotonic()
+        if self._first is None:
+            self._first = now
+
+        if self.max_chars is not None and self.chars + len(chunk) > self.max_chars:
+            chunk = chunk[: self.max_chars - self.chars]
+            self.truncated = True
+
+        self.chunks += 1
+        self.chars += len(chunk)
+        if chunk:
+            self._parts.append(chunk)
+        return chunk
+
+    def _end(self: "StreamAccumulator") -> None:
+        self.done = True
+        self._ended = time.monotonic()
+
+    def __iter__(self: "StreamAccumulator") -> Iterator[str]:
+        # A consumer breaking out of the loop can resume it later: the
+        # stream is only read through one iterator.
+        if self._iterator is None:
+            self._iterator = iter(self.stream)
+            self._started = time.monotonic()
+
+        while not self.done:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                self._end()
+                break
+
+            delta = self._add(chunk)
+            if self.truncated:
+                self._end()
+                close = getattr(self.stream, "close", None)
+                if close is not None:
+                    close()
+            if delta:
+                yield delta
+
+    async def __aiter__(self: "StreamAccumulator") -> AsyncIterator[str]:
+        if self._iterator is None:
+            self._iterator = self.stream.__aiter__()
+            self._started = time.monotonic()
+
+        while not self.done:
+            try:
+                chunk = await self._iterator.__anext__()
+            except StopAsyncIteration:
+                self._end()
+                break
+
+            delta = self._add(chunk)
+            if self.truncated:
+                self._end()
+                aclose = getattr(self.stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            if delta:
+                yield delta
+
+    def consume(self: "StreamAccumulator") -> str:
+        """
+        Read the rest of the stream and get the full text.
+
+        Returns
+        -------
+        str
+            Full text, cut at `max_chars`.
+
+        Raises
+        ------
+        ValueError
+            If the stream reports a failed request.
+        """
+        for _ in self:
+            pass
+        return self.text
+
+    async def aconsume(self: "StreamAccumulator") -> str:
+        """
+        Read the rest of an async stream and get the full text.
+
+        Returns
+        -------
+        str
+            Full text, cut at `max_chars`.
+
+        Raises
+        ------
+        ValueError
+            If the stream reports a failed request.
+        """
+        async for _ in self:
+            pass
+        return self.text
+
+    def summary(self: "StreamAccumulator") -> Dict[str, Any]:
+        """
+        Counters and timings of the stream.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Chunks received, characters kept, whether the stream is done and
+            was truncated, the stop sequence which ended it if any, seconds
+            to the first chunk and in total since the stream was first read,
+            and characters per second.
+        """
+        end = self._ended if self._ended is not None else time.monotonic()
+        seconds = end - self._started if self._started is not None else 0.0
+        first_chunk = (
+            self._first - self._started
+            if self._first is not None and self._started is not None
+            else None
+        )
+        return {
+            "chunks": self.chunks,
+            "chars": self.chars,
+            "done": self.done,
+            "truncated": self.truncated,
+            "stopped": getattr(self.stream, "stopped", None),
+            "first_chunk_seconds": first_chunk,
+            "seconds": seconds,
+            "chars_per_second": self.chars / seconds if seconds > 0 else 0.0,
+        }
+
+
+class BufferedChatStream:
+    """
+    Chat stream read ahead by a background thread into a bounded buffer.
+
+    When the buffer is full the reader thread stops reading the response, so
+    a slow consumer (e.g. a websocket) applies back-pressure to the upstream
+    connection instead of buffering without limit.
+
+    Attributes
+    ----------
+    stream : ChatStream
+        Stream being read.
+
+    maxsize : int
+        Maximum number of chunks read ahead.
+
+    Methods
+    -------
+    get(self, timeout: Optional[float] = None) -> Optional[str]:
+        Get the next chunk, None at the end of the stream.
+
+    close(self) -> None:
+        Stop reading and close the stream.
+    """
+
+    _END = object()
+
+    def __init__(self: "BufferedChatStream", stream: ChatStream, maxsize: int = 64) -> None:
+        """
+        Initialize buffered chat stream.
+
+        Parameters
+        ----------
+        stream : ChatStream
+            Stream to read.
+
+        maxsize : int, optional
+            Maximum number of chunks read ahead, by default 64.
+
+        Examples
+        --------
+        >>> response_stream = erniebot(messages=messages, stream=True).buffered(maxsize=16)
+        >>> for item in response_stream:
+        ...     websocket.send(item)
+        """
+        self.stream = stream
+        self.maxsize = maxsize
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _put(self: "BufferedChatStream", item: Any) -> bool:
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _read(self: "BufferedChatStream") -> None:
+        try:
+            for chunk in self.stream:
+                if not self._put(chunk):
+                    break
+        except Exception as e:
+            self._put(e)
+        finally:
+            self.stream.close()
+            self._put(self._END)
+
+    def get(self: "BufferedChatStream", timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Get the next chunk.
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            Maximum seconds to wait, by default None (wait forever).
+
+        Returns
+        -------
+        Optional[str]
+            Next chunk, None at the end of the stream.
+
+        Raises
+        ------
+        ValueError
+            If the stream failed.
+
+        queue.Empty
+            If no chunk arrived before the timeout.
+        """
+        if self._closed.is_set() and self._queue.empty():
+            return None
+
+        item = self._queue.get(timeout=timeout)
+
+        if item is self._END:
+            self._closed.set()
+            return None
+        if isinstance(item, Exception):
+            self._closed.set()
+            raise item
+        return item
+
+    def __iter__(self: "BufferedChatStream") -> Iterator[str]:
+        while True:
+            chunk = self.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def close(self: "BufferedChatStream") -> None:
+        """
+        Stop reading and close the stream.
+        """
+        self._closed.set()
+        self.stream.close()
+
+    def __enter__(self: "BufferedChatStream") -> "BufferedChatStream":
+        return self
+
+    def __exit__(self: "BufferedChatStream", *args: Any) -> None:
+        self.close()
+
+
+class MulticastStream:
+    """
+    One upstream chat stream shared by many subscribers.
+
+    A background thread reads the upstream stream into a ring buffer of the
+    last `buffer_size` chunks. Every subscriber reads the buffer at its own
+    pace; subscribers joining late catch up from the oldest buffered chunk.
+    A subscriber falling more than `buffer_size` chunks behind is handled by
+    `policy`:
+
+    - 'drop': the subscription ends and is marked as dropped.
+    - 'skip': the subscriber jumps to the oldest buffered chunk.
+    - 'block': the upstream read waits for the slowest subscriber.
+
+    Attributes
+    ----------
+    stream : Iterator[str]
+        Upstream stream.
+
+    buffer_size : int
+        Number of chunks kept in the ring buffer.
+
+    policy : str
+        'drop', 'skip' or 'block'.
+
+    done : bool
+        Whether the upstream stream ended.
+
+    error : Optional[Exception]
+        Error which ended the upstream stream, re-raised to every subscriber.
+
+    Methods
+    -------
+    subscribe(self) -> Subscription:
+        Subscribe to the stream.
+
+    close(self) -> None:
+        Close the upstream stream and end all subscriptions.
+    """
+
+    def __init__(
+        self: "MulticastStream",
+        stream: Iterator[str],
+        buffer_size: int = 4096,
+        policy: str = "drop",
+    ) -> None:
+        """
+        Initialize multicast stream.
+
+        Parameters
+        ----------
+        stream : Iterator[str]
+            Upstream stream, e.g. a ChatStream.
+
+        buffer_size : int, optional
+            Number of chunks kept in the ring buffer, by default 4096.
+
+        policy : str, optional
+            'drop', 'skip' or 'block', by default 'drop'.
+
+        Examples
+        --------
+        >>> multicast = MulticastStream(erniebot(messages=messages, stream=True))
+        >>> for item in multicast.subscribe():
+        ...     websocket.send(item)
+        """
+        if policy not in ("drop", "skip", "block"):
+            raise ValueError("policy must be 'drop', 'skip' or 'block'.")
+
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.done = False
+        self.error: Optional[Exception] = None
+        self._buffer: Deque[str] = collections.deque(maxlen=buffer_size)
+        self._start = 0
+        self._subscriptions: List["Subscription"] = []
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    @property
+    def end(self: "MulticastStream") -> int:
+        """
+        Index after the last chunk received.
+        """
+        return self._start + len(self._buffer)
+
+    def _read(self: "MulticastStream") -> None:
+        try:
+            for chunk in self.stream:
+                with self._condition:
+                    if self.policy == "block":
+                        self._condition.wait_for(
+                            lambda: self.done
+                            or all(
+                                self.end - s.position < self.buffer_size
+                                for s in self._subscriptions
+                                if not s.closed
+                            )
+                        )
+                    if self.done:
+                        break
+                    if len(self._buffer) == self.buffer_size:
+                        self._start += 1
+                    self._buffer.append(chunk)
+                    self._condition.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._condition:
+                self.done = True
+                self._condition.notify_all()
+            if hasattr(self.stream, "close"):
+                self.stream.close()  # type: ignore
+
+    def subscribe(self: "MulticastStream") -> "Subscription":
+        """
+        Subscribe to the stream, starting from the oldest buffered chunk.
+
+        Returns
+        -------
+        Subscription
+            Iterator over the chunks.
+        """
+        with self._condition:
+            subscription = Subscription(self, self._start)
+            self._subscriptions.append(subscription)
+            return subscription
+
+    def _next(self: "MulticastStream", subscription: "Subscription") -> str:
+        with self._condition:
+            while True:
+                if subscription.closed:
+                    raise StopIteration
+
+                if subscription.position < self._start:
+                    if self.policy == "skip":
+                        subscription.skipped += self._start - subscription.position
+                        subscription.position = self._start
+                    else:
+                        subscription.dropped = True
+                        self._unsubscribe(subscription)
+                        raise StopIteration
+
+                if subscription.position < self.end:
+                    chunk = self._buffer[subscription.position - self._start]
+                    subscription.position += 1
+                    self._condition.notify_all()
+                    return chunk
+
+                if self.done:
+                    self._unsubscribe(subscription)
+                    if self.error is not None:
+                        raise self.error
+                    raise StopIteration
+
+                self._condition.wait()
+
+    def _unsubscribe(self: "MulticastStream", subscription: "Subscription") -> None:
+        subscription.closed = True
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        self._condition.notify_all()
+
+    def close(self: "MulticastStream") -> None:
+        """
+        Close the upstream stream and end all subscriptions.
+        """
+        with self._condition:
+            self.done = True
+            self._condition.notify_all()
+        if hasattr(self.stream, "close"):
+            self.stream.close()  # type: ignore
+
+    def stats(self: "MulticastStream") -> Dict[str, Any]:
+        """
+        Buffer and subscriber state.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Chunks received and buffered, and the subscribers.
+        """
+        with self._condition:
+            return {
+                "chunks": self.end,
+                "buffered": len(self._buffer),
+                "subscribers": len(self._subscriptions),
+                "done": self.done,
+            }
+
+
+class Subscription:
+    """
+    Subscriber of a multicast stream.
+
+    Attributes
+    ----------
+    multicast : MulticastStream
+        Stream subscribed to.
+
+    position : int
+        Index of the next chunk to read.
+
+    closed : bool
+        Whether the subscription ended.
+
+    dropped : bool
+        Whether the subscription was dropped for being too slow.
+
+    skipped : int
+        Number of chunks skipped for being too slow.
+    """
+
+    def __init__(self: "Subscription", multicast: MulticastStream, position: int) -> None:
+        self.multicast = multicast
+        self.position = position
+        self.closed = False
+        self.dropped = False
+        self.skipped = 0
+
+    def __iter__(self: "Subscription") -> "Subscription":
+        return self
+
+    def __next__(self: "Subscription") -> str:
+        return self.multicast._next(self)
+
+    def close(self: "Subscription") -> None:
+        """
+        Unsubscribe.
+        """
+        with self.multicast._condition:
+            self.multicast._unsubscribe(self)
+
+    def __enter__(self: "Subscription") -> "Subscription":
+        return self
+
+    def __exit__(self: "Subscription", *args: Any) -> None:
+        self.close()
+
+
+class StreamMulticaster:
+    """
+    Coalesce identical concurrent streaming chat requests onto one upstream stream.
+
+    The first request with a given fingerprint opens the upstream stream;
+    identical requests arriving while it is still running subscribe to it
+    instead of opening their own.
+
+    Attributes
+    ----------
+    api : LLMAPI
+        LLM API to open streams with.
+
+    buffer_size : int
+        Number of chunks kept in the ring buffer of each stream.
+
+    policy : str
+        Slow subscriber policy of each stream.
+
+    requests : int
+        Number of requests.
+
+    coalesced : int
+        Number of requests served by an already running stream.
+    """
+
+    def __init__(
+        self: "StreamMulticaster",
+        api: Any,
+        buffer_size: int = 4096,
+        policy: str = "drop",
+    ) -> None:
+        """
+        Initialize stream multicaster.
+
+        Parameters
+        ----------
+        api : LLMAPI
+            LLM API to open streams with.
+
+        buffer_size : int, optional
+            Number of chunks kept in the ring buffer of each stream, by default 4096.
+
+        policy : str, optional
+            Slow subscriber policy, 'drop', 'skip' or 'block', by default 'drop'.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import StreamMulticaster
+        >>> multicaster = StreamMulticaster(erniebot)
+        >>> for item in multicaster(messages=messages):
+        ...     websocket.send(item)
+        """
+        self.api = api
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.requests = 0
+        self.coalesced = 0
+        self._streams: Dict[str, MulticastStream] = {}
+        self._opening: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self: "StreamMulticaster", **kwargs: Any) -> Subscription:
+        """
+        Subscribe to the stream of a chat request, opening it if needed.
+
+        Parameters
+        ----------
+        **kwargs : Any
+            Keyword arguments of the LLM API call, `stream` is implied.
+
+        Returns
+        -------
+        Subscription
+            Iterator over the chunks of the response.
+
+        Raises
+        ------
+        DeadlineExceeded
+            If the current deadline passed while waiting for an identical
+            request to open its stream.
+        """
+        kwargs.pop("stream", None)
+        key = request_fingerprint(
+            self.api.url, {k: v for k, v in kwargs.items() if k != "chunk_size"}
+        )
+
+        # Only the placeholder of the key is registered under the lock; the
+        # stream is opened outside of it, so a slow upstream connection does
+        # not hold up the requests of the other keys.
+        with self._lock:
+            self.requests += 1
+            multicast = self._streams.get(key)
+
+            if multicast is not None and not multicast.done:
+                self.coalesced += 1
+                return multicast.subscribe()
+
+            opening = self._opening.get(key)
+            if opening is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                opening = self._opening[key] = _Call()
+                leader = True
+
+        if not leader:
+            if not opening.done.wait(remaining()):
+                raise DeadlineExceeded("Deadline exceeded waiting for the stream.")
+            if opening.error is not None:
+                raise opening.error
+            return opening.result.subscribe()
+
+        try:
+            opening.result = MulticastStream(
+                self.api(stream=True, **kwargs),
+                buffer_size=self.buffer_size,
+                policy=self.policy,
+            )
+            return opening.result.subscribe()
+        except BaseException as e:
+            opening.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._opening[key]
+                if opening.error is None:
+                    self._streams = {k: m for k, m in self._streams.items() if not m.done}
+                    self._streams[key] = opening.result
+            opening.done.set()
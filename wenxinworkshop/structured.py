@@ -0,0 +1,377 @@
+import json
+
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator
+from typing import List, Optional, Tuple, Union
+
+
+__all__ = [
+    "JSONStreamParser",
+    "iter_json",
+    "aiter_json",
+]
+
+
+"""
+Structured output of Wenxin Workshop.
+"""
+
+
+Path = Tuple[Union[str, int], ...]
+
+_WHITESPACE = " \t\r\n"
+
+
+def _validator(schema: Optional[Dict[str, Any]]) -> Any:
+    if schema is None:
+        return None
+    try:
+        import jsonschema
+    except ImportError:
+        raise ImportError(
+            "Schema validation requires jsonschema, please install it by `pip install jsonschema`."
+        )
+    return jsonschema
+
+
+def _subschema(schema: Dict[str, Any], path: Path) -> Optional[Dict[str, Any]]:
+    # Schema of the value at a path, following `items` and `properties`.
+    for component in path:
+        if isinstance(component, int):
+            schema = schema.get("items")
+        else:
+            schema = schema.get("properties", {}).get(component)
+        if not isinstance(schema, dict):
+            return None
+    return schema
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "path", "count", "key", "element", "closed")
+
+    def __init__(self: "_Frame", kind: str, start: int, path: Path) -> None:
+        self.kind = kind
+        self.start = start
+        self.path = path
+        # Arrays: number of elements so far, start of the current element, and
+        # whether the current element is a container that already closed.
+        self.count = 0
+        self.element: Optional[int] = None
+        self.closed = False
+        # Objects: key of the current member.
+        self.key: Optional[str] = None
+
+
+class JSONStreamParser:
+    """
+    Incremental parser of a JSON value arriving in chunks.
+
+    Text before the first `{` or `[` (e.g. a Markdown code fence) and after
+    the end of the value is ignored. Every object and array, and every array
+    element, at any depth, is emitted with its path as soon as it is
+    complete, and so is the whole value at the end, with the empty path. With
+    a schema, each emitted value is validated against the part of the schema
+    for its path.
+
+    Attributes
+    ----------
+    value : Any
+        The whole value, once complete.
+
+    done : bool
+        Whether the whole value is complete.
+
+    Methods
+    -------
+    feed(self, text: str) -> List[Tuple[Path, Any]]:
+        Parse a chunk of text.
+
+    close(self) -> Any:
+        Get the whole value, failing if it is incomplete.
+    """
+
+    def __init__(self: "JSONStreamParser", schema: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Initialize incremental JSON parser.
+
+        Parameters
+        ----------
+        schema : Optional[Dict[str, Any]], optional
+            JSON schema of the value, by default None. Requires jsonschema.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import JSONStreamParser
+        >>> parser = JSONStreamParser()
+        >>> parser.feed('```json\\n[{"name": "a"}, {"na')
+        [((0,), {'name': 'a'})]
+        >>> parser.feed('me": "b"}]\\n```')
+        [((1,), {'name': 'b'}), ((), [{'name': 'a'}, {'name': 'b'}])]
+        >>> JSONStreamParser().feed('{"plan": {"goal": "x"}, "steps": [')
+        [(('plan',), {'goal': 'x'})]
+        """
+        self.schema = schema
+        self.value: Any = None
+        self.done = False
+        self._jsonschema = _validator(schema)
+        self._buffer = ""
+        self._position = 0
+        self._stack: List[_Frame] = []
+        self._string: Optional[int] = None
+
+    def _emit(self: "JSONStreamParser", path: Path, text: str) -> Tuple[Path, Any]:
+        value = json.loads(text)
+        if self.schema is not None:
+            schema = _subschema(self.schema, path)
+            if schema is not None:
+                try:
+                    self._jsonschema.validate(value, schema)
+                except self._jsonschema.ValidationError as e:
+                    raise ValueError(
+                        "Invalid value at {}: {}".format(list(path), e.message)
+                    ) from e
+        return path, value
+
+    def _end_element(
+        self: "JSONStreamParser", frame: _Frame, end: int, events: List[Tuple[Path, Any]]
+    ) -> None:
+        # End of the current element of an array, at `,` or `]`.
+        if frame.element is not None:
+            if not frame.closed:
+                text = self._buffer[frame.element : end]
+                events.append(self._emit(frame.path + (frame.count,), text))
+            frame.count += 1
+        frame.element = None
+        frame.closed = False
+
+    def feed(self: "JSONStreamParser", text: str) -> List[Tuple[Path, Any]]:
+        """
+        Parse a chunk of text.
+
+        Parameters
+        ----------
+        text : str
+            Next chunk of text.
+
+        Returns
+        -------
+        List[Tuple[Path, Any]]
+            Path and value of every value completed by the chunk: objects,
+            arrays and array elements as their path in the whole value, and
+            the whole value with the empty path.
+
+        Raises
+        ------
+        ValueError
+            If the text is not valid JSON, or a value does not match the schema.
+        """
+        events: List[Tuple[Path, Any]] = []
+        if self.done:
+            return events
+
+        if not self._stack:
+            # Skip anything before the start of the value.
+            starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+            if not starts:
+                return events
+            text = text[min(starts) :]
+
+        buffer = self._buffer = self._buffer + text
+        stack = self._stack
+        i = self._position
+
+        while i < len(buffer):
+            if self._string is not None:
+                # Jump to the next quote or backslash of the string.
+                end = buffer.find('"', i)
+                backslash = buffer.find("\\", i, end if end >= 0 else len(buffer))
+                if backslash >= 0:
+                    if backslash + 1 == len(buffer):
+                        # Escaped character in the next chunk.
+                        i = backslash
+                        break
+                    i = backslash + 2
+                    continue
+                if end < 0:
+                    i = len(buffer)
+                    break
+
+                frame = stack[-1]
+                if frame.kind == "{" and frame.key is None:
+                    frame.key = json.loads(buffer[self._string : end + 1])
+                self._string = None
+                i = end + 1
+                continue
+
+            c = buffer[i]
+            frame = stack[-1] if stack else None
+
+            if c in _WHITESPACE:
+                pass
+            elif c == '"':
+                if frame is not None and frame.kind == "[" and frame.element is None:
+                    frame.element = i
+                self._string = i
+            elif c == "{" or c == "[":
+                path: Path = ()
+                if frame is not None:
+                    if frame.kind == "[":
+                        if frame.element is None:
+                            frame.element = i
+                        path = frame.path + (frame.count,)
+                    else:
+                        path = frame.path + (frame.key,)  # type: ignore
+                stack.append(_Frame(c, i, path))
+            elif c == "}" or c == "]":
+                if frame is None or (frame.kind == "{") != (c == "}"):
+                    raise ValueError("Invalid JSON: unexpected {!r} at {}".format(c, i))
+                if c == "]":
+                    self._end_element(frame, i, events)
+                stack.pop()
+
+                if not stack:
+                    self.value = self._emit((), buffer[frame.start : i + 1])[1]
+                    events.append(((), self.value))
+                    self.done = True
+                    break
+
+                # Objects and arrays are emitted as soon as they close, as
+                # array elements or as values of a key.
+                parent = stack[-1]
+                events.append(self._emit(frame.path, buffer[frame.start : i + 1]))
+                if parent.kind == "[":
+                    parent.closed = True
+            elif c == ",":
+                if frame is not None and frame.kind == "[":
+                    self._end_element(frame, i, events)
+                elif frame is not None:
+                    frame.key = None
+            elif c == ":":
+                pass
+            elif frame is not None and frame.kind == "[" and frame.element is None:
+                # Start of a number, true, false or null.
+                frame.element = i
+
+            i += 1
+
+        self._position = i
+        return events
+
+    def close(self: "JSONStreamParser") -> Any:
+        """
+        Get the whole value, failing if it is incomplete.
+
+        Returns
+        -------
+        Any
+            The whole value.
+
+        Raises
+        ------
+        ValueError
+            If the value is incomplete, e.g. a truncated response.
+        """
+        if not self.done:
+            raise ValueError("Incomplete JSON: {}".format(self._buffer))
+        return self.value
+
+
+def iter_json(
+    chunks: Iterable[str],
+    path: Path = (),
+    schema: Optional[Dict[str, Any]] = None,
+) -> Iterator[Any]:
+    """
+    Iterate over the elements of a JSON array as a stream generates them.
+
+    Parameters
+    ----------
+    chunks : Iterable[str]
+        Chunks of text, e.g. a ChatStream.
+
+    path : Path, optional
+        Path of the array in the value, by default the value itself.
+
+    schema : Optional[Dict[str, Any]], optional
+        JSON schema of the whole value, by default None. Requires jsonschema.
+
+    Yields
+    ------
+    Any
+        Elements of the array, each as soon as it is complete.
+
+    Raises
+    ------
+    ValueError
+        If the text is not valid JSON, is incomplete, or does not match the schema.
+
+    Examples
+    --------
+    >>> from wenxinworkshop import iter_json
+    >>> response_stream = erniebot(messages=messages, stream=True)
+    >>> for item in iter_json(response_stream):
+    ...     process(item)
+    """
+    parser = JSONStreamParser(schema=schema)
+    depth = len(path) + 1
+    for chunk in chunks:
+        for item_path, value in parser.feed(chunk):
+            if (
+                len(item_path) == depth
+                and isinstance(item_path[-1], int)
+                and item_path[:-1] == tuple(path)
+            ):
+                yield value
+        if parser.done:
+            break
+    parser.close()
+
+
+async def aiter_json(
+    chunks: AsyncIterable[str],
+    path: Path = (),
+    schema: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Any]:
+    """
+    Iterate over the elements of a JSON array as an async stream generates them.
+
+    Parameters
+    ----------
+    chunks : AsyncIterable[str]
+        Chunks of text, e.g. a stream of AsyncLLMAPI.
+
+    path : Path, optional
+        Path of the array in the value, by default the value itself.
+
+    schema : Optional[Dict[str, Any]], optional
+        JSON schema of the whole value, by default None. Requires jsonschema.
+
+    Yields
+    ------
+    Any
+        Elements of the array, each as soon as it is complete.
+
+    Raises
+    ------
+    ValueError
+        If the text is not valid JSON, is incomplete, or does not match the schema.
+
+    Examples
+    --------
+    >>> from wenxinworkshop import aiter_json
+    >>> response_stream = await erniebot(messages=messages, stream=True)
+    >>> async for item in aiter_json(response_stream):
+    ...     process(item)
+    """
+    parser = JSONStreamParser(schema=schema)
+    depth = len(path) + 1
+    async for chunk in chunks:
+        for item_path, value in parser.feed(chunk):
+            if (
+                len(item_path) == depth
+                and isinstance(item_path[-1], int)
+                and item_path[:-1] == tuple(path)
+            ):
+                yield value
+        if parser.done:
+            break
+    parser.close()
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import contextlib
+
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None  # type: ignore
+
+
+__all__ = [
+    "TokenStore",
+    "MemoryTokenStore",
+    "FileTokenStore",
+    "token_store_key",
+]
+
+
+"""
+Access token stores of Wenxin Workshop.
+"""
+
+
+def token_store_key(api_key: str, secret_key: str) -> str:
+    """
+    Key of a credential in a token store, without leaking the credential.
+
+    Parameters
+    ----------
+    api_key : str
+        API key from Baidu AI Cloud.
+
+    secret_key : str
+        Secret key from Baidu AI Cloud.
+
+    Returns
+    -------
+    str
+        SHA-256 digest of the credential.
+    """
+    return hashlib.sha256("{}:{}".format(api_key, secret_key).encode("UTF-8")).hexdigest()
+
+
+class TokenStore:
+    """
+    Base class of access token stores.
+
+    `get_access_token` looks the token up under `lock(key)` and only calls
+    the OAuth API on a miss, so every client sharing a store shares one token.
+
+    Attributes
+    ----------
+    margin : float
+        Seconds before expiry from which a stored token is considered expired.
+
+    Methods
+    -------
+    lock(self, key: str) -> ContextManager:
+        Lock a key while it is looked up and fetched.
+
+    get(self, key: str) -> Optional[str]:
+        Get a valid token.
+
+    set(self, key: str, access_token: str, expires_in: float) -> None:
+        Store a token.
+
+    invalidate(self, key: str, access_token: str) -> None:
+        Remove a token if it is still the stored one.
+    """
+
+    def __init__(self: "TokenStore", margin: float = 300.0) -> None:
+        self.margin = margin
+
+    @contextlib.contextmanager
+    def lock(self: "TokenStore", key: str) -> Iterator[None]:
+        yield
+
+    def _load(self: "TokenStore") -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def _save(self: "TokenStore", tokens: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def get(self: "TokenStore", key: str) -> Optional[str]:
+        entry = self._load().get(key)
+        if entry is None or entry["expires_at"] - self.margin <= time.time():
+            return None
+        return entry["access_token"]
+
+    def set(
+        self: "TokenStore", key: str, access_token: str, expires_in: float
+    ) -> None:
+        tokens = self._load()
+        tokens[key] = {"access_token": access_token, "expires_at": time.time() + expires_in}
+        self._save(tokens)
+
+    def invalidate(self: "TokenStore", key: str, access_token: str) -> None:
+        tokens = self._load()
+        entry = tokens.get(key)
+        if entry is not None and entry["access_token"] == access_token:
+            del tokens[key]
+            self._save(tokens)
+
+
+class MemoryTokenStore(TokenStore):
+    """
+    Token store shared by the clients of one process.
+    """
+
+    def __init__(self: "MemoryTokenStore", margin: float = 300.0) -> None:
+        """
+        Initialize memory token store.
+
+        Parameters
+        ----------
+        margin : float, optional
+            Seconds before expiry from which a token is refreshed, by default 300.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import EmbeddingAPI, MemoryTokenStore
+        >>> token_store = MemoryTokenStore()
+        >>> ernieembedding = EmbeddingAPI(
+        ...     api_key=api_key,
+        ...     secret_key=secret_key,
+        ...     token_store=token_store
+        ... )
+        """
+        super().__init__(margin=margin)
+        self._tokens: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    @contextlib.contextmanager
+    def lock(self: "MemoryTokenStore", key: str) -> Iterator[None]:
+        with self._lock:
+            yield
+
+    def _load(self: "MemoryTokenStore") -> Dict[str, Any]:
+        return self._tokens
+
+    def _save(self: "MemoryTokenStore", tokens: Dict[str, Any]) -> None:
+        self._tokens = tokens
+
+    def __getstate__(self: "MemoryTokenStore") -> Dict[str, Any]:
+        return {"margin": self.margin, "_tokens": dict(self._tokens)}
+
+    def __setstate__(self: "MemoryTokenStore", state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+
+class FileTokenStore(TokenStore):
+    """
+    Token store shared by all processes of a host through a locked JSON file.
+
+    With a file token store a pool of 64 worker processes makes a single
+    OAuth call: the first process fetches the token while holding the file
+    lock, the others read it from the file.
+
+    Attributes
+    ----------
+    path : str
+        Path of the token file, created with permission 0600.
+    """
+
+    def __init__(self: "FileTokenStore", path: str, margin: float = 300.0) -> None:
+        """
+        Initialize file token store.
+
+        Parameters
+        ----------
+        path : str
+            Path of the token file.
+
+        margin : float, optional
+            Seconds before expiry from which a token is refreshed, by default 300.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import EmbeddingAPI, FileTokenStore
+        >>> token_store = FileTokenStore('/tmp/wenxinworkshop-tokens.json')
+        >>> ernieembedding = EmbeddingAPI(
+        ...     api_key=api_key,
+        ...     secret_key=secret_key,
+        ...     token_store=token_store
+        ... )
+        """
+        super().__init__(margin=margin)
+        self.path = path
+        self._local = threading.RLock()
+
+    @contextlib.contextmanager
+    def lock(self: "FileTokenStore", key: str) -> Iterator[None]:
+        with self._local:
+            fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                elif msvcrt is not None:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                os.close(fd)
+
+    def _load(self: "FileTokenStore") -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="UTF-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self: "FileTokenStore", tokens: Dict[str, Any]) -> None:
+        temp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="UTF-8") as f:
+            json.dump(tokens, f)
+        os.replace(temp_path, self.path)
+
+    def __getstate__(self: "FileTokenStore") -> Dict[str, Any]:
+        return {"margin": self.margin, "path": self.path}
+
+    def __setstate__(self: "FileTokenStore", state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.RLock()
@@ -0,0 +1,803 @@
+import os
+import json
+import threading
+import contextvars
+
+from urllib.parse import urlsplit, urlunsplit, urlencode
+
+from .encoding import gzip_body
+from .deadlines import DeadlineExceeded, remaining
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+
+__all__ = [
+    "TransportStats",
+    "Transport",
+    "RequestsTransport",
+    "CassetteTransport",
+    "HTTPXTransport",
+    "HTTPXResponse",
+    "get_default_transport",
+    "rewrite_url",
+]
+
+
+"""
+HTTP transports of Wenxin Workshop.
+"""
+
+
+# Set while a prewarm request is sent: its traffic is not counted as
+# requests and bytes, only as a prewarm.
+_prewarming: "contextvars.ContextVar[bool]" = contextvars.ContextVar(
+    "wenxinworkshop_prewarming", default=False
+)
+
+
+def rewrite_url(url: str, base_url: Optional[str]) -> str:
+    """
+    Replace the scheme and host of a URL with the ones of a base URL.
+
+    Parameters
+    ----------
+    url : str
+        URL to rewrite.
+
+    base_url : Optional[str]
+        Base URL, the URL is returned unchanged if None.
+
+    Returns
+    -------
+    str
+        Rewritten URL.
+    """
+    if base_url is None:
+        return url
+
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    path = base.path.rstrip("/") + parts.path
+    return urlunsplit((base.scheme, base.netloc, path, parts.query, parts.fragment))
+
+
+class TransportStats:
+    """
+    Bytes-on-wire counters of a transport.
+
+    Attributes
+    ----------
+    requests : int
+        Number of requests sent.
+
+    bytes_sent : int
+        Request body bytes sent, after compression.
+
+    bytes_sent_uncompressed : int
+        Request body bytes before compression.
+
+    bytes_received : int
+        Response body bytes received on the wire (before decompression) of
+        non-streaming responses.
+
+    bytes_received_decoded : int
+        Response body bytes after decompression of non-streaming responses.
+
+    prewarms : int
+        Number of prewarm requests, which are not counted in the other counters.
+    """
+
+    def __init__(self: "TransportStats") -> None:
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_sent_uncompressed = 0
+        self.bytes_received = 0
+        self.bytes_received_decoded = 0
+        self.prewarms = 0
+        self._lock = threading.Lock()
+
+    def add(self: "TransportStats", **counts: int) -> None:
+        if _prewarming.get():
+            return
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self: "TransportStats") -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "bytes_sent": self.bytes_sent,
+                "bytes_sent_uncompressed": self.bytes_sent_uncompressed,
+                "bytes_received": self.bytes_received,
+                "bytes_received_decoded": self.bytes_received_decoded,
+                "prewarms": self.prewarms,
+            }
+
+    def __getstate__(self: "TransportStats") -> Dict[str, Any]:
+        return {}
+
+    def __setstate__(self: "TransportStats", state: Dict[str, Any]) -> None:
+        self.__init__()  # type: ignore
+
+
+class Transport:
+    """
+    Base class of HTTP transports.
+
+    A transport sends one HTTP request and returns a `requests.Response`-like
+    object. All APIs send their requests through a transport, so the network
+    layer can be replaced (a local mock server, a record / replay cassette, ...)
+    without touching the APIs.
+
+    Attributes
+    ----------
+    compress_min_size : Optional[int]
+        Request bodies of at least this many bytes are sent gzip compressed,
+        None to never compress.
+
+    stats : TransportStats
+        Bytes-on-wire counters.
+
+    Methods
+    -------
+    prepare_body(
+        self,
+        headers: Optional[Dict[str, str]],
+        data: Optional[bytes]
+    ) -> Tuple[Optional[Dict[str, str]], Optional[bytes]]:
+        Compress a request body if it is large enough and count its bytes.
+
+    request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        stream: Optional[bool] = None
+    ) -> "requests.Response":
+        Send a request.
+
+    close(self) -> None:
+        Release the resources of the transport.
+    """
+
+    compress_min_size: Optional[int] = None
+
+    @property
+    def stats(self: "Transport") -> TransportStats:
+        if "_stats" not in self.__dict__:
+            self._stats = TransportStats()
+        return self._stats
+
+    def prepare_body(
+        self: "Transport", headers: Optional[Dict[str, str]], data: Optional[bytes]
+    ) -> Tuple[Optional[Dict[str, str]], Optional[bytes]]:
+        """
+        Compress a request body if it is large enough and count its bytes.
+
+        Parameters
+        ----------
+        headers : Optional[Dict[str, str]]
+            Headers of the request.
+
+        data : Optional[bytes]
+            Body of the request.
+
+        Returns
+        -------
+        Tuple[Optional[Dict[str, str]], Optional[bytes]]
+            Headers and body to send.
+        """
+        size = len(data) if data else 0
+
+        if (
+            data
+            and self.compress_min_size is not None
+            and size >= self.compress_min_size
+        ):
+            data = gzip_body(data)
+            headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+
+        self.stats.add(
+            requests=1,
+            bytes_sent=len(data) if data else 0,
+            bytes_sent_uncompressed=size,
+        )
+        return headers, data
+
+    def request(
+        self: "Transport",
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        stream: Optional[bool] = None,
+    ) -> "requests.Response":
+        """
+        Send a request.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+
+        url : str
+            URL of the request.
+
+        headers : Optional[Dict[str, str]], optional
+            Headers of the request, by default None.
+
+        params : Optional[Dict[str, Any]], optional
+            Query parameters of the request, by default None.
+
+        data : Optional[bytes], optional
+            Body of the request, by default None.
+
+        stream : Optional[bool], optional
+            Whether to stream the response body, by default None.
+
+        Returns
+        -------
+        requests.Response
+            Response of the request.
+        """
+        raise NotImplementedError
+
+    def prewarm(self: "Transport", url: str) -> None:
+        """
+        Open a pooled connection to the host of a URL ahead of the first request.
+
+        Sends a HEAD request and ignores its outcome, so the TCP (and TLS)
+        handshake is not paid by the next real request to the same host. The
+        request is only counted in `stats.prewarms`.
+
+        Parameters
+        ----------
+        url : str
+            URL of the host to connect to.
+        """
+        token = _prewarming.set(True)
+        try:
+            self.request(method="HEAD", url=url).close()
+        except Exception:
+            pass
+        finally:
+            _prewarming.reset(token)
+        self.stats.add(prewarms=1)
+
+    def close(self: "Transport") -> None:
+        """
+        Release the resources of the transport.
+        """
+
+    def __enter__(self: "Transport") -> "Transport":
+        return self
+
+    def __exit__(self: "Transport", *args: Any) -> None:
+        self.close()
+
+
+class RequestsTransport(Transport):
+    """
+    Transport based on a pooled `requests.Session`.
+
+    Attributes
+    ----------
+    base_url : Optional[str]
+        If set, the scheme and host of every request URL are replaced with
+        the ones of `base_url`, e.g. to point the APIs at a local mock server.
+
+    session : requests.Session
+        Session holding the connection pool.
+
+    The transport is fork-safe: connections inherited from the parent process
+    are dropped on first use in a child process. It pickles to its
+    configuration only (a custom session is replaced with a new one), and the
+    default transport unpickles to the default transport of the process.
+    """
+
+    def __init__(
+        self: "RequestsTransport",
+        base_url: Optional[str] = None,
+        session: Optional["requests.Session"] = None,
+        compress_min_size: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize requests transport.
+
+        Parameters
+        ----------
+        base_url : Optional[str], optional
+            Base URL to send all requests to, by default None.
+
+        session : Optional[requests.Session], optional
+            Session to use, by default a new session.
+
+        compress_min_size : Optional[int], optional
+            Gzip request bodies of at least this many bytes, by default None
+            (never). Responses are always negotiated with `Accept-Encoding`.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import LLMAPI, RequestsTransport
+        >>> transport = RequestsTransport(base_url='http://127.0.0.1:8000')
+        >>> erniebot = LLMAPI(
+        ...     api_key=api_key,
+        ...     secret_key=secret_key,
+        ...     transport=transport
+        ... )
+        """
+        self.base_url = base_url
+        self.compress_min_size = compress_min_size
+        self._session = session
+        self._pid = os.getpid()
+
+    @property
+    def session(self: "RequestsTransport") -> "requests.Session":
+        if self._session is None:
+            # requests is only imported once the first request is sent.
+            import requests
+
+            self._session = requests.Session()
+        elif self._pid != os.getpid():
+            # Sockets inherited across fork are shared with the parent, never reuse them.
+            self._session.close()
+            self._pid = os.getpid()
+        return self._session
+
+    def __reduce__(self: "RequestsTransport") -> Any:
+        if self is _default_transport:
+            return (get_default_transport, ())
+        return (self.__class__, (self.base_url, None, self.compress_min_size))
+
+    def rewrite_url(self: "RequestsTransport", url: str) -> str:
+        """
+        Replace the scheme and host of a URL with the ones of `base_url`.
+
+        Parameters
+        ----------
+        url : str
+            URL to rewrite.
+
+        Returns
+        -------
+        str
+            Rewritten URL.
+        """
+        return rewrite_url(url, self.base_url)
+
+    def request(
+        self: "RequestsTransport",
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        stream: Optional[bool] = None,
+    ) -> "requests.Response":
+        import requests
+
+        timeout = remaining()
+        headers, data = self.prepare_body(headers, data)
+
+        try:
+            response = self.session.request(
+                method=method,
+                url=self.rewrite_url(url),
+                headers=headers,
+                params=params,
+                data=data,
+                stream=stream,
+                timeout=timeout,
+            )
+        except requests.Timeout as e:
+            raise DeadlineExceeded(str(e)) from e
+
+        if not stream:
+            self.stats.add(
+                bytes_received=response.raw.tell() if response.raw is not None else 0,
+                bytes_received_decoded=len(response.content),
+            )
+
+        return response
+
+    def close(self: "RequestsTransport") -> None:
+        if self._session is not None:
+            self._session.close()
+
+
+class CassetteTransport(Transport):
+    """
+    Record / replay transport.
+
+    In `record` mode every request is sent through the wrapped transport and
+    the interaction is appended to the cassette file. In `replay` mode
+    requests are answered from the cassette without any network access, so
+    benchmarks and load tests can run offline and reproducibly.
+
+    Credentials (`client_id`, `client_secret`, `access_token` and the
+    `Authorization` header) are never written to the cassette.
+
+    Attributes
+    ----------
+    path : str
+        Path of the cassette file (JSON).
+
+    mode : str
+        One of 'record', 'replay' or 'auto' (replay if recorded, else record).
+
+    transport : Transport
+        Transport used to record interactions.
+    """
+
+    REDACTED_PARAMS = ("client_id", "client_secret", "access_token")
+
+    def __init__(
+        self: "CassetteTransport",
+        path: str,
+        mode: str = "auto",
+        transport: Optional[Transport] = None,
+    ) -> None:
+        """
+        Initialize cassette transport.
+
+        Parameters
+        ----------
+        path : str
+            Path of the cassette file.
+
+        mode : str, optional
+            'record', 'replay' or 'auto', by default 'auto'.
+
+        transport : Optional[Transport], optional
+            Transport used to record interactions, by default the default transport.
+
+        Examples
+        --------
+        >>> from wenxinworkshop import EmbeddingAPI, CassetteTransport
+        >>> transport = CassetteTransport('embedding.json', mode='replay')
+        >>> ernieembedding = EmbeddingAPI(
+        ...     api_key=api_key,
+        ...     secret_key=secret_key,
+        ...     transport=transport
+        ... )
+        """
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError("mode must be 'record', 'replay' or 'auto'.")
+
+        self.path = path
+        self.mode = mode
+        self.transport = transport if transport is not None else get_default_transport()
+        self.interactions: List[Dict[str, Any]] = []
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        try:
+            with open(path, "r", encoding="UTF-8") as f:
+                self.interactions = json.load(f)
+        except FileNotFoundError:
+            if mode == "replay":
+                raise
+
+    def _key(
+        self: "CassetteTransport",
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        data: Optional[bytes],
+    ) -> Tuple[str, Dict[str, Any], str]:
+        parts = urlsplit(url)
+        redacted = {
+            key: "<redacted>" if key in self.REDACTED_PARAMS else value
+            for key, value in (params or {}).items()
+        }
+        body = data.decode("UTF-8") if isinstance(data, bytes) else (data or "")
+        request_key = "{} {} {} {}".format(
+            method.upper(),
+            parts.path,
+            urlencode(sorted((k, str(v)) for k, v in redacted.items())),
+            body,
+        )
+        return request_key, redacted, body
+
+    def request(
+        self: "CassetteTransport",
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        stream: Optional[bool] = None,
+    ) -> "requests.Response":
+        remaining()
+        request_key, redacted, body = self._key(method, url, params, data)
+
+        with self._lock:
+            recorded = [i for i in self.interactions if i["key"] == request_key]
+
+            if recorded and self.mode != "record":
+                # Replay recorded interactions in order, then keep repeating the last one.
+                cursor = self._cursors.get(request_key, 0)
+                self._cursors[request_key] = cursor + 1
+                return self._build_response(recorded[min(cursor, len(recorded) - 1)], url)
+
+        if self.mode == "replay":
+            raise ValueError("No recorded interaction for: {}".format(request_key))
+
+        response = self.transport.request(
+            method=method, url=url, headers=headers, params=params, data=data
+        )
+
+        interaction = {
+            "key": request_key,
+            "request": {
+                "method": method.upper(),
+                "url": urlsplit(url).path,
+                "params": redacted,
+                "body": body,
+            },
+            "response": {
+                "status_code": response.status_code,
+                "headers": {
+                    key: value
+                    for key, value in response.headers.items()
+                    if key.lower()
+                    not in ("content-encoding", "content-length", "transfer-encoding")
+                },
+                "body": response.content.decode("UTF-8"),
+            },
+        }
+
+        with self._lock:
+            self.interactions.append(interaction)
+            with open(self.path, "w", encoding="UTF-8") as f:
+                json.dump(self.interactions, f, ensure_ascii=False, indent=2)
+
+        return self._build_response(interaction, url)
+
+    def prewarm(self: "CassetteTransport", url: str) -> None:
+        # Replayed interactions need no connection, and HEAD requests are not recorded.
+        if self.mode != "replay":
+            self.transport.prewarm(url)
+
+    @staticmethod
+    def _build_response(interaction: Dict[str, Any], url: str) -> "requests.Response":
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.Response()
+        response.status_code = interaction["response"]["status_code"]
+        response.headers = CaseInsensitiveDict(interaction["response"]["headers"])
+        response._content = interaction["response"]["body"].encode("UTF-8")
+        response._content_consumed = True
+        response.encoding = "UTF-8"
+        response.url = url
+        return response
+
+    def __getstate__(self: "CassetteTransport") -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self: "CassetteTransport", state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def close(self: "CassetteTransport") -> None:
+        self.transport.close()
+
+
+class HTTPXResponse:
+    """
+    `requests.Response`-like view of a `httpx.Response`.
+
+    Attributes
+    ----------
+    response : httpx.Response
+        Wrapped response.
+    """
+
+    def __init__(self: "HTTPXResponse", response: Any) -> None:
+        self.response = response
+
+    @property
+    def status_code(self: "HTTPXResponse") -> int:
+        return self.response.status_code
+
+    @property
+    def headers(self: "HTTPXResponse") -> Any:
+        return self.response.headers
+
+    @property
+    def content(self: "HTTPXResponse") -> bytes:
+        return self.response.read()
+
+    @property
+    def text(self: "HTTPXResponse") -> str:
+        self.response.read()
+        return self.response.text
+
+    def json(self: "HTTPXResponse") -> Any:
+        return json.loads(self.content)
+
+    def iter_lines(
+        self: "HTTPXResponse", chunk_size: int = 512, decode_unicode: bool = False
+    ) -> Iterator[Any]:
+        try:
+            for line in self.response.iter_lines():
+                yield line if decode_unicode else line.encode("UTF-8")
+        finally:
+            self.response.close()
+
+    def iter_content(
+        self: "HTTPXResponse", chunk_size: Optional[int] = 512, decode_unicode: bool = False
+    ) -> Iterator[bytes]:
+        # Chunks as received: re-chunking to `chunk_size` would copy them.
+        try:
+            yield from self.response.iter_bytes()
+        finally:
+            self.response.close()
+
+    def close(self: "HTTPXResponse") -> None:
+        self.response.close()
+
+
+class HTTPXTransport(Transport):
+    """
+    Transport based on `httpx`, multiplexing requests over HTTP/2.
+
+    With HTTP/2 many concurrent chat streams and embedding calls share a few
+    connections per host instead of one socket and TLS session each; flow
+    control of every stream is handled by `h2`. Requires
+    `pip install httpx[http2]`.
+
+    Attributes
+    ----------
+    base_url : Optional[str]
+        If set, the scheme and host of every request URL are replaced with
+        the ones of `base_url`.
+
+    http2 : bool
+        Whether to negotiate HTTP/2.
+
+    max_connections : int
+        Maximum number of connections of the pool.
+
+    client : httpx.Client
+        Client holding the connection pool.
+    """
+
+    def __init__(
+        self: "HTTPXTransport",
+        base_url: Optional[str] = None,
+        http2: bool = True,
+        max_connections: int = 10,
+        compress_min_size: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize httpx transport.
+
+        Parameters
+        ----------
+        base_url : Optional[str], optional
+            Base URL to send all requests to, by default None.
+
+        http2 : bool, optional
+            Whether to negotiate HTTP/2, by default True.
+
+        max_connections : int, optional
+            Maximum number of connections of the pool, by default 10.
+
+        compress_min_size : Optional[int], optional
+            Gzip request bodies of at least this many bytes, by default None (never).
+
+        Examples
+        --------
+        >>> from wenxinworkshop import LLMAPI, HTTPXTransport
+        >>> transport = HTTPXTransport(http2=True)
+        >>> erniebot = LLMAPI(
+        ...     api_key=api_key,
+        ...     secret_key=secret_key,
+        ...     transport=transport
+        ... )
+        """
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError(
+                "HTTPXTransport requires httpx, please install it by `pip install httpx[http2]`."
+            )
+
+        self.base_url = base_url
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.compress_min_size = compress_min_size
+        self._httpx = httpx
+        self._client: Optional[Any] = None
+        self._pid = os.getpid()
+
+    @property
+    def client(self: "HTTPXTransport") -> Any:
+        if self._client is None or self._pid != os.getpid():
+            # Never close a client inherited across fork: it would send
+            # GOAWAY on connections still used by the parent.
+            self._client = self._httpx.Client(
+                http2=self.http2,
+                limits=self._httpx.Limits(max_connections=self.max_connections),
+                timeout=None,
+            )
+            self._pid = os.getpid()
+        return self._client
+
+    def __reduce__(self: "HTTPXTransport") -> Any:
+        return (
+            self.__class__,
+            (self.base_url, self.http2, self.max_connections, self.compress_min_size),
+        )
+
+    def request(
+        self: "HTTPXTransport",
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        stream: Optional[bool] = None,
+    ) -> "requests.Response":
+        timeout = remaining()
+        headers, data = self.prepare_body(headers, data)
+
+        request = self.client.build_request(
+            method=method,
+            url=rewrite_url(url, self.base_url),
+            headers=headers,
+            params=params,
+            content=data,
+            **({} if timeout is None else {"timeout": timeout}),
+        )
+        try:
+            response = self.client.send(request, stream=bool(stream))
+        except self._httpx.TimeoutException as e:
+            raise DeadlineExceeded(str(e)) from e
+
+        if not stream:
+            self.stats.add(
+                bytes_received=response.num_bytes_downloaded,
+                bytes_received_decoded=len(response.content),
+            )
+
+        return HTTPXResponse(response)  # type: ignore
+
+    def close(self: "HTTPXTransport") -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+_default_transport: Optional[Transport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> Transport:
+    """
+    Get the transport shared by all APIs created without an explicit transport.
+
+    Returns
+    -------
+    Transport
+        Default transport.
+    """
+    global _default_transport
+
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = RequestsTransport()
+
+    return _default_transport